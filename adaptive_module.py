@@ -1,148 +1,479 @@
-import pandas as pd
-import numpy as np
-import pickle
-import os
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.preprocessing import LabelEncoder
-from sklearn.model_selection import train_test_split
-
-class AdaptiveLearningModel:
-    def __init__(self, model_dir='models/saved_models'):
-        self.model_dir = model_dir
-        
-        # Classifiers for each target
-        self.next_topic_clf = RandomForestClassifier(n_estimators=100, random_state=42)
-        self.action_clf = RandomForestClassifier(n_estimators=100, random_state=42)
-        self.difficulty_adj_clf = RandomForestClassifier(n_estimators=100, random_state=42)
-        
-        # Encoders
-        self.topic_encoder = LabelEncoder()
-        self.difficulty_encoder = LabelEncoder()
-        self.next_topic_encoder = LabelEncoder()
-        self.action_encoder = LabelEncoder()
-        self.difficulty_adj_encoder = LabelEncoder()
-        
-        if not os.path.exists(model_dir):
-            os.makedirs(model_dir)
-
-    def train(self, data_path):
-        print("Loading interaction data...")
-        df = pd.read_csv(data_path)
-        
-        # Preprocessing
-        print("Preprocessing data...")
-        # Encode categorical features
-        df['topic_enc'] = self.topic_encoder.fit_transform(df['topic'])
-        df['difficulty_enc'] = self.difficulty_encoder.fit_transform(df['difficulty'])
-        
-        # Features: Current state
-        X = df[['topic_enc', 'difficulty_enc', 'score', 'attempts', 'time_spent']]
-        
-        # Targets
-        y_next_topic = self.next_topic_encoder.fit_transform(df['next_topic'])
-        y_action = self.action_encoder.fit_transform(df['next_action'])
-        y_diff_adj = self.difficulty_adj_encoder.fit_transform(df['next_difficulty_adj'])
-        
-        print("Training Next Topic Classifier...")
-        self.next_topic_clf.fit(X, y_next_topic)
-        
-        print("Training Action Classifier...")
-        self.action_clf.fit(X, y_action)
-        
-        print("Training Difficulty Adjustment Classifier...")
-        self.difficulty_adj_clf.fit(X, y_diff_adj)
-        
-        print("Saving adaptive models...")
-        self.save_models()
-        print("Adaptive learning training complete.")
-
-    def predict(self, current_topic, current_difficulty, score, attempts, time_spent):
-        # Encode inputs
-        try:
-            topic_enc = self.topic_encoder.transform([current_topic])[0]
-            diff_enc = self.difficulty_encoder.transform([current_difficulty])[0]
-        except ValueError as e:
-            # Debugging: return valid options
-            valid_topics = list(self.topic_encoder.classes_)
-            valid_diffs = list(self.difficulty_encoder.classes_)
-            return {
-                "error": f"Unknown inputs. Valid Topics: {valid_topics[:3]}... Valid Difficulties: {valid_diffs}. Error: {str(e)}"
-            }
-            
-        features = np.array([[topic_enc, diff_enc, score, attempts, time_spent]])
-        
-        # Predict with probabilities
-        next_topic_enc = self.next_topic_clf.predict(features)[0]
-        next_topic_prob = np.max(self.next_topic_clf.predict_proba(features)[0])
-        
-        action_enc = self.action_clf.predict(features)[0]
-        action_prob = np.max(self.action_clf.predict_proba(features)[0])
-        
-        diff_adj_enc = self.difficulty_adj_clf.predict(features)[0]
-        diff_adj_prob = np.max(self.difficulty_adj_clf.predict_proba(features)[0])
-        
-        # Decode
-        next_topic = self.next_topic_encoder.inverse_transform([next_topic_enc])[0]
-        action = self.action_encoder.inverse_transform([action_enc])[0]
-        diff_adj = self.difficulty_adj_encoder.inverse_transform([diff_adj_enc])[0]
-        
-        # Generate Reasoning
-        reasoning = []
-        if score < 50:
-            reasoning.append(f"Score ({score}%) suggests need for reinforcement.")
-        elif score > 80:
-            reasoning.append(f"High score ({score}%) indicates mastery.")
-            
-        if attempts > 2 and score < 60:
-            reasoning.append(f"Multiple attempts ({attempts}) with low score.")
-            
-        if not reasoning:
-            reasoning.append("Standard progression based on curriculum.")
-            
-        return {
-            "next_topic": next_topic,
-            "next_topic_conf": round(next_topic_prob * 100),
-            "action": action,
-            "action_conf": round(action_prob * 100),
-            "difficulty_adjustment": diff_adj,
-            "difficulty_adjustment_conf": round(diff_adj_prob * 100),
-            "reasoning": " ".join(reasoning)
-        }
-
-    def save_models(self):
-        with open(f"{self.model_dir}/adaptive_models.pkl", "wb") as f:
-            pickle.dump({
-                "next_topic_clf": self.next_topic_clf,
-                "action_clf": self.action_clf,
-                "difficulty_adj_clf": self.difficulty_adj_clf,
-                "encoders": {
-                    "topic": self.topic_encoder,
-                    "difficulty": self.difficulty_encoder,
-                    "next_topic": self.next_topic_encoder,
-                    "action": self.action_encoder,
-                    "difficulty_adj": self.difficulty_adj_encoder
-                }
-            }, f)
-
-    def load_models(self):
-        try:
-            with open(f"{self.model_dir}/adaptive_models.pkl", "rb") as f:
-                data = pickle.load(f)
-                self.next_topic_clf = data["next_topic_clf"]
-                self.action_clf = data["action_clf"]
-                self.difficulty_adj_clf = data["difficulty_adj_clf"]
-                self.topic_encoder = data["encoders"]["topic"]
-                self.difficulty_encoder = data["encoders"]["difficulty"]
-                self.next_topic_encoder = data["encoders"]["next_topic"]
-                self.action_encoder = data["encoders"]["action"]
-                self.difficulty_adj_encoder = data["encoders"]["difficulty_adj"]
-            print("Adaptive models loaded successfully.")
-            return True
-        except FileNotFoundError:
-            print("Saved adaptive models not found. Please train first.")
-            return False
-
-if __name__ == "__main__":
-    # Example usage
-    model = AdaptiveLearningModel()
-    # model.train("../data/synthetic_interactions.csv")
+import pandas as pd
+import numpy as np
+import pickle
+import os
+import time
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import LabelEncoder
+from models.recommendation_table import RecommendationTable
+from models.feature_store import DEFAULT_CHUNK_SIZE, ingest, is_parquet
+from models.forest_engine import FlatForest, classes_array, compile_forest
+from models.metrics import PREDICTION_ERRORS, StageTimer, count_labels, record_model_load
+from models.multihead import create_head, head_from_artifact
+from models.responses import render_reasoning
+from models.model_artifacts import (ArtifactError, file_sha256, latest_version_dir, list_versions, load_artifact,
+                                    save_artifact)
+
+INPUT_COLUMNS = ['topic', 'difficulty', 'score', 'attempts', 'time_spent']
+FEATURE_COLUMNS = ['topic_enc', 'difficulty_enc', 'score', 'attempts', 'time_spent']
+
+ARTIFACT_KIND = 'adaptive'
+
+class AdaptiveLearningModel:
+    # (result field, classifier attribute, label encoder attribute)
+    TARGETS = [
+        ('next_topic', 'next_topic_clf', 'next_topic_encoder'),
+        ('action', 'action_clf', 'action_encoder'),
+        ('difficulty_adjustment', 'difficulty_adj_clf', 'difficulty_adj_encoder')
+    ]
+    # (artifact name, label encoder attribute)
+    ENCODERS = [
+        ('topic', 'topic_encoder'),
+        ('difficulty', 'difficulty_encoder'),
+        ('next_topic', 'next_topic_encoder'),
+        ('action', 'action_encoder'),
+        ('difficulty_adj', 'difficulty_adj_encoder')
+    ]
+    # (CSV column, label encoder attribute) for the categorical columns
+    CATEGORICAL_COLUMNS = [
+        ('topic', 'topic_encoder'),
+        ('difficulty', 'difficulty_encoder'),
+        ('next_topic', 'next_topic_encoder'),
+        ('next_action', 'action_encoder'),
+        ('next_difficulty_adj', 'difficulty_adj_encoder')
+    ]
+
+    def __init__(self, model_dir='models/saved_models', use_lookup_table=False, lookup_grid=None,
+                 compiled_forests=False, forest_threads=1, head_mode='separate', head_params=None, n_jobs=None):
+        self.model_dir = model_dir
+        # Passed to the random forests for parallel tree building
+        self.n_jobs = n_jobs
+
+        # 'separate' trains one forest per target; the other modes predict all
+        # three targets with one model (see multihead.py). head_params are
+        # passed to that model, e.g. the hyperparameters model_search.py picked.
+        self.head_mode = head_mode
+        self.head_params = head_params or {}
+        self.head = None
+        # Held-out evaluation saved with the artifact (see model_search.py)
+        self.evaluation = None
+
+        # Artifact-loaded classifiers always run on the flat-array forest
+        # engine; compiled_forests also converts freshly trained ones
+        self.compiled_forests = compiled_forests
+        self.forest_threads = forest_threads
+
+        # Optional precomputed answers over the quantized feature grid, built
+        # after training or loading when use_lookup_table is set
+        self.use_lookup_table = use_lookup_table
+        self.lookup_grid = lookup_grid or {}
+        self.lookup_table = None
+
+        # Set by train() / load_models(). training_state records how much of
+        # the interaction CSV the forests have seen, so update() can train on
+        # just the appended rows.
+        self.version = None
+        self.data_hash = None
+        self.training_state = {}
+
+        # Classifiers for each target
+        self.next_topic_clf = self._new_forest()
+        self.action_clf = self._new_forest()
+        self.difficulty_adj_clf = self._new_forest()
+        
+        # Encoders
+        self.topic_encoder = LabelEncoder()
+        self.difficulty_encoder = LabelEncoder()
+        self.next_topic_encoder = LabelEncoder()
+        self.action_encoder = LabelEncoder()
+        self.difficulty_adj_encoder = LabelEncoder()
+        
+        if not os.path.exists(model_dir):
+            os.makedirs(model_dir)
+
+    def train(self, data_path, chunk_size=None):
+        # chunk_size (or a Parquet file) streams the data through a
+        # memory-mapped feature store instead of reading it all at once
+        print("Loading interaction data...")
+        self.data_hash = file_sha256(data_path)
+        if chunk_size or is_parquet(data_path):
+            store = ingest(data_path, os.path.join(self.model_dir, 'feature_store', ARTIFACT_KIND),
+                           categorical=[column for column, _ in self.CATEGORICAL_COLUMNS],
+                           numeric=['score', 'attempts', 'time_spent'],
+                           chunk_size=chunk_size or DEFAULT_CHUNK_SIZE)
+            # update() appends CSV rows by byte offset, so only CSVs get a state
+            self.training_state = {} if is_parquet(data_path) else self._file_state(data_path, store.n_rows)
+            self.fit_store(store)
+        else:
+            df = pd.read_csv(data_path)
+            self.training_state = self._file_state(data_path, len(df))
+            self.fit(df)
+        
+        print("Saving adaptive models...")
+        self.save_models()
+        print("Adaptive learning training complete.")
+        self._after_fit()
+
+    def update(self, data_path, n_new_trees=20):
+        # Incremental training when rows were appended to the CSV the models
+        # were trained on: fit new trees per target on the new rows only and
+        # append them to the existing forests. Returns False when a full
+        # retrain is needed instead (file rewritten, unseen labels, or a
+        # multi-head model).
+        #
+        # The forests average all trees equally, so the number of new trees
+        # sets the new rows' weight: it follows their share of all trained
+        # rows (100 new rows next to 10,000 get 1 tree per 100 existing
+        # ones), capped at n_new_trees. Small updates therefore cannot
+        # outvote the data the forest was built on; an append larger than
+        # that cap allows is under-weighted until the next full retrain.
+        state = self.training_state
+        if self.head is not None or not state:
+            return False
+        size = os.path.getsize(data_path)
+        trained_bytes = state["trained_bytes"]
+        if size < trained_bytes or file_sha256(data_path, limit=trained_bytes) != state["prefix_sha256"]:
+            print("Interaction data changed before the trained prefix; full retrain needed.")
+            return False
+        if size == trained_bytes:
+            print("No new interactions since the last training run.")
+            return True
+
+        header = pd.read_csv(data_path, nrows=0).columns
+        with open(data_path, "rb") as f:
+            f.seek(trained_bytes)
+            new_df = pd.read_csv(f, header=None, names=header)
+        print(f"Updating adaptive models with {len(new_df)} new interactions...")
+
+        for column, attr in self.CATEGORICAL_COLUMNS:
+            if not np.isin(new_df[column], getattr(self, attr).classes_).all():
+                print(f"New values in '{column}'; full retrain needed.")
+                return False
+
+        X = np.column_stack([
+            self.topic_encoder.transform(new_df['topic']),
+            self.difficulty_encoder.transform(new_df['difficulty']),
+            new_df[['score', 'attempts', 'time_spent']].to_numpy(dtype=float)
+        ])
+        targets = {
+            'next_topic': self.next_topic_encoder.transform(new_df['next_topic']),
+            'action': self.action_encoder.transform(new_df['next_action']),
+            'difficulty_adjustment': self.difficulty_adj_encoder.transform(new_df['next_difficulty_adj'])
+        }
+        # A fresh seed per update so appended trees differ from earlier ones
+        seed = self.next_topic_clf.n_estimators
+        n_trees = min(n_new_trees, max(1, round(seed * len(new_df) / state["rows"])))
+        print(f"Adding {n_trees} trees per target ({len(new_df)} new rows, {state['rows']} trained).")
+        for name, clf_attr, _ in self.TARGETS:
+            new_trees = RandomForestClassifier(n_estimators=n_trees, random_state=seed, n_jobs=self.n_jobs)
+            new_trees.fit(X, targets[name])
+            current = compile_forest(getattr(self, clf_attr), n_threads=self.forest_threads)
+            setattr(self, clf_attr, current.extend(FlatForest.from_sklearn(new_trees)))
+
+        self.data_hash = file_sha256(data_path)
+        self.training_state = self._file_state(data_path, state["rows"] + len(new_df))
+        self.save_models()
+        self._after_fit()
+        return True
+
+    def _file_state(self, data_path, rows):
+        size = os.path.getsize(data_path)
+        return {"trained_bytes": size, "prefix_sha256": file_sha256(data_path, limit=size), "rows": rows}
+
+    def _after_fit(self):
+        if self.compiled_forests:
+            self.compile_forests()
+        self.lookup_table = None
+        if self.use_lookup_table:
+            self.enable_lookup_table(**self.lookup_grid)
+
+    def fit(self, df):
+        # Preprocessing
+        print("Preprocessing data...")
+        df = df.copy()
+        # Encode categorical features
+        df['topic_enc'] = self.topic_encoder.fit_transform(df['topic'])
+        df['difficulty_enc'] = self.difficulty_encoder.fit_transform(df['difficulty'])
+
+        # Features: Current state
+        X = df[FEATURE_COLUMNS]
+
+        # Targets
+        y_next_topic = self.next_topic_encoder.fit_transform(df['next_topic'])
+        y_action = self.action_encoder.fit_transform(df['next_action'])
+        y_diff_adj = self.difficulty_adj_encoder.fit_transform(df['next_difficulty_adj'])
+
+        self._fit_targets(X, y_next_topic, y_action, y_diff_adj)
+
+    def fit_store(self, store):
+        # Same as fit(), from a FeatureStore built by ingest(). The store
+        # numbers categories like LabelEncoder (sorted), so its codes are the
+        # encoded features and targets as they are.
+        for column, attr in self.CATEGORICAL_COLUMNS:
+            getattr(self, attr).fit(store.vocab[column])
+        X = store.matrix(['topic', 'difficulty', 'score', 'attempts', 'time_spent'])
+        self._fit_targets(X, store.column('next_topic'), store.column('next_action'),
+                          store.column('next_difficulty_adj'))
+
+    def _fit_targets(self, X, y_next_topic, y_action, y_diff_adj):
+        if self.head_mode != 'separate':
+            print(f"Training multi-head classifier ({self.head_mode})...")
+            self.head = create_head(self.head_mode, n_jobs=self.n_jobs, **self.head_params)
+            self.head.fit(np.asarray(X), np.column_stack([y_next_topic, y_action, y_diff_adj]))
+            return
+
+        self.head = None
+        for _, clf_attr, _ in self.TARGETS:
+            setattr(self, clf_attr, self._new_forest())
+
+        print("Training Next Topic Classifier...")
+        self.next_topic_clf.fit(X, y_next_topic)
+
+        print("Training Action Classifier...")
+        self.action_clf.fit(X, y_action)
+
+        print("Training Difficulty Adjustment Classifier...")
+        self.difficulty_adj_clf.fit(X, y_diff_adj)
+
+    def _new_forest(self):
+        return RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=self.n_jobs)
+
+    def predict(self, current_topic, current_difficulty, score, attempts, time_spent):
+        return self.predict_batch([{
+            "topic": current_topic,
+            "difficulty": current_difficulty,
+            "score": score,
+            "attempts": attempts,
+            "time_spent": time_spent
+        }])[0]
+
+    def predict_batch(self, rows, timings=None):
+        # rows: a DataFrame or a list of dicts with the INPUT_COLUMNS. Rows with
+        # an unknown topic/difficulty get an error entry instead of failing
+        # the whole batch. Per-stage seconds are recorded as metrics and, when
+        # given, added to the timings dict.
+        if isinstance(rows, pd.DataFrame):
+            columns = {c: rows[c].tolist() for c in INPUT_COLUMNS}
+        else:
+            columns = {c: [row[c] for row in rows] for c in INPUT_COLUMNS}
+        n_rows = len(columns["topic"])
+        results = [None] * n_rows
+        if n_rows == 0:
+            return results
+
+        timer = StageTimer(ARTIFACT_KIND, timings)
+        with timer.stage("encode"):
+            # Encode the categorical columns in one transform each
+            topics = np.asarray(columns["topic"], dtype=object)
+            difficulties = np.asarray(columns["difficulty"], dtype=object)
+            known = np.isin(topics, self.topic_encoder.classes_) & np.isin(difficulties, self.difficulty_encoder.classes_)
+
+            for i in np.flatnonzero(~known):
+                results[i] = {"error": self._unknown_input_error(topics[i], difficulties[i])}
+            if not known.all():
+                PREDICTION_ERRORS.inc(int((~known).sum()), model=ARTIFACT_KIND, reason="unknown_input")
+
+            valid = np.flatnonzero(known)
+            if len(valid) == 0:
+                return results
+
+            topic_codes = self.topic_encoder.transform(topics[valid])
+            diff_codes = self.difficulty_encoder.transform(difficulties[valid])
+            scores = np.asarray(columns["score"], dtype=float)[valid]
+            attempts = np.asarray(columns["attempts"], dtype=float)[valid]
+            times = np.asarray(columns["time_spent"], dtype=float)[valid]
+
+        # Label codes and rounded confidences per target; on-grid rows come
+        # straight from the lookup table, the rest from the live forests
+        codes = {name: np.zeros(len(valid), dtype=np.int64) for name, _, _ in self.TARGETS}
+        confs = {name: np.zeros(len(valid), dtype=np.int64) for name, _, _ in self.TARGETS}
+        live = np.ones(len(valid), dtype=bool)
+        if self.lookup_table is not None:
+            with timer.stage("lookup"):
+                cells = self.lookup_table.cells(topic_codes, diff_codes, scores, attempts, times)
+                hit = cells >= 0
+                for name in codes:
+                    codes[name][hit], confs[name][hit] = self.lookup_table.lookup(name, cells[hit])
+                live = ~hit
+
+        if live.any():
+            features = np.column_stack([topic_codes, diff_codes, scores, attempts, times])[live]
+            for name, (encoded, conf) in self.predict_codes(features, timer).items():
+                codes[name][live], confs[name][live] = encoded, conf
+
+        # Decode each target column at once
+        with timer.stage("decode"):
+            decoded = {name: getattr(self, encoder_attr).inverse_transform(codes[name])
+                       for name, _, encoder_attr in self.TARGETS}
+        count_labels(ARTIFACT_KIND, "next_topic", decoded["next_topic"])
+        count_labels(ARTIFACT_KIND, "action", decoded["action"])
+
+        # numpy values become Python ones once per column; the reasoning is
+        # rendered from the templates in responses.py
+        next_topics, actions, adjustments = (decoded[name].tolist() for name, _, _ in self.TARGETS)
+        next_topic_confs, action_confs, adjustment_confs = (confs[name].tolist() for name, _, _ in self.TARGETS)
+        reasoning = render_reasoning([columns["score"][i] for i in valid], [columns["attempts"][i] for i in valid])
+        for j, i in enumerate(valid.tolist()):
+            results[i] = {
+                "next_topic": next_topics[j],
+                "next_topic_conf": next_topic_confs[j],
+                "action": actions[j],
+                "action_conf": action_confs[j],
+                "difficulty_adjustment": adjustments[j],
+                "difficulty_adjustment_conf": adjustment_confs[j],
+                "reasoning": reasoning[j]
+            }
+        return results
+
+    def predict_codes(self, features, timer=None):
+        # {target: (label codes, rounded confidences)} for encoded feature
+        # rows; timer (a StageTimer) times each classifier
+        timer = timer or StageTimer(None)
+        if self.head is not None:
+            with timer.stage("head"):
+                pairs = self.head.predict_all(features)
+            return {name: (encoded, np.rint(conf * 100))
+                    for (name, _, _), (encoded, conf) in zip(self.TARGETS, pairs)}
+        codes = {}
+        for name, clf_attr, _ in self.TARGETS:
+            with timer.stage(name):
+                codes[name] = self._classify(getattr(self, clf_attr), features)
+        return codes
+
+    def _classify(self, classifier, features):
+        # Label code and confidence (rounded like round(prob * 100))
+        if hasattr(classifier, 'predict_with_confidence'):
+            encoded, confidence = classifier.predict_with_confidence(features)
+            return encoded, np.rint(confidence * 100)
+        # predict() is the argmax of predict_proba(), so one call gives both
+        proba = classifier.predict_proba(features)
+        encoded = classifier.classes_.take(np.argmax(proba, axis=1))
+        return encoded, np.rint(np.max(proba, axis=1) * 100)
+
+    def compile_forests(self):
+        if self.head is not None:
+            self.head.compile(n_threads=self.forest_threads)
+            return
+        for _, clf_attr, _ in self.TARGETS:
+            setattr(self, clf_attr, compile_forest(getattr(self, clf_attr), n_threads=self.forest_threads))
+
+    def enable_lookup_table(self, **grid):
+        # Precompute every on-grid answer; see RecommendationTable.build for
+        # the grid ranges
+        self.lookup_grid = grid
+        self.lookup_table = RecommendationTable.build(self, **grid)
+        stats = self.lookup_table.stats()
+        print(f"Recommendation lookup table built: {stats['cells']} cells, "
+              f"{stats['memory_bytes'] / 1e6:.1f} MB in {stats['build_seconds']:.1f}s")
+        return self.lookup_table
+
+    def _unknown_input_error(self, topic, difficulty):
+        # Debugging: return valid options
+        valid_topics = list(self.topic_encoder.classes_)
+        valid_diffs = list(self.difficulty_encoder.classes_)
+        unseen = [v for v, enc in ((topic, self.topic_encoder), (difficulty, self.difficulty_encoder))
+                  if v not in enc.classes_]
+        return (f"Unknown inputs. Valid Topics: {valid_topics[:3]}... Valid Difficulties: {valid_diffs}. "
+                f"Error: y contains previously unseen labels: {', '.join(repr(v) for v in unseen)}")
+
+    def save_models(self):
+        # Versioned artifact: manifest + memory-mappable flat tree arrays, with
+        # the label encoders stored as class lists
+        path = save_artifact(
+            self.model_dir, ARTIFACT_KIND,
+            models=self._artifact_models(),
+            encoders={name: getattr(self, attr).classes_.tolist() for name, attr in self.ENCODERS},
+            metadata={"feature_columns": FEATURE_COLUMNS, "head_mode": self.head_mode,
+                      "head_params": self.head_params, "evaluation": self.evaluation,
+                      "training_state": self.training_state},
+            data_hash=self.data_hash,
+        )
+        self.version = os.path.basename(path)
+        print(f"Adaptive models saved to {path}")
+
+    def _artifact_models(self):
+        if self.head is not None:
+            return {"head": self.head}
+        return {name: getattr(self, clf_attr) for name, clf_attr, _ in self.TARGETS}
+
+    def load_models(self, version=None):
+        # The newest artifact version unless a version is given
+        start = time.perf_counter()
+        loaded = False
+        try:
+            loaded = self._load_version(version)
+        finally:
+            record_model_load(ARTIFACT_KIND, time.perf_counter() - start, self.version, loaded)
+        return loaded
+
+    def _load_version(self, version=None):
+        if version is not None:
+            # Only names of saved versions, so a requested version cannot
+            # point outside model_dir
+            if version not in list_versions(self.model_dir, ARTIFACT_KIND):
+                print(f"No saved {ARTIFACT_KIND} model version {version!r}.")
+                return False
+            version_dir = os.path.join(self.model_dir, ARTIFACT_KIND, version)
+        else:
+            version_dir = latest_version_dir(self.model_dir, ARTIFACT_KIND)
+        if version_dir is None:
+            loaded = self._load_legacy_pickle()
+        else:
+            try:
+                manifest, models = load_artifact(version_dir, ARTIFACT_KIND,
+                                                 expected_metadata={"feature_columns": FEATURE_COLUMNS})
+            except ArtifactError as e:
+                print(f"Incompatible adaptive model artifact: {e}")
+                return False
+            # The artifact decides the head mode it was trained with
+            self.head_mode = manifest["metadata"].get("head_mode", "separate")
+            self.head_params = manifest["metadata"].get("head_params") or {}
+            self.evaluation = manifest["metadata"].get("evaluation")
+            if "head" in models:
+                self.head = head_from_artifact(models["head"]).compile(n_threads=self.forest_threads)
+            else:
+                self.head = None
+                for name, clf_attr, _ in self.TARGETS:
+                    setattr(self, clf_attr, compile_forest(models[name], n_threads=self.forest_threads))
+            for name, attr in self.ENCODERS:
+                encoder = LabelEncoder()
+                encoder.classes_ = classes_array(manifest["encoders"][name])
+                setattr(self, attr, encoder)
+            self.version = manifest["version"]
+            self.data_hash = manifest["training_data_hash"]
+            self.training_state = manifest["metadata"].get("training_state") or {}
+            print(f"Adaptive models loaded successfully (version {self.version}).")
+            loaded = True
+
+        if loaded:
+            if self.compiled_forests:
+                self.compile_forests()
+            self.lookup_table = None
+            if self.use_lookup_table:
+                self.enable_lookup_table(**self.lookup_grid)
+        return loaded
+
+    def _load_legacy_pickle(self):
+        # Models saved before the artifact format existed
+        try:
+            with open(f"{self.model_dir}/adaptive_models.pkl", "rb") as f:
+                data = pickle.load(f)
+                self.next_topic_clf = data["next_topic_clf"]
+                self.action_clf = data["action_clf"]
+                self.difficulty_adj_clf = data["difficulty_adj_clf"]
+                self.topic_encoder = data["encoders"]["topic"]
+                self.difficulty_encoder = data["encoders"]["difficulty"]
+                self.next_topic_encoder = data["encoders"]["next_topic"]
+                self.action_encoder = data["encoders"]["action"]
+                self.difficulty_adj_encoder = data["encoders"]["difficulty_adj"]
+            self.version = "legacy-pickle"
+            print("Adaptive models loaded successfully.")
+            return True
+        except FileNotFoundError:
+            print("Saved adaptive models not found. Please train first.")
+            return False
+
+if __name__ == "__main__":
+    # Example usage
+    model = AdaptiveLearningModel()
+    # model.train("../data/synthetic_interactions.csv")
@@ -1,87 +1,639 @@
-import sys
-import os
-from fastapi import FastAPI, Request
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from pydantic import BaseModel
-import uvicorn
-
-# Add project root to path
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-
-from models.nlp_module import QueryUnderstandingModel
-from models.adaptive_module import AdaptiveLearningModel
-
-from fastapi.middleware.cors import CORSMiddleware
-
-app = FastAPI()
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
-
-# Templates
-templates = Jinja2Templates(directory="templates")
-
-# Load Models
-print("Loading models...")
-try:
-    nlp_model = QueryUnderstandingModel()
-    if not nlp_model.load_models():
-        print("Warning: NLP models not found. Predictions will fail.")
-
-    adaptive_model = AdaptiveLearningModel()
-    if not adaptive_model.load_models():
-        print("Warning: Adaptive models not found. Recommendations will fail.")
-except Exception as e:
-    print(f"Error loading models: {e}")
-
-# Pydantic Models for API
-class QueryRequest(BaseModel):
-    query: str
-
-class AdaptiveRequest(BaseModel):
-    topic: str
-    difficulty: str
-    score: float
-    attempts: int
-    time_spent: float
-
-@app.get("/")
-async def read_root(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
-
-@app.post("/api/analyze")
-async def analyze_query(request: QueryRequest):
-    if not request.query:
-        return {"error": "Query cannot be empty"}
-    
-    try:
-        result = nlp_model.predict(request.query)
-        return result
-    except Exception as e:
-        return {"error": str(e)}
-
-@app.post("/api/recommend")
-async def recommend_path(request: AdaptiveRequest):
-    try:
-        recommendation = adaptive_model.predict(
-            request.topic, 
-            request.difficulty, 
-            request.score, 
-            request.attempts, 
-            request.time_spent
-        )
-        return recommendation
-    except Exception as e:
-        return {"error": str(e)}
-
-if __name__ == "__main__":
-    uvicorn.run("app:app", host="127.0.0.1", port=8000, reload=True)
+import sys
+import os
+import json
+import asyncio
+import functools
+import threading
+import time
+from typing import Optional, Union
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.staticfiles import StaticFiles
+from fastapi.templating import Jinja2Templates
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, ValidationError
+import uvicorn
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.nlp_module import QueryUnderstandingModel
+from models.adaptive_module import AdaptiveLearningModel
+from models.batching import MicroBatcher
+from models.model_registry import ModelRegistry, NotResident
+from models.session_store import SessionStore
+from models.embedding_cache import DEFAULT_CACHE_PATH
+from models.metrics import PREDICTION_ERRORS, REGISTRY, call_timed, server_timing
+from models.responses import (AnalyzeResponse, CompactAnalyzeResponse, CompactRecommendResponse, RecommendResponse,
+                              compact_result, dumps)
+from models.inference_pool import (InferencePool, LoopLagMonitor, Overloaded, call_process_model_timed,
+                                   load_process_model)
+
+from fastapi.middleware.cors import CORSMiddleware
+
+app = FastAPI()
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Mount static files
+app.mount("/static", StaticFiles(directory="static"), name="static")
+
+# Templates
+templates = Jinja2Templates(directory="templates")
+
+# Embedding cache: in-memory LRU plus an optional sqlite file shared by workers
+EMBEDDING_CACHE_SIZE = int(os.environ.get("EMBEDDING_CACHE_SIZE", "10000"))
+EMBEDDING_CACHE_TTL = float(os.environ["EMBEDDING_CACHE_TTL"]) if os.environ.get("EMBEDDING_CACHE_TTL") else None
+EMBEDDING_CACHE_PATH = os.environ.get("EMBEDDING_CACHE_PATH", DEFAULT_CACHE_PATH) or None
+
+# Query encoder: 'sentence-transformers', 'onnx' or 'onnx-int8'. It is loaded
+# lazily, so the app (and /api/recommend) is up before torch is imported.
+ENCODER_BACKEND = os.environ.get("ENCODER_BACKEND", "sentence-transformers")
+ONNX_MODEL_DIR = os.environ.get("ONNX_MODEL_DIR") or None
+ENCODER_PRELOAD = os.environ.get("ENCODER_PRELOAD", "1") == "1"
+ENCODER_THREADS = int(os.environ.get("ENCODER_THREADS", "0")) or None
+
+# Precomputed /api/recommend answers over the quantized input grid
+RECOMMEND_LOOKUP_TABLE = os.environ.get("RECOMMEND_LOOKUP_TABLE", "0") == "1"
+
+# Threads used to traverse the trees of each compiled forest
+FOREST_THREADS = int(os.environ.get("FOREST_THREADS", "1"))
+
+# Send per-stage inference timings in a Server-Timing header (shown by the UI)
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "1") == "1"
+
+# Bounded inference executor: at most INFERENCE_MAX_PENDING requests are
+# admitted (running or queued), the rest get a 503 with Retry-After, and each
+# request is cut off after INFERENCE_TIMEOUT_S (0 disables) with a 504
+INFERENCE_THREADS = int(os.environ.get("INFERENCE_THREADS", "4"))
+INFERENCE_MAX_PENDING = int(os.environ.get("INFERENCE_MAX_PENDING", "64"))
+INFERENCE_TIMEOUT_S = float(os.environ.get("INFERENCE_TIMEOUT_S", "10")) or None
+
+# 'thread' runs /api/recommend on the inference threads; 'process' gives it a
+# pool of RECOMMEND_PROCESSES processes, each with its own (memory-mapped) model
+RECOMMEND_EXECUTOR = os.environ.get("RECOMMEND_EXECUTOR", "thread")
+RECOMMEND_PROCESSES = int(os.environ.get("RECOMMEND_PROCESSES", "2"))
+
+# Nearest-neighbour index over labelled queries (built by train.py): a match
+# at or above SEMANTIC_INDEX_THRESHOLD cosine similarity answers /api/analyze
+# without the classifiers, and SEMANTIC_INDEX_TOP_K similar past questions are
+# returned. With SEMANTIC_INDEX_LEARN_CONF (percent) set, live queries the
+# classifiers answered at least that confidently are added to the index, which
+# is saved again on shutdown.
+SEMANTIC_INDEX = os.environ.get("SEMANTIC_INDEX", "0") == "1"
+SEMANTIC_INDEX_THRESHOLD = float(os.environ.get("SEMANTIC_INDEX_THRESHOLD", "0.95"))
+SEMANTIC_INDEX_TOP_K = int(os.environ.get("SEMANTIC_INDEX_TOP_K", "3"))
+SEMANTIC_INDEX_LEARN_CONF = float(os.environ["SEMANTIC_INDEX_LEARN_CONF"]) if os.environ.get("SEMANTIC_INDEX_LEARN_CONF") else None
+
+# Cascade for /api/analyze: a hashed n-gram model trained with the classifiers
+# answers queries when its confidence on every label is at least
+# CASCADE_THRESHOLD (0-1), skipping the encoder; the rest are escalated to the
+# embedding + classifier path. Unset disables the cascade.
+CASCADE_THRESHOLD = float(os.environ["CASCADE_THRESHOLD"]) if os.environ.get("CASCADE_THRESHOLD") else None
+
+# Per-student sessions for /api/students/{id}/interactions: the last
+# SESSION_HISTORY_SIZE events and per-topic aggregates of each student, for at
+# most SESSION_MAX_STUDENTS students in memory. SESSION_STORE_PATH adds a
+# sqlite file that keeps them across restarts and evictions. With several
+# worker processes, SESSION_STORE_SHARED=1 makes that file the only copy
+# (serve.py sets it), so every worker sees every student's events.
+SESSION_HISTORY_SIZE = int(os.environ.get("SESSION_HISTORY_SIZE", "20"))
+SESSION_MAX_STUDENTS = int(os.environ.get("SESSION_MAX_STUDENTS", "100000"))
+SESSION_STORE_PATH = os.environ.get("SESSION_STORE_PATH") or None
+SESSION_STORE_SHARED = os.environ.get("SESSION_STORE_SHARED", "0") == "1"
+
+# Model registry: new artifact versions in MODEL_DIR are picked up every
+# MODEL_POLL_S seconds (0 disables), warmed up and swapped in without a
+# restart; MODEL_KEEP_VERSIONS stay loaded for instant rollback. With
+# MODEL_CANARY_PERCENT set, a new version first gets only that share of traffic.
+MODEL_DIR = "models/saved_models"
+MODEL_POLL_S = float(os.environ.get("MODEL_POLL_S", "30"))
+MODEL_KEEP_VERSIONS = int(os.environ.get("MODEL_KEEP_VERSIONS", "3"))
+MODEL_CANARY_PERCENT = float(os.environ.get("MODEL_CANARY_PERCENT", "0"))
+
+NLP_MODEL_KWARGS = {
+    "model_dir": MODEL_DIR,
+    "cache_size": EMBEDDING_CACHE_SIZE,
+    "cache_ttl": EMBEDDING_CACHE_TTL,
+    "cache_path": EMBEDDING_CACHE_PATH,
+    "encoder_backend": ENCODER_BACKEND,
+    "onnx_dir": ONNX_MODEL_DIR,
+    "encoder_threads": ENCODER_THREADS,
+    "compiled_forests": True,
+    "forest_threads": FOREST_THREADS,
+    "semantic_index": SEMANTIC_INDEX,
+    "similarity_threshold": SEMANTIC_INDEX_THRESHOLD,
+    "similar_k": SEMANTIC_INDEX_TOP_K,
+    "index_min_conf": SEMANTIC_INDEX_LEARN_CONF,
+    "cascade_threshold": CASCADE_THRESHOLD,
+}
+
+ADAPTIVE_MODEL_KWARGS = {
+    "model_dir": MODEL_DIR,
+    "use_lookup_table": RECOMMEND_LOOKUP_TABLE,
+    "compiled_forests": True,
+    "forest_threads": FOREST_THREADS,
+}
+
+# Load Models
+print("Loading models...")
+try:
+    nlp_model = QueryUnderstandingModel(**NLP_MODEL_KWARGS)
+    if not nlp_model.load_models():
+        print("Warning: NLP models not found. Predictions will fail.")
+
+    adaptive_model = AdaptiveLearningModel(**ADAPTIVE_MODEL_KWARGS)
+    if not adaptive_model.load_models():
+        print("Warning: Adaptive models not found. Recommendations will fail.")
+except Exception as e:
+    print(f"Error loading models: {e}")
+
+def warm_up_nlp(model):
+    model.predict_batch(["What is gradient descent?"])
+
+def warm_up_adaptive(model):
+    row = {"topic": model.topic_encoder.classes_[0], "difficulty": model.difficulty_encoder.classes_[0],
+           "score": 50.0, "attempts": 1, "time_spent": 10.0}
+    result = model.predict_batch([row])[0]
+    if "error" in result:
+        raise RuntimeError(result["error"])
+
+# Later NLP versions share the encoder, embedding cache and semantic index
+nlp_registry = ModelRegistry(
+    "nlp", lambda: QueryUnderstandingModel(**NLP_MODEL_KWARGS).share_resources(nlp_model), MODEL_DIR,
+    warmup=warm_up_nlp, confidence_key="intent_conf", keep=MODEL_KEEP_VERSIONS,
+    canary_percent=MODEL_CANARY_PERCENT,
+)
+adaptive_registry = ModelRegistry(
+    "adaptive", lambda: AdaptiveLearningModel(**ADAPTIVE_MODEL_KWARGS), MODEL_DIR,
+    warmup=warm_up_adaptive, confidence_key="action_conf", keep=MODEL_KEEP_VERSIONS,
+    canary_percent=MODEL_CANARY_PERCENT,
+)
+for registry, model in ((nlp_registry, nlp_model), (adaptive_registry, adaptive_model)):
+    if model.version is not None:
+        registry.add(model)
+MODEL_REGISTRIES = {"nlp": nlp_registry, "adaptive": adaptive_registry}
+
+# Micro-batching for /api/analyze: concurrent queries are encoded and
+# classified together instead of one at a time
+ANALYZE_MAX_BATCH_SIZE = int(os.environ.get("ANALYZE_MAX_BATCH_SIZE", "32"))
+ANALYZE_MAX_WAIT_MS = float(os.environ.get("ANALYZE_MAX_WAIT_MS", "5"))
+
+inference_pool = InferencePool.threads(
+    INFERENCE_THREADS,
+    max_pending=INFERENCE_MAX_PENDING,
+    timeout=INFERENCE_TIMEOUT_S,
+)
+
+if RECOMMEND_EXECUTOR == "process":
+    recommend_pool = InferencePool.processes(
+        RECOMMEND_PROCESSES,
+        initializer=load_process_model,
+        initargs=(AdaptiveLearningModel, ADAPTIVE_MODEL_KWARGS),
+        max_pending=INFERENCE_MAX_PENDING,
+        timeout=INFERENCE_TIMEOUT_S,
+        name="recommend",
+    )
+else:
+    recommend_pool = inference_pool
+
+def predict_versioned(registry, rows):
+    # Runs on an inference thread; one model version serves the whole call.
+    # Returns (results, stage timings, version).
+    version, model = registry.pick()
+    results, timings = call_timed(model.predict_batch, rows)
+    registry.observe(version, sum(timings.values()), results)
+    return results, timings, version
+
+async def predict_recommendations(rows, admit=True):
+    # admit=False when the caller (a batch stream) already holds a slot
+    if RECOMMEND_EXECUTOR != "process":
+        fn = functools.partial(predict_versioned, adaptive_registry)
+    else:
+        # The registry picks the version; the worker process loads it
+        version, _ = adaptive_registry.pick()
+        fn = functools.partial(call_process_model_timed, version, "predict_batch")
+    if admit:
+        output = await recommend_pool.run(fn, rows)
+    else:
+        output = await recommend_pool.wait(asyncio.get_running_loop().run_in_executor(recommend_pool.executor, fn, rows))
+    if RECOMMEND_EXECUTOR != "process":
+        return output
+    results, timings = output
+    adaptive_registry.observe(version, sum(timings.values()), results)
+    return results, timings, version
+
+def _analyze_batch(queries):
+    # Every query in a micro-batch gets the batch's stage timings
+    results, timings, version = predict_versioned(nlp_registry, queries)
+    return [(result, timings, version) for result in results]
+
+session_store = SessionStore(
+    history_size=SESSION_HISTORY_SIZE,
+    max_students=SESSION_MAX_STUDENTS,
+    disk_path=SESSION_STORE_PATH,
+    shared=SESSION_STORE_SHARED,
+)
+
+analyze_batcher = MicroBatcher(
+    _analyze_batch,
+    max_batch_size=ANALYZE_MAX_BATCH_SIZE,
+    max_wait_ms=ANALYZE_MAX_WAIT_MS,
+    executor=inference_pool.executor,
+)
+
+# How late the event loop runs its callbacks; grows when blocking work
+# sneaks onto the loop or the pool is too small for the load
+loop_lag = LoopLagMonitor()
+
+# Rows per predict_batch call on the /batch endpoints
+BATCH_CHUNK_SIZE = int(os.environ.get("BATCH_CHUNK_SIZE", "256"))
+
+@app.on_event("startup")
+async def start_loop_lag_monitor():
+    loop_lag.start()
+
+@app.on_event("startup")
+async def preload_encoder():
+    # Load the encoder in the background so the first /api/analyze does not
+    # pay for it, without delaying startup
+    if ENCODER_PRELOAD:
+        threading.Thread(target=nlp_model.load_encoder, daemon=True).start()
+
+@app.on_event("startup")
+async def watch_model_versions():
+    for registry in MODEL_REGISTRIES.values():
+        registry.watch(MODEL_POLL_S)
+
+@app.on_event("shutdown")
+async def save_semantic_index():
+    nlp_model.save_semantic_index()
+
+@app.on_event("shutdown")
+async def stop_model_watchers():
+    for registry in MODEL_REGISTRIES.values():
+        registry.stop()
+
+HTTP_REQUESTS = REGISTRY.counter("http_requests_total", "HTTP requests by route and status", ["route", "status"])
+HTTP_SECONDS = REGISTRY.histogram("http_request_seconds", "HTTP request latency by route", ["route"])
+INFERENCE_PENDING = REGISTRY.gauge("inference_pending", "Requests admitted to an inference pool", ["pool"])
+INFERENCE_REJECTED = REGISTRY.gauge("inference_rejected", "Requests rejected with 503 since startup", ["pool"])
+LOOP_LAG = REGISTRY.gauge("event_loop_lag_seconds", "Event-loop lag over the recent window", ["quantile"])
+
+@app.middleware("http")
+async def record_http_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # The route template, not the raw path, keeps label cardinality bounded
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    HTTP_REQUESTS.inc(route=route, status=response.status_code)
+    HTTP_SECONDS.observe(time.perf_counter() - start, route=route)
+    return response
+
+# Pydantic Models for API
+class QueryRequest(BaseModel):
+    query: str
+
+class AdaptiveRequest(BaseModel):
+    topic: str
+    difficulty: str
+    score: float
+    attempts: int
+    time_spent: float
+
+class ModelVersionRequest(BaseModel):
+    version: Optional[str] = None
+    percent: float = 0.0
+
+class InteractionRequest(BaseModel):
+    # topic and difficulty default to where the last recommendation sent the student
+    topic: Optional[str] = None
+    difficulty: Optional[str] = None
+    score: float
+    attempts: int
+    time_spent: float
+
+@app.get("/")
+async def read_root(request: Request):
+    return templates.TemplateResponse("index.html", {"request": request})
+
+# Prediction responses are serialized straight from the models' plain-Python
+# results (see responses.py); ?compact=1 returns short keys without the prose
+# fields. The response models only document the schemas.
+RESPONSE_DOCS = {
+    "nlp": {200: {"model": Union[AnalyzeResponse, CompactAnalyzeResponse]}},
+    "adaptive": {200: {"model": Union[RecommendResponse, CompactRecommendResponse]}},
+}
+
+class FastJSONResponse(JSONResponse):
+    # orjson when installed, without FastAPI's jsonable_encoder pass
+    def render(self, content):
+        return dumps(content)
+
+def prediction_response(kind, result, timings, version, compact=False):
+    headers = {"X-Model-Version": version}
+    if SERVER_TIMING and timings:
+        headers["Server-Timing"] = server_timing(timings)
+    return FastJSONResponse(compact_result(kind, result) if compact else result, headers=headers)
+
+@app.post("/api/analyze", responses=RESPONSE_DOCS["nlp"])
+async def analyze_query(request: QueryRequest, compact: bool = False):
+    if not request.query:
+        return {"error": "Query cannot be empty"}
+    
+    try:
+        with inference_pool.admit():
+            result, timings, version = await inference_pool.wait(analyze_batcher.submit(request.query))
+        return prediction_response("nlp", result, timings, version, compact)
+    except Overloaded as e:
+        return overloaded_response("nlp", e)
+    except asyncio.TimeoutError:
+        return timeout_response("nlp")
+    except Exception as e:
+        PREDICTION_ERRORS.inc(model="nlp", reason="exception")
+        return {"error": str(e)}
+
+@app.post("/api/recommend", responses=RESPONSE_DOCS["adaptive"])
+async def recommend_path(request: AdaptiveRequest, compact: bool = False):
+    try:
+        results, timings, version = await predict_recommendations([dict(request)])
+        return prediction_response("adaptive", results[0], timings, version, compact)
+    except Overloaded as e:
+        return overloaded_response("adaptive", e)
+    except asyncio.TimeoutError:
+        return timeout_response("adaptive")
+    except Exception as e:
+        PREDICTION_ERRORS.inc(model="adaptive", reason="exception")
+        return {"error": str(e)}
+
+@app.post("/api/students/{student_id}/interactions")
+async def record_interaction(student_id: str, request: InteractionRequest):
+    # Records one interaction and returns the recommendation for it together
+    # with the student's updated session
+    try:
+        topic, difficulty = session_store.resolve(student_id, request.topic, request.difficulty)
+    except KeyError as e:
+        return {"error": str(e.args[0])}
+    row = {**dict(request), "topic": topic, "difficulty": difficulty}
+    try:
+        results, timings, version = await predict_recommendations([row])
+    except Overloaded as e:
+        return overloaded_response("adaptive", e)
+    except asyncio.TimeoutError:
+        return timeout_response("adaptive")
+    except Exception as e:
+        PREDICTION_ERRORS.inc(model="adaptive", reason="exception")
+        return {"error": str(e)}
+    result = results[0]
+    if "error" in result:
+        return result
+    if session_store.disk_path:
+        session = await asyncio.get_running_loop().run_in_executor(None, session_store.record, student_id, row, result)
+    else:
+        session = session_store.record(student_id, row, result)
+    return prediction_response("adaptive", {**result, "topic": topic, "difficulty": difficulty, "session": session},
+                               timings, version)
+
+@app.get("/api/students/{student_id}")
+async def student_session(student_id: str):
+    session = session_store.get(student_id)
+    if session is None:
+        return JSONResponse({"error": f"No session for student '{student_id}'"}, status_code=404)
+    return session
+
+def overloaded_response(model, e):
+    PREDICTION_ERRORS.inc(model=model, reason="overloaded")
+    return JSONResponse({"error": str(e)}, status_code=503, headers={"Retry-After": str(e.retry_after)})
+
+def timeout_response(model):
+    PREDICTION_ERRORS.inc(model=model, reason="timeout")
+    return JSONResponse({"error": "Inference timed out"}, status_code=504)
+
+def parse_batch_rows(body):
+    # Accepts either a JSON array or NDJSON (one JSON object per line)
+    if body.lstrip().startswith(b"["):
+        yield from json.loads(body)
+        return
+    for line in body.splitlines():
+        if line.strip():
+            yield line
+
+def _json_line(obj):
+    return dumps(obj) + b"\n"
+
+async def stream_batch(request, schema, predict_chunk, pool, kind, compact=False):
+    # predict_chunk is awaited with a list of row dicts and runs them on
+    # pool. The whole stream holds one admission slot, taken before the body
+    # is read and released when the stream ends; chunks are bounded by the
+    # pool timeout. compact shortens each result as in prediction_response.
+    try:
+        admission = pool.admit()
+    except Overloaded as e:
+        return overloaded_response("batch", e)
+
+    # The body is read up front: the streamed response must not compete with
+    # the request for receive() messages
+    try:
+        body = await request.body()
+    except BaseException:
+        admission.release()
+        raise
+
+    async def generate():
+        index = 0
+        pending = []
+
+        async def flush():
+            valid = [(i, row) for i, row in pending if not isinstance(row, str)]
+            results = {}
+            if valid:
+                rows = [dict(row) for _, row in valid]
+                try:
+                    outputs = await predict_chunk(rows)
+                except asyncio.TimeoutError:
+                    outputs = [{"error": "Inference timed out"}] * len(valid)
+                except Exception as e:
+                    outputs = [{"error": str(e)}] * len(valid)
+                results = {i: out for (i, _), out in zip(valid, outputs)}
+            lines = []
+            for i, row in pending:
+                result = {"error": row} if isinstance(row, str) else results[i]
+                if compact:
+                    result = compact_result(kind, result)
+                lines.append(_json_line({"index": i, **result}))
+            pending.clear()
+            return b"".join(lines)
+
+        with admission:
+            try:
+                for raw in parse_batch_rows(body):
+                    try:
+                        data = json.loads(raw) if isinstance(raw, bytes) else raw
+                        row = schema(**data)
+                    except (ValueError, TypeError, ValidationError) as e:
+                        # Invalid rows are reported in place as an error string
+                        row = f"Invalid row: {e}"
+                    pending.append((index, row))
+                    index += 1
+                    if len(pending) >= BATCH_CHUNK_SIZE:
+                        yield await flush()
+            except ValueError as e:
+                # The body itself was a malformed JSON array
+                if pending:
+                    yield await flush()
+                yield _json_line({"error": f"Invalid JSON body: {e}"})
+                return
+            if pending:
+                yield await flush()
+
+    # The background task releases the slot if the stream never started
+    # (e.g. the client went away first); release() only counts once
+    return StreamingResponse(generate(), media_type="application/x-ndjson",
+                             background=BackgroundTask(admission.release))
+
+def _analyze_rows(rows):
+    queries = [row["query"] for row in rows]
+    results = iter(predict_versioned(nlp_registry, [q for q in queries if q])[0])
+    return [next(results) if q else {"error": "Query cannot be empty"} for q in queries]
+
+async def _analyze_chunk(rows):
+    return await inference_pool.wait(asyncio.get_running_loop().run_in_executor(inference_pool.executor, _analyze_rows, rows))
+
+async def _recommend_chunk(rows):
+    return (await predict_recommendations(rows, admit=False))[0]
+
+@app.post("/api/analyze/batch")
+async def analyze_batch(request: Request, compact: bool = False):
+    return await stream_batch(request, QueryRequest, _analyze_chunk, inference_pool, "nlp", compact)
+
+@app.post("/api/recommend/batch")
+async def recommend_batch(request: Request, compact: bool = False):
+    return await stream_batch(request, AdaptiveRequest, _recommend_chunk, recommend_pool, "adaptive", compact)
+
+@app.get("/metrics")
+async def metrics():
+    # Prometheus text format; pool and event-loop gauges are sampled here
+    pools = {"inference": inference_pool}
+    if recommend_pool is not inference_pool:
+        pools["recommend"] = recommend_pool
+    for name, pool in pools.items():
+        INFERENCE_PENDING.set(pool.pending, pool=name)
+        INFERENCE_REJECTED.set(pool.rejected, pool=name)
+    lag = loop_lag.stats()
+    LOOP_LAG.set(lag["p50_ms"] / 1000.0, quantile="0.5")
+    LOOP_LAG.set(lag["p99_ms"] / 1000.0, quantile="0.99")
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/models")
+async def model_versions():
+    return {kind: registry.stats() for kind, registry in MODEL_REGISTRIES.items()}
+
+def model_registry_or_404(kind):
+    registry = MODEL_REGISTRIES.get(kind)
+    if registry is None:
+        return None, JSONResponse({"error": f"Unknown model '{kind}'"}, status_code=404)
+    return registry, None
+
+@app.post("/api/models/{kind}/activate")
+async def activate_model_version(kind: str, request: ModelVersionRequest):
+    # Loads the version first if it is not resident (warm-up included)
+    registry, error = model_registry_or_404(kind)
+    if error:
+        return error
+    if not request.version:
+        return JSONResponse({"error": "version is required"}, status_code=400)
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, registry.load, request.version)
+        registry.activate(request.version)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return registry.stats()
+
+@app.post("/api/models/{kind}/canary")
+async def set_canary_version(kind: str, request: ModelVersionRequest):
+    # version null or percent 0 stops the canary
+    registry, error = model_registry_or_404(kind)
+    if error:
+        return error
+    try:
+        if request.version is not None:
+            await asyncio.get_running_loop().run_in_executor(None, registry.load, request.version)
+        registry.set_canary(request.version, request.percent)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return registry.stats()
+
+@app.post("/api/models/{kind}/rollback")
+async def rollback_model_version(kind: str):
+    registry, error = model_registry_or_404(kind)
+    if error:
+        return error
+    try:
+        registry.rollback()
+    except NotResident as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return registry.stats()
+
+@app.post("/api/models/{kind}/reload")
+async def reload_model_versions(kind: str):
+    # Checks for new versions now instead of waiting for the next poll
+    registry, error = model_registry_or_404(kind)
+    if error:
+        return error
+    loaded = await asyncio.get_running_loop().run_in_executor(None, registry.poll)
+    return {"loaded": loaded, **registry.stats()}
+
+@app.get("/api/stats/batching")
+async def batching_stats():
+    return analyze_batcher.stats()
+
+@app.get("/api/stats/inference")
+async def inference_stats():
+    stats = {"inference": inference_pool.stats(), "event_loop_lag": loop_lag.stats()}
+    if recommend_pool is not inference_pool:
+        stats["recommend"] = recommend_pool.stats()
+    return stats
+
+@app.get("/api/stats/embedding_cache")
+async def embedding_cache_stats():
+    return nlp_model.embedding_cache.stats()
+
+@app.get("/api/stats/sessions")
+async def session_stats():
+    return session_store.stats()
+
+@app.get("/api/stats/semantic_index")
+async def semantic_index_stats():
+    if nlp_model.semantic_index is None:
+        return {"enabled": False}
+    return {"enabled": True, "threshold": nlp_model.similarity_threshold, **nlp_model.semantic_index.stats()}
+
+@app.get("/api/stats/cascade")
+async def cascade_stats():
+    # Counts of the active NLP version since it was loaded
+    model = nlp_registry.model() or nlp_model
+    counts = model.cascade_counts
+    total = counts["lexical"] + counts["escalated"]
+    return {
+        "enabled": model.cascade_threshold is not None and model.lexical_model is not None,
+        "threshold": model.cascade_threshold,
+        **counts,
+        "escalation_rate": counts["escalated"] / total if total else None,
+    }
+
+@app.get("/api/stats/recommend_table")
+async def recommend_table_stats():
+    model = adaptive_registry.model() or adaptive_model
+    lookup_table = model.lookup_table
+    if lookup_table is None:
+        return {"enabled": False}
+    return {"enabled": True, **lookup_table.stats()}
+
+if __name__ == "__main__":
+    uvicorn.run("app:app", host="127.0.0.1", port=8000, reload=True)
@@ -0,0 +1,112 @@
+import asyncio
+import time
+
+
+class MicroBatcher:
+    """Collects concurrent requests into small batches for a batch predict function.
+
+    Callers await submit(item). A single background task drains the queue,
+    waiting at most max_wait_ms (or until max_batch_size items arrived) before
+    running predict_batch(items) off the event loop and handing each caller
+    its own result.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=32, max_wait_ms=5.0, executor=None):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.executor = executor
+
+        self._queue = None
+        self._worker = None
+
+        # Metrics
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+        self.last_batch_size = 0
+        self.max_batch_seen = 0
+        self.batch_size_counts = {}
+        self.total_batch_seconds = 0.0
+
+    def _ensure_worker(self):
+        # The queue and worker must be created on the running loop
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, item):
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        # Anything already queued rides along for free
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            # Skip callers that gave up (cancelled / timed out) while queued
+            batch = [(item, fut) for item, fut in batch if not fut.done()]
+            if not batch:
+                continue
+
+            items = [item for item, _ in batch]
+            start = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(self.executor, self.predict_batch, items)
+            except Exception as e:
+                self.errors += 1
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            finally:
+                self._record(len(batch), time.perf_counter() - start)
+
+            for (_, fut), result in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(result)
+
+    def _record(self, size, seconds):
+        self.batches += 1
+        self.items += size
+        self.last_batch_size = size
+        self.max_batch_seen = max(self.max_batch_seen, size)
+        self.batch_size_counts[size] = self.batch_size_counts.get(size, 0) + 1
+        self.total_batch_seconds += seconds
+
+    def queue_depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self.queue_depth(),
+            "batches": self.batches,
+            "items": self.items,
+            "errors": self.errors,
+            "last_batch_size": self.last_batch_size,
+            "max_batch_size_seen": self.max_batch_seen,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "avg_batch_ms": 1000.0 * self.total_batch_seconds / self.batches if self.batches else 0.0,
+            "batch_size_counts": dict(sorted(self.batch_size_counts.items())),
+        }
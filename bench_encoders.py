@@ -0,0 +1,100 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+def current_rss_mb():
+    # Resident set size of this process (Linux), falling back to peak RSS
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure_backend(backend, model_name, onnx_dir, data_path, n_queries, batch_size):
+    # Runs inside a fresh interpreter so startup time and RSS are not
+    # polluted by other backends
+    rss_start = current_rss_mb()
+    start = time.perf_counter()
+    from models.encoder_backends import create_encoder
+    encoder = create_encoder(backend, model_name, onnx_dir=onnx_dir)
+    encoder.encode(["warm up"])
+    startup_seconds = time.perf_counter() - start
+    rss_loaded = current_rss_mb()
+
+    import numpy as np
+    import pandas as pd
+    queries = pd.read_csv(data_path)['query'].tolist()[:n_queries]
+
+    latencies = []
+    for q in queries:
+        t = time.perf_counter()
+        encoder.encode([q])
+        latencies.append(time.perf_counter() - t)
+
+    t = time.perf_counter()
+    for i in range(0, len(queries), batch_size):
+        encoder.encode(queries[i:i + batch_size])
+    batch_seconds = time.perf_counter() - t
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "backend": backend,
+        "startup_seconds": round(startup_seconds, 3),
+        "rss_mb_before_load": round(rss_start, 1),
+        "rss_mb_after_load": round(rss_loaded, 1),
+        "rss_mb_after_run": round(current_rss_mb(), 1),
+        "single_query_ms_p50": round(float(np.percentile(latencies_ms, 50)), 3),
+        "single_query_ms_p95": round(float(np.percentile(latencies_ms, 95)), 3),
+        "batch_size": batch_size,
+        "batch_queries_per_second": round(len(queries) / batch_seconds, 1) if batch_seconds else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare query encoder backends")
+    parser.add_argument("--backends", nargs="+", default=["sentence-transformers", "onnx", "onnx-int8"])
+    parser.add_argument("--model-name", default="all-MiniLM-L6-v2")
+    parser.add_argument("--onnx-dir", default=None)
+    parser.add_argument("--data", default="data/synthetic_queries.csv")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--export", action="store_true", help="export the ONNX models before benchmarking")
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = measure_backend(args.worker, args.model_name, args.onnx_dir, args.data, args.queries, args.batch_size)
+        print(json.dumps(result))
+        return
+
+    if args.export:
+        from models.encoder_backends import export_onnx
+        export_onnx(args.model_name, args.onnx_dir)
+
+    results = []
+    for backend in args.backends:
+        cmd = [sys.executable, os.path.abspath(__file__), "--worker", backend,
+               "--model-name", args.model_name, "--data", args.data,
+               "--queries", str(args.queries), "--batch-size", str(args.batch_size)]
+        if args.onnx_dir:
+            cmd += ["--onnx-dir", args.onnx_dir]
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            results.append({"backend": backend, "error": proc.stderr.strip().splitlines()[-1:]})
+            continue
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from bench_encoders import current_rss_mb
+
+# Benchmark suite that needs no running server or network:
+#
+#   micro   model load time, extract_keywords, encoder latency, single
+#           versus batch forest inference for both modules, and response
+#           serialization (FastAPI's generic encoder against responses.dumps)
+#   load    an in-process load generator: httpx's ASGI transport against
+#           app.app, replaying a mix of queries and interactions from the
+#           synthetic CSVs at each concurrency level
+#
+# The JSON report can be saved as a baseline; later runs are compared against
+# it and exit non-zero when any metric regresses by more than --tolerance.
+
+DEFAULT_BASELINE = "benchmark_baseline.json"
+
+# Changes smaller than this are timer noise, whatever the percentage
+NOISE_FLOOR = {"_ms": 1.0, "_us_per_call": 1.0, "_seconds": 0.01}
+
+
+def percentiles_ms(seconds):
+    ms = np.array(seconds) * 1000
+    return {f"p{q}_ms": round(float(np.percentile(ms, q)), 3) for q in (50, 95, 99)}
+
+
+def time_calls(fn, args_list):
+    times = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def run_micro(queries_path, interactions_path, repeats, batch_size):
+    from models.adaptive_module import AdaptiveLearningModel
+    from models.nlp_module import QueryUnderstandingModel
+
+    report = {}
+    queries = pd.read_csv(queries_path)['query'].tolist()
+    interactions = pd.read_csv(interactions_path)
+
+    start = time.perf_counter()
+    nlp_model = QueryUnderstandingModel(compiled_forests=True)
+    nlp_model.load_models()
+    report["nlp_load_seconds"] = round(time.perf_counter() - start, 4)
+
+    start = time.perf_counter()
+    adaptive_model = AdaptiveLearningModel(compiled_forests=True)
+    adaptive_model.load_models()
+    report["adaptive_load_seconds"] = round(time.perf_counter() - start, 4)
+
+    start = time.perf_counter()
+    nlp_model.load_encoder()
+    nlp_model.encoder.encode(["warm up"])
+    report["encoder_load_seconds"] = round(time.perf_counter() - start, 4)
+
+    sample = queries[:repeats]
+    times = time_calls(nlp_model.extract_keywords, [(q,) for q in sample])
+    report["extract_keywords_us_per_call"] = round(1e6 * float(np.mean(times)), 3)
+
+    times = time_calls(nlp_model.encoder.encode, [([q],) for q in sample])
+    report["encoder_single"] = percentiles_ms(times)
+    batches = [(queries[i:i + batch_size],) for i in range(0, len(queries), batch_size)][:max(1, repeats // 10)]
+    times = time_calls(nlp_model.encoder.encode, batches)
+    report["encoder_batch_queries_per_second"] = round(sum(len(b[0]) for b in batches) / sum(times), 1)
+
+    X = nlp_model.encoder.encode(queries[:batch_size])
+    times = time_calls(nlp_model.predict_labels, [(X[i % len(X):i % len(X) + 1],) for i in range(repeats)])
+    report["nlp_forest_single"] = percentiles_ms(times)
+    times = time_calls(nlp_model.predict_labels, [(X,)] * max(3, repeats // 10))
+    report["nlp_forest_batch_rows_per_second"] = round(len(X) * len(times) / sum(times), 1)
+
+    rows = interactions.head(batch_size)
+    times = time_calls(adaptive_model.predict_batch, [(rows.iloc[i % len(rows):i % len(rows) + 1],) for i in range(repeats)])
+    report["adaptive_forest_single"] = percentiles_ms(times)
+    times = time_calls(adaptive_model.predict_batch, [(rows,)] * max(3, repeats // 10))
+    report["adaptive_forest_batch_rows_per_second"] = round(len(rows) * len(times) / sum(times), 1)
+
+    report["response_encode"] = run_response_encode(
+        {"nlp": nlp_model.predict_batch(queries[:1])[0], "adaptive": adaptive_model.predict_batch(rows.head(1))[0]},
+        repeats)
+    return report
+
+
+def run_response_encode(results, repeats):
+    # Per-response serialization cost at batch size 1: what FastAPI does with
+    # a returned dict (jsonable_encoder, then json.dumps) against the
+    # responses.dumps path, in full and compact form
+    from fastapi.encoders import jsonable_encoder
+    from models.responses import compact_result, dumps
+
+    def generic(result):
+        json.dumps(jsonable_encoder(result), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    report = {}
+    for kind, result in results.items():
+        for name, fn in (("jsonable_encoder", generic), ("dumps", dumps),
+                         ("dumps_compact", lambda r: dumps(compact_result(kind, r)))):
+            times = time_calls(fn, [(result,)] * repeats)
+            report[f"{kind}_{name}_us_per_call"] = round(1e6 * float(np.mean(times)), 3)
+        report[f"{kind}_response_bytes"] = len(dumps(result))
+        report[f"{kind}_compact_response_bytes"] = len(dumps(compact_result(kind, result)))
+    return report
+
+
+def request_mix(queries_path, interactions_path, n, analyze_fraction, seed=0, compact=False):
+    # (path, json body) pairs drawn from the synthetic data
+    suffix = "?compact=1" if compact else ""
+    rng = random.Random(seed)
+    queries = pd.read_csv(queries_path)['query'].tolist()
+    columns = ['topic', 'difficulty', 'score', 'attempts', 'time_spent']
+    interactions = pd.read_csv(interactions_path)[columns].to_dict('records')
+    mix = []
+    for _ in range(n):
+        if rng.random() < analyze_fraction:
+            mix.append(("/api/analyze" + suffix, {"query": rng.choice(queries)}))
+        else:
+            row = rng.choice(interactions)
+            mix.append(("/api/recommend" + suffix, {k: v.item() if hasattr(v, "item") else v for k, v in row.items()}))
+    return mix
+
+
+async def run_load_level(client, mix, concurrency):
+    latencies = []
+    statuses = {}
+    requests = iter(mix)
+
+    async def worker():
+        for path, body in requests:
+            start = time.perf_counter()
+            response = await client.post(path, json=body)
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "throughput_requests_per_second": round(len(latencies) / elapsed, 1),
+        **percentiles_ms(latencies),
+        "status_codes": {str(code): count for code, count in sorted(statuses.items())},
+        "rss_mb": round(current_rss_mb(), 1),
+    }
+
+
+async def run_load(queries_path, interactions_path, concurrency_levels, n_requests, analyze_fraction, compact=False):
+    import httpx
+
+    # The encoder is warmed explicitly below instead of in a background thread
+    os.environ.setdefault("ENCODER_PRELOAD", "0")
+    import app
+
+    app.loop_lag.start()
+    app.nlp_model.load_encoder()
+    mix = request_mix(queries_path, interactions_path, n_requests, analyze_fraction, compact=compact)
+    transport = httpx.ASGITransport(app=app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        await run_load_level(client, mix[:min(50, len(mix))], 4)
+        levels = {}
+        for concurrency in concurrency_levels:
+            levels[f"c{concurrency}"] = await run_load_level(client, mix, concurrency)
+    levels["event_loop_lag"] = app.loop_lag.stats()
+    return levels
+
+
+def flatten(report, prefix=""):
+    out = {}
+    for key, value in report.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            out.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            out[name] = value
+    return out
+
+
+def direction(metric):
+    # +1: higher is better, -1: lower is better, 0: not compared
+    name = metric.rsplit(".", 1)[-1]
+    if name.endswith("_per_second"):
+        return 1
+    if name.endswith(("_ms", "_us_per_call", "_seconds", "rss_mb")):
+        return -1
+    return 0
+
+
+def compare(report, baseline, tolerance):
+    # Metrics worse than baseline by more than tolerance (a fraction)
+    current, previous = flatten(report), flatten(baseline)
+    regressions = []
+    for metric, old in previous.items():
+        sign = direction(metric)
+        new = current.get(metric)
+        if not sign or new is None or old <= 0:
+            continue
+        change = (new - old) / old * sign
+        floor = next((v for suffix, v in NOISE_FLOOR.items() if metric.endswith(suffix)), 0)
+        if change < -tolerance and abs(new - old) >= floor:
+            regressions.append({"metric": metric, "baseline": old, "current": new,
+                                "change_pct": round(100 * change, 1)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks and in-process load test")
+    parser.add_argument("--queries", default="data/synthetic_queries.csv")
+    parser.add_argument("--interactions", default="data/synthetic_interactions.csv")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--skip-load", action="store_true")
+    parser.add_argument("--repeats", type=int, default=200, help="calls per micro-benchmark")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=500, help="requests per concurrency level")
+    parser.add_argument("--analyze-fraction", type=float, default=0.5)
+    parser.add_argument("--compact", action="store_true", help="load test with compact responses (?compact=1)")
+    parser.add_argument("--output", default=None, help="also write the report to this file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown before a metric counts as a regression (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+    }
+    if not args.skip_micro:
+        report["micro"] = run_micro(args.queries, args.interactions, args.repeats, args.batch_size)
+    if not args.skip_load:
+        report["load"] = asyncio.run(run_load(args.queries, args.interactions, args.concurrency,
+                                              args.requests, args.analyze_fraction, args.compact))
+    report["rss_mb"] = round(current_rss_mb(), 1)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}", file=sys.stderr)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            report["regressions"] = compare(report, json.load(f), args.tolerance)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+
+    if report.get("regressions"):
+        print(f"\nREGRESSION: {len(report['regressions'])} metric(s) worse than {args.baseline} "
+              f"by more than {args.tolerance:.0%}:", file=sys.stderr)
+        for r in report["regressions"]:
+            print(f"  {r['metric']}: {r['baseline']} -> {r['current']} ({r['change_pct']}%)", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from models.lexical import LexicalClassifier
+from models.nlp_module import QueryUnderstandingModel
+
+# Measures the lexical cascade on a held-out split. For each threshold it
+# reports the share of queries escalated to the encoder, the accuracy change
+# against the full encoder + forest path (threshold None), and the
+# per-query latency saved.
+
+
+def per_query_ms(model, queries):
+    # One predict_batch call per query, as the API sees them
+    times = []
+    for query in queries:
+        start = time.perf_counter()
+        model.predict_batch([query])
+        times.append(time.perf_counter() - start)
+    ms = np.array(times) * 1000
+    return round(float(ms.mean()), 3), round(float(np.percentile(ms, 50)), 3), round(float(np.percentile(ms, 99)), 3)
+
+
+def evaluate(data_path, thresholds, repeats, test_size=0.2):
+    df = pd.read_csv(data_path)
+    train_df, test_df = train_test_split(df, test_size=test_size, random_state=42)
+    label_names = [name for name, _ in QueryUnderstandingModel.CLASSIFIERS]
+
+    # No embedding cache: the templates repeat, and cache hits would hide the
+    # encoder cost the cascade is meant to save
+    model = QueryUnderstandingModel(cache_size=0, compiled_forests=True)
+    print("Training the encoder + forest path...")
+    model.fit(model.encode(train_df['query'].tolist()), train_df)
+    model.compile_forests()
+    print("Training the lexical model...")
+    model.lexical_model = LexicalClassifier().fit(train_df['query'], train_df[label_names].values)
+
+    queries = test_df['query'].tolist()
+    sample = queries[:repeats]
+    model.predict_batch(sample[:8])
+
+    report = []
+    for threshold in [None] + list(thresholds):
+        model.cascade_threshold = threshold
+        model.cascade_counts = {"lexical": 0, "escalated": 0}
+        start = time.perf_counter()
+        results = model.predict_batch(queries)
+        batch_ms = (time.perf_counter() - start) * 1000
+        escalated = model.cascade_counts["escalated"] if threshold is not None else len(queries)
+        mean_ms, p50_ms, p99_ms = per_query_ms(model, sample)
+        report.append({
+            "threshold": threshold,
+            "escalation_rate": round(escalated / len(queries), 4),
+            "accuracy": {name: round(float(np.mean(np.array([r[name] for r in results]) == test_df[name].values)), 4)
+                         for name in label_names},
+            "latency_ms_mean": mean_ms,
+            "latency_ms_p50": p50_ms,
+            "latency_ms_p99": p99_ms,
+            f"latency_ms_batch{len(queries)}": round(batch_ms, 3),
+        })
+
+    full = report[0]
+    for row in report[1:]:
+        row["accuracy_delta"] = {name: round(row["accuracy"][name] - full["accuracy"][name], 4) for name in label_names}
+        row["latency_saved_pct"] = round(100 * (1 - row["latency_ms_mean"] / full["latency_ms_mean"]), 1)
+    return {
+        "data": data_path,
+        "test_rows": len(test_df),
+        "lexical_model_bytes": int(model.lexical_model.nbytes()),
+        "thresholds": report,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Escalation rate, accuracy and latency of the lexical cascade")
+    parser.add_argument("--queries", default="data/synthetic_queries.csv")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.5, 0.7, 0.8, 0.9, 0.95])
+    parser.add_argument("--repeats", type=int, default=200, help="queries timed one at a time per threshold")
+    args = parser.parse_args()
+
+    print(json.dumps(evaluate(args.queries, args.thresholds, args.repeats), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from models.adaptive_module import AdaptiveLearningModel
+from models.evaluation import ADAPTIVE_LABEL_COLUMNS, median_ms, model_nbytes
+from models.nlp_module import QueryUnderstandingModel
+
+# Compares the three-forest setup against the multi-head modes on a held-out
+# split: per-target accuracy, training time, classification latency and
+# model size.
+
+
+def compare_nlp(data_path, modes, repeats, test_size=0.2):
+    df = pd.read_csv(data_path)
+    train_df, test_df = train_test_split(df, test_size=test_size, random_state=42)
+    encoder_model = QueryUnderstandingModel()
+    X_train = encoder_model.encode(train_df['query'].tolist())
+    X_test = encoder_model.encode(test_df['query'].tolist())
+
+    report = []
+    for mode in modes:
+        model = QueryUnderstandingModel(head_mode=mode, compiled_forests=True)
+        start = time.perf_counter()
+        model.fit(X_train, train_df)
+        train_seconds = time.perf_counter() - start
+        model.compile_forests()
+
+        predictions = model.predict_labels(X_test)
+        accuracy = {name: round(float(np.mean(labels == test_df[name].values)), 4)
+                    for (name, _), (labels, _) in zip(model.CLASSIFIERS, predictions)}
+        report.append({
+            "module": "nlp",
+            "mode": mode,
+            "accuracy": accuracy,
+            "train_seconds": round(train_seconds, 3),
+            "latency_ms_batch1": median_ms(lambda: model.predict_labels(X_test[:1]), repeats),
+            f"latency_ms_batch{len(X_test)}": median_ms(lambda: model.predict_labels(X_test), max(3, repeats // 10)),
+            "size_bytes": model_nbytes(model, [attr for _, attr in model.CLASSIFIERS]),
+        })
+    return report
+
+
+def compare_adaptive(data_path, modes, repeats, test_size=0.2):
+    df = pd.read_csv(data_path)
+    train_df, test_df = train_test_split(df, test_size=test_size, random_state=42)
+
+    report = []
+    for mode in modes:
+        model = AdaptiveLearningModel(head_mode=mode, compiled_forests=True)
+        start = time.perf_counter()
+        model.fit(train_df)
+        train_seconds = time.perf_counter() - start
+        model.compile_forests()
+
+        results = model.predict_batch(test_df)
+        accuracy = {}
+        for name, column in ADAPTIVE_LABEL_COLUMNS.items():
+            predicted = np.array([r.get(name) for r in results], dtype=object)
+            accuracy[name] = round(float(np.mean(predicted == test_df[column].values)), 4)
+        report.append({
+            "module": "adaptive",
+            "mode": mode,
+            "accuracy": accuracy,
+            "train_seconds": round(train_seconds, 3),
+            "latency_ms_batch1": median_ms(lambda: model.predict_batch(test_df.head(1)), repeats),
+            f"latency_ms_batch{len(test_df)}": median_ms(lambda: model.predict_batch(test_df), max(3, repeats // 10)),
+            "size_bytes": model_nbytes(model, [attr for _, attr, _ in model.TARGETS]),
+        })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare separate forests with multi-head models")
+    parser.add_argument("--queries", default="data/synthetic_queries.csv")
+    parser.add_argument("--interactions", default="data/synthetic_interactions.csv")
+    parser.add_argument("--nlp-modes", nargs="+", default=['separate', 'multi_forest', 'linear'])
+    parser.add_argument("--adaptive-modes", nargs="+", default=['separate', 'multi_forest', 'hist_gbdt'])
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    report = compare_nlp(args.queries, args.nlp_modes, args.repeats)
+    report += compare_adaptive(args.interactions, args.adaptive_modes, args.repeats)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is optional
+    pa = pq = None
+
+# Shared by the data generators: seeded, sharded chunk generation and
+# streamed CSV/Parquet output, so only a few chunks are ever in memory.
+
+
+def chunk_seeds(seed, n_chunks):
+    # One independent np.random.Generator seed per chunk: the output depends
+    # only on seed and chunk layout, never on how many workers produced it
+    return np.random.SeedSequence(seed).spawn(n_chunks)
+
+
+def generate_chunks(make_chunk, tasks, workers=1):
+    # Yields make_chunk(*task) for each task, in order. With workers > 1 the
+    # chunks are built in spawned processes, at most 2 * workers ahead of
+    # the consumer.
+    if workers <= 1:
+        for task in tasks:
+            yield make_chunk(*task)
+        return
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        window = deque()
+        for task in tasks:
+            window.append(pool.submit(make_chunk, *task))
+            if len(window) >= 2 * workers:
+                yield window.popleft().result()
+        while window:
+            yield window.popleft().result()
+
+
+def _plain_strings(table):
+    # Categorical columns become plain string columns (Parquet still
+    # dictionary-encodes them on disk) so readers get ordinary values back
+    fields = [pa.field(f.name, pa.string()) if pa.types.is_dictionary(f.type) else f for f in table.schema]
+    return table.cast(pa.schema(fields))
+
+
+def write_chunks(frames, output_path):
+    # Streams DataFrames to a .csv or .parquet file; returns the row count
+    directory = os.path.dirname(output_path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    rows = 0
+    if output_path.endswith((".parquet", ".pq")):
+        if pq is None:
+            raise ImportError("Writing Parquet needs pyarrow (pip install pyarrow)")
+        writer = None
+        try:
+            for frame in frames:
+                table = _plain_strings(pa.Table.from_pandas(frame, preserve_index=False))
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, table.schema)
+                writer.write_table(table)
+                rows += len(frame)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        header = True
+        for frame in frames:
+            frame.to_csv(output_path, mode="w" if header else "a", header=header, index=False)
+            header = False
+            rows += len(frame)
+    return rows
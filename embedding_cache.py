@@ -0,0 +1,181 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# sqlite tier used by the app and the training scripts unless configured
+DEFAULT_CACHE_PATH = "models/saved_models/embedding_cache.sqlite"
+
+
+def normalize_query(text):
+    # all-MiniLM-L6-v2 uses an uncased tokenizer that ignores runs of
+    # whitespace, so case and spacing never change the embedding
+    return " ".join(str(text).lower().split())
+
+
+class EmbeddingCache:
+    """Content-addressed cache of query embeddings.
+
+    Keys are a hash of the normalized query text and the encoder namespace
+    (model name), so different encoders never share entries. Lookups go to an
+    in-memory LRU tier first (bounded by max_entries, optional TTL), then to an
+    optional sqlite file that survives restarts and can be shared by several
+    uvicorn workers.
+    """
+
+    SQLITE_BATCH = 500
+
+    def __init__(self, namespace, max_entries=10000, ttl_seconds=None, disk_path=None):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_path = disk_path
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if disk_path:
+            self._open_disk(disk_path)
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _open_disk(self, path):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        # WAL lets several worker processes read while one writes
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, namespace TEXT, dim INTEGER, vector BLOB, created REAL)"
+        )
+        self._db.commit()
+
+    def reopen(self):
+        # New sqlite connection, e.g. in a worker forked after the cache was
+        # created: a connection must not be used on both sides of a fork
+        if self.disk_path:
+            self._open_disk(self.disk_path)
+
+    def key(self, text):
+        return hashlib.sha1(f"{self.namespace}\0{normalize_query(text)}".encode("utf-8")).hexdigest()
+
+    def _memory_get(self, key, now):
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        vector, expires_at = entry
+        if expires_at is not None and expires_at <= now:
+            del self._memory[key]
+            self.expirations += 1
+            return None
+        self._memory.move_to_end(key)
+        return vector
+
+    def _memory_put(self, key, vector, now):
+        expires_at = now + self.ttl_seconds if self.ttl_seconds else None
+        self._memory[key] = (vector, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_get(self, keys):
+        found = {}
+        for i in range(0, len(keys), self.SQLITE_BATCH):
+            chunk = keys[i:i + self.SQLITE_BATCH]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._db.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def _disk_put(self, items):
+        now = time.time()
+        self._db.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, namespace, dim, vector, created) VALUES (?, ?, ?, ?, ?)",
+            [(key, self.namespace, len(vector), vector.tobytes(), now) for key, vector in items],
+        )
+        self._db.commit()
+
+    def encode(self, texts, encode_fn):
+        # Returns a float32 matrix for texts; only texts missing from both
+        # tiers are passed (deduplicated) to encode_fn
+        texts = list(texts)
+        keys = [self.key(t) for t in texts]
+        vectors = {}
+        now = time.monotonic()
+
+        with self._lock:
+            for key in keys:
+                if key not in vectors:
+                    vector = self._memory_get(key, now)
+                    if vector is not None:
+                        vectors[key] = vector
+            self.hits += sum(1 for k in keys if k in vectors)
+
+            missing = list(dict.fromkeys(k for k in keys if k not in vectors))
+            if missing and self._db is not None:
+                on_disk = self._disk_get(missing)
+                for key, vector in on_disk.items():
+                    vectors[key] = vector
+                    self._memory_put(key, vector, now)
+                self.disk_hits += sum(1 for k in keys if k in on_disk)
+                missing = [k for k in missing if k not in on_disk]
+
+        if missing:
+            first_text = {}
+            for key, text in zip(keys, texts):
+                first_text.setdefault(key, text)
+            encoded = np.asarray(encode_fn([first_text[k] for k in missing]), dtype=np.float32)
+            with self._lock:
+                missing_set = set(missing)
+                self.misses += sum(1 for k in keys if k in missing_set)
+                for key, vector in zip(missing, encoded):
+                    vectors[key] = vector
+                    self._memory_put(key, vector, now)
+                if self._db is not None:
+                    self._disk_put(list(zip(missing, encoded)))
+
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([vectors[k] for k in keys])
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self):
+        with self._lock:
+            disk_entries = None
+            if self._db is not None:
+                disk_entries = self._db.execute(
+                    "SELECT COUNT(*) FROM embeddings WHERE namespace = ?", (self.namespace,)
+                ).fetchone()[0]
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "namespace": self.namespace,
+                "memory_entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "disk_path": self.disk_path,
+                "disk_entries": disk_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
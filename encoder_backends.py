@@ -0,0 +1,135 @@
+import os
+
+import numpy as np
+
+# Heavy libraries (torch, sentence-transformers, onnxruntime) are imported
+# inside the backends so importing this module stays cheap.
+
+BACKENDS = ['sentence-transformers', 'onnx', 'onnx-int8']
+
+ONNX_FILES = {
+    'onnx': 'model.onnx',
+    'onnx-int8': 'model_quantized.onnx',
+}
+
+
+class SentenceTransformerEncoder:
+    name = 'sentence-transformers'
+
+    def __init__(self, model_name, device=None, threads=None):
+        if threads:
+            # Process-wide: torch has a single intra-op thread pool
+            import torch
+            torch.set_num_threads(threads)
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device=device)
+
+    def encode(self, texts, show_progress_bar=False, batch_size=32):
+        return self.model.encode(texts, show_progress_bar=show_progress_bar, batch_size=batch_size)
+
+
+class OnnxEncoder:
+    """Runs an exported transformer with onnxruntime on CPU.
+
+    Reproduces the sentence-transformers pipeline for all-MiniLM-L6-v2:
+    tokenize, run the transformer, mean-pool over the attention mask and L2
+    normalize. model_dir must contain the .onnx file and tokenizer.json, as
+    written by export_onnx().
+    """
+
+    def __init__(self, model_dir, file_name='model.onnx', max_length=256, normalize=True, intra_op_threads=None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.name = 'onnx-int8' if file_name == ONNX_FILES['onnx-int8'] else 'onnx'
+        self.normalize = normalize
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, 'tokenizer.json'))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, file_name), options, providers=['CPUExecutionProvider']
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(self, texts, show_progress_bar=False, batch_size=32):
+        if isinstance(texts, str):
+            texts = [texts]
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer.encode_batch(list(texts[start:start + batch_size]))
+            feed = {
+                'input_ids': np.array([e.ids for e in encoded], dtype=np.int64),
+                'attention_mask': np.array([e.attention_mask for e in encoded], dtype=np.int64),
+                'token_type_ids': np.array([e.type_ids for e in encoded], dtype=np.int64),
+            }
+            token_embeddings = self.session.run(None, {k: v for k, v in feed.items() if k in self.input_names})[0]
+
+            # Mean pooling over real (non-padding) tokens
+            mask = feed['attention_mask'][:, :, None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if self.normalize:
+                pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            outputs.append(pooled.astype(np.float32))
+        if not outputs:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.vstack(outputs)
+
+
+def create_encoder(backend, model_name, onnx_dir=None, threads=None):
+    # threads: intra-op threads (None: the library default)
+    if backend == 'sentence-transformers':
+        return SentenceTransformerEncoder(model_name, threads=threads)
+    if backend in ONNX_FILES:
+        onnx_dir = onnx_dir or default_onnx_dir(model_name)
+        return OnnxEncoder(onnx_dir, file_name=ONNX_FILES[backend], intra_op_threads=threads)
+    raise ValueError(f"Unknown encoder backend '{backend}'. Choose from {BACKENDS}")
+
+
+def default_onnx_dir(model_name, model_dir='models/saved_models'):
+    return os.path.join(model_dir, 'onnx', model_name.replace('/', '_'))
+
+
+def export_onnx(model_name, out_dir=None, quantize=True, opset=14):
+    # One-off export of the sentence-transformers model to ONNX (plus a
+    # dynamically int8-quantized copy) for the onnx backends
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    out_dir = out_dir or default_onnx_dir(model_name)
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+
+    st_model = SentenceTransformer(model_name, device='cpu')
+    transformer = st_model[0].auto_model.eval()
+    st_model.tokenizer.save_pretrained(out_dir)
+
+    dummy = st_model.tokenizer(["export"], return_tensors='pt')
+    input_names = [n for n in ('input_ids', 'attention_mask', 'token_type_ids') if n in dummy]
+    dynamic_axes = {n: {0: 'batch', 1: 'sequence'} for n in input_names}
+    dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+
+    fp32_path = os.path.join(out_dir, ONNX_FILES['onnx'])
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(dummy[n] for n in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=['last_hidden_state'],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+    print(f"Exported {model_name} to {fp32_path}")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        int8_path = os.path.join(out_dir, ONNX_FILES['onnx-int8'])
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+        print(f"Quantized model saved to {int8_path}")
+
+    return out_dir
@@ -0,0 +1,29 @@
+import time
+
+import numpy as np
+
+from models.forest_engine import compile_forest
+
+# Held-out evaluation helpers shared by compare_heads.py and model_search.py
+
+# Adaptive result key -> label column in the interactions CSV
+ADAPTIVE_LABEL_COLUMNS = {
+    'next_topic': 'next_topic',
+    'action': 'next_action',
+    'difficulty_adjustment': 'next_difficulty_adj',
+}
+
+
+def median_ms(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return round(float(np.median(times)) * 1000, 3)
+
+
+def model_nbytes(model, attrs):
+    if model.head is not None:
+        return int(model.head.nbytes())
+    return int(sum(compile_forest(getattr(model, attr)).nbytes() for attr in attrs))
@@ -0,0 +1,188 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet input is optional
+    pq = None
+
+# Streaming ingestion of training data into a memory-mapped feature store.
+#
+# {store_dir}/
+#     manifest.json          row count, column dtypes/shapes, category vocabularies
+#     {column}.bin           raw little-endian column data, opened with np.memmap
+#
+# Input files are read chunk by chunk, so peak memory during ingestion is
+# bounded by the chunk size. Categorical columns are stored as int8 codes
+# (int16 above 127 categories) numbered like LabelEncoder (sorted values),
+# numeric columns as float32 and embeddings as float32 matrices.
+
+MANIFEST = "manifest.json"
+DEFAULT_CHUNK_SIZE = 50000
+MAX_CATEGORIES = np.iinfo(np.int16).max
+
+
+def is_parquet(path):
+    return path.endswith((".parquet", ".pq"))
+
+
+def read_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE, columns=None):
+    # Yields DataFrames of at most chunk_size rows from a CSV or Parquet file
+    if is_parquet(path):
+        if pq is None:
+            raise ImportError("Reading Parquet needs pyarrow (pip install pyarrow)")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, usecols=columns)
+
+
+def code_dtype(n_categories):
+    if n_categories <= np.iinfo(np.int8).max:
+        return np.dtype(np.int8)
+    if n_categories <= MAX_CATEGORIES:
+        return np.dtype(np.int16)
+    raise ValueError(f"{n_categories} categories do not fit in int16 codes")
+
+
+class FeatureStore:
+    """Read side of a feature store directory.
+
+    column(name) returns a read-only memmap; matrix(names) assembles several
+    columns into a float32 feature matrix, itself memory-mapped and written
+    chunk by chunk.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        self.n_rows = self.manifest["n_rows"]
+        self.vocab = self.manifest["vocab"]
+
+    def column(self, name):
+        info = self.manifest["columns"][name]
+        shape = (self.n_rows,) + tuple(info["shape"])
+        if self.n_rows == 0:
+            return np.zeros(shape, dtype=info["dtype"])
+        return np.memmap(os.path.join(self.path, info["file"]), dtype=info["dtype"], mode="r", shape=shape)
+
+    def labels(self, name):
+        # Category values (not codes) of a categorical column
+        return np.asarray(self.vocab[name], dtype=object)[self.column(name)]
+
+    def matrix(self, names, chunk_size=DEFAULT_CHUNK_SIZE):
+        # float32 (n_rows, len(names)) matrix of the given columns, cached in
+        # the store directory
+        file_name = "matrix." + "-".join(names) + ".f32"
+        path = os.path.join(self.path, file_name)
+        shape = (self.n_rows, len(names))
+        if self.n_rows == 0:
+            return np.zeros(shape, dtype=np.float32)
+        if not os.path.exists(path):
+            out = np.memmap(path + ".tmp", dtype=np.float32, mode="w+", shape=shape)
+            columns = [self.column(name) for name in names]
+            for start in range(0, self.n_rows, chunk_size):
+                stop = min(start + chunk_size, self.n_rows)
+                for j, column in enumerate(columns):
+                    out[start:stop, j] = column[start:stop]
+            out.flush()
+            del out
+            os.replace(path + ".tmp", path)
+        return np.memmap(path, dtype=np.float32, mode="r", shape=shape)
+
+    def nbytes(self):
+        return sum(self.column(name).nbytes for name in self.manifest["columns"])
+
+
+class FeatureStoreWriter:
+    """Appends DataFrame chunks to a new feature store.
+
+    categorical: columns stored as label codes; numeric: float32 columns;
+    embeddings: name -> (text column, encode_fn) for float32 vector columns.
+    """
+
+    def __init__(self, path, categorical=(), numeric=(), embeddings=None):
+        self.path = path
+        self.tmp_path = path.rstrip("/\\") + ".tmp"
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+        os.makedirs(self.tmp_path)
+        self.categorical = list(categorical)
+        self.numeric = list(numeric)
+        self.embeddings = embeddings or {}
+        self.n_rows = 0
+        # Codes are assigned in order of appearance while streaming and
+        # renumbered to sorted order in close()
+        self._seen = {name: {} for name in self.categorical}
+        self._shapes = {}
+        self._files = {}
+        for name in self.categorical + self.numeric + list(self.embeddings):
+            self._files[name] = open(os.path.join(self.tmp_path, f"{name}.bin"), "wb")
+
+    def append(self, chunk):
+        for name in self.categorical:
+            seen = self._seen[name]
+            values = chunk[name].astype(str)
+            for value in values.unique():
+                if value not in seen:
+                    seen[value] = len(seen)
+            if len(seen) > MAX_CATEGORIES:
+                raise ValueError(f"Column '{name}' has more than {MAX_CATEGORIES} categories")
+            self._write(name, values.map(seen).to_numpy(dtype=np.int16))
+        for name in self.numeric:
+            self._write(name, chunk[name].to_numpy(dtype=np.float32))
+        for name, (text_column, encode_fn) in self.embeddings.items():
+            self._write(name, np.asarray(encode_fn(chunk[text_column].tolist()), dtype=np.float32))
+        self.n_rows += len(chunk)
+
+    def _write(self, name, array):
+        self._shapes[name] = array.shape[1:]
+        self._files[name].write(np.ascontiguousarray(array).tobytes())
+
+    def close(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        for f in self._files.values():
+            f.close()
+
+        columns, vocab = {}, {}
+        for name in self.categorical:
+            # Renumber to sorted order (LabelEncoder's numbering) and shrink
+            # to the smallest code dtype, one chunk at a time
+            values = sorted(self._seen[name])
+            vocab[name] = values
+            remap = np.empty(max(len(values), 1), dtype=np.int16)
+            for new_code, value in enumerate(values):
+                remap[self._seen[name][value]] = new_code
+            dtype = code_dtype(len(values))
+            raw_path = os.path.join(self.tmp_path, f"{name}.bin")
+            with open(raw_path + ".codes", "wb") as out:
+                if self.n_rows:
+                    raw = np.memmap(raw_path, dtype=np.int16, mode="r", shape=(self.n_rows,))
+                    for start in range(0, self.n_rows, chunk_size):
+                        out.write(remap[raw[start:start + chunk_size]].astype(dtype).tobytes())
+                    del raw
+            os.replace(raw_path + ".codes", raw_path)
+            columns[name] = {"file": f"{name}.bin", "dtype": dtype.name, "shape": []}
+        for name in self.numeric + list(self.embeddings):
+            columns[name] = {"file": f"{name}.bin", "dtype": "float32", "shape": list(self._shapes.get(name, ()))}
+
+        with open(os.path.join(self.tmp_path, MANIFEST), "w") as f:
+            json.dump({"n_rows": self.n_rows, "columns": columns, "vocab": vocab}, f, indent=2)
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.replace(self.tmp_path, self.path)
+        return FeatureStore(self.path)
+
+
+def ingest(data_path, store_path, categorical=(), numeric=(), embeddings=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Streams data_path into a new feature store at store_path and opens it
+    columns = list(dict.fromkeys(
+        list(categorical) + list(numeric) + [text for text, _ in (embeddings or {}).values()]
+    ))
+    writer = FeatureStoreWriter(store_path, categorical, numeric, embeddings)
+    for chunk in read_chunks(data_path, chunk_size, columns):
+        writer.append(chunk)
+        print(f"  ingested {writer.n_rows} rows")
+    return writer.close(chunk_size)
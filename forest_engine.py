@@ -0,0 +1,223 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import sklearn
+
+# Inference engine for trained random forests.
+#
+# A forest is compiled into flat, contiguous node arrays and evaluated for a
+# whole batch in one vectorized traversal of all trees, producing labels and
+# confidences together. Results are bit-for-bit identical to sklearn's
+# RandomForestClassifier: features are compared as float32, leaf
+# distributions are normalized the same way, and per-tree probabilities are
+# summed in tree order before dividing by the number of trees.
+
+# DecisionTreeClassifier.predict_proba renormalized the leaf distributions
+# until scikit-learn 1.4, which stores them as fractions already
+RENORMALIZE_LEAVES = tuple(int(part) for part in sklearn.__version__.split(".")[:2]) < (1, 4)
+
+
+def classes_array(values):
+    # Mirror sklearn: string labels live in object arrays
+    if values and all(isinstance(v, str) for v in values):
+        return np.array(values, dtype=object)
+    return np.array(values)
+
+
+class FlatForest:
+    """A trained random forest stored as flat, contiguous node arrays.
+
+    All trees are concatenated: tree t owns nodes tree_offsets[t] to
+    tree_offsets[t + 1], and left/right hold global node indices. Leaf nodes
+    have feature == -2. value holds the normalized class distribution of every
+    node, shaped (n_nodes, n_outputs, max_n_classes).
+
+    Exposes the parts of the sklearn classifier API the models use
+    (classes_, predict, predict_proba) plus predict_with_confidence.
+    n_threads > 1 traverses groups of trees on a thread pool.
+    """
+
+    ARTIFACT_TYPE = "flat_forest"
+    FIELDS = ["tree_offsets", "feature", "threshold", "left", "right", "missing_left", "value"]
+
+    def __init__(self, arrays, classes, n_features, n_threads=1):
+        for name in self.FIELDS:
+            setattr(self, name, arrays[name])
+        self.classes = [classes_array(list(c)) for c in classes]
+        self.n_features_in_ = n_features
+        self.n_outputs_ = len(self.classes)
+        self.n_estimators = len(self.tree_offsets) - 1
+        self.n_threads = n_threads
+        self._pool = None
+
+    @property
+    def classes_(self):
+        return self.classes[0] if self.n_outputs_ == 1 else self.classes
+
+    @classmethod
+    def from_sklearn(cls, forest, n_threads=1):
+        classes = forest.classes_ if forest.n_outputs_ > 1 else [forest.classes_]
+        n_classes = [len(c) for c in classes]
+        max_classes = max(n_classes)
+
+        offsets = [0]
+        parts = {name: [] for name in cls.FIELDS if name != "tree_offsets"}
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            base = offsets[-1]
+            is_leaf = tree.children_left < 0
+            parts["feature"].append(np.where(is_leaf, -2, tree.feature).astype(np.int32))
+            parts["threshold"].append(tree.threshold.astype(np.float64))
+            parts["left"].append(np.where(is_leaf, -1, tree.children_left + base).astype(np.int32))
+            parts["right"].append(np.where(is_leaf, -1, tree.children_right + base).astype(np.int32))
+            missing = getattr(tree, "missing_go_to_left", None)
+            if missing is None:
+                missing = np.zeros(tree.node_count, dtype=np.uint8)
+            parts["missing_left"].append(np.asarray(missing, dtype=np.uint8))
+
+            # The same distributions DecisionTreeClassifier.predict_proba
+            # returns for each output
+            value = np.zeros((tree.node_count, len(classes), max_classes), dtype=np.float64)
+            for k, n_k in enumerate(n_classes):
+                proba = tree.value[:, k, :n_k].copy()
+                if RENORMALIZE_LEAVES:
+                    normalizer = proba.sum(axis=1)[:, np.newaxis]
+                    normalizer[normalizer == 0.0] = 1.0
+                    proba /= normalizer
+                value[:, k, :n_k] = proba
+            parts["value"].append(value)
+            offsets.append(base + tree.node_count)
+
+        arrays = {name: np.concatenate(chunks) for name, chunks in parts.items()}
+        arrays["tree_offsets"] = np.array(offsets, dtype=np.int64)
+        return cls(arrays, [list(c) for c in classes], forest.n_features_in_, n_threads=n_threads)
+
+    def _check_input(self, X):
+        # Trees compare float32 features, exactly like sklearn
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[-1]} features, but the forest expects {self.n_features_in_}")
+        return X
+
+    def _leaves(self, X, first_tree, last_tree):
+        # Leaf reached by every row of X in trees [first_tree, last_tree),
+        # shaped (n_trees, n_samples). All trees advance one level per step,
+        # carrying only the (tree, sample) pairs that are not at a leaf yet.
+        n_samples = X.shape[0]
+        roots = self.tree_offsets[first_tree:last_tree]
+        node = np.repeat(roots, n_samples)
+        has_nan = bool(np.isnan(X).any())
+
+        feature = self.feature[node]
+        keep = feature >= 0
+        active = np.flatnonzero(keep)
+        n, f = node[keep], feature[keep]
+        rows = np.tile(np.arange(n_samples), len(roots))[keep]
+        while active.size:
+            x = X[rows, f]
+            go_left = x <= self.threshold[n]
+            if has_nan:
+                go_left = np.where(np.isnan(x), self.missing_left[n] == 1, go_left)
+            n = np.where(go_left, self.left[n], self.right[n])
+            node[active] = n
+            f = self.feature[n]
+            keep = f >= 0
+            active, n, f, rows = active[keep], n[keep], f[keep], rows[keep]
+        return node.reshape(len(roots), n_samples)
+
+    def _all_leaves(self, X):
+        if self.n_threads <= 1 or self.n_estimators < 2:
+            return self._leaves(X, 0, self.n_estimators)
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.n_threads, thread_name_prefix="forest")
+        bounds = np.linspace(0, self.n_estimators, min(self.n_threads, self.n_estimators) + 1).astype(int)
+        parts = self._pool.map(lambda i: self._leaves(X, bounds[i], bounds[i + 1]), range(len(bounds) - 1))
+        return np.vstack(list(parts))
+
+    def _proba(self, X):
+        leaves = self._all_leaves(self._check_input(X))
+        out = [np.zeros((leaves.shape[1], len(c)), dtype=np.float64) for c in self.classes]
+        # Accumulate in tree order, as sklearn does, so sums match exactly.
+        # Leaf distributions are gathered one tree at a time: all trees at
+        # once would be an (n_trees, n_samples, n_outputs, n_classes) array.
+        for t in range(self.n_estimators):
+            values = self.value[leaves[t]]
+            for k, c in enumerate(self.classes):
+                out[k] += values[:, k, :len(c)]
+        for proba in out:
+            proba /= self.n_estimators
+        return out
+
+    def predict_proba(self, X):
+        out = self._proba(X)
+        return out[0] if self.n_outputs_ == 1 else out
+
+    def predict(self, X):
+        labels = [c.take(np.argmax(p, axis=1)) for c, p in zip(self.classes, self._proba(X))]
+        return labels[0] if self.n_outputs_ == 1 else np.column_stack(labels)
+
+    def predict_with_confidence(self, X):
+        # Label and max probability from a single traversal; for multi-output
+        # forests returns one (labels, confidences) pair per output
+        pairs = []
+        for c, p in zip(self.classes, self._proba(X)):
+            best = np.argmax(p, axis=1)
+            pairs.append((c.take(best), p[np.arange(len(best)), best]))
+        return pairs[0] if self.n_outputs_ == 1 else pairs
+
+    def extend(self, other):
+        # New FlatForest with other's trees appended (warm-start style: the
+        # combined forest averages over all trees). other's classes must be
+        # a subset of ours; its distributions are realigned to our columns.
+        if self.n_outputs_ != other.n_outputs_ or self.n_features_in_ != other.n_features_in_:
+            raise ValueError("Forests have different outputs or features")
+        value = np.zeros((len(other.feature),) + self.value.shape[1:], dtype=np.float64)
+        for k, (ours, theirs) in enumerate(zip(self.classes, other.classes)):
+            position = {c: i for i, c in enumerate(ours.tolist())}
+            unknown = [c for c in theirs.tolist() if c not in position]
+            if unknown:
+                raise ValueError(f"Classes {unknown} are not in the original forest")
+            columns = [position[c] for c in theirs.tolist()]
+            value[:, k, columns] = other.value[:, k, :len(theirs)]
+
+        base = len(self.feature)
+        arrays = {
+            "tree_offsets": np.concatenate([self.tree_offsets, other.tree_offsets[1:] + base]),
+            "feature": np.concatenate([self.feature, other.feature]),
+            "threshold": np.concatenate([self.threshold, other.threshold]),
+            "left": np.concatenate([self.left, np.where(other.left < 0, -1, other.left + base)]).astype(np.int32),
+            "right": np.concatenate([self.right, np.where(other.right < 0, -1, other.right + base)]).astype(np.int32),
+            "missing_left": np.concatenate([self.missing_left, other.missing_left]),
+            "value": np.concatenate([self.value, value]),
+        }
+        return FlatForest(arrays, [c.tolist() for c in self.classes], self.n_features_in_, n_threads=self.n_threads)
+
+    def arrays(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def artifact_spec(self):
+        return {
+            "n_features": int(self.n_features_in_),
+            "n_estimators": int(self.n_estimators),
+            "classes": [c.tolist() for c in self.classes],
+        }
+
+    @classmethod
+    def from_artifact(cls, arrays, spec):
+        forest = cls(arrays, spec["classes"], spec["n_features"])
+        if forest.n_estimators != spec["n_estimators"]:
+            raise ValueError(f"forest has {forest.n_estimators} trees, manifest says {spec['n_estimators']}")
+        return forest
+
+    def nbytes(self):
+        return sum(a.nbytes for a in self.arrays().values())
+
+
+def compile_forest(forest, n_threads=1):
+    # Accepts an sklearn forest or an already compiled FlatForest
+    if isinstance(forest, FlatForest):
+        if forest.n_threads != n_threads:
+            forest.n_threads = n_threads
+            forest._pool = None
+        return forest
+    return FlatForest.from_sklearn(forest, n_threads=n_threads)
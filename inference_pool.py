@@ -0,0 +1,210 @@
+import asyncio
+import collections
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from models.metrics import call_timed
+
+
+class Overloaded(Exception):
+    """Raised instead of queueing a request when the pool is full."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Server is busy, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class InferencePool:
+    """Runs blocking inference on a bounded executor, off the event loop.
+
+    At most max_pending requests are admitted at once (running or waiting
+    for a worker); beyond that admit() raises Overloaded with a Retry-After
+    estimate from recent service times. wait() bounds each request by
+    timeout seconds. The executor can also be handed to a MicroBatcher.
+    """
+
+    def __init__(self, executor, workers, max_pending=64, timeout=None, name="inference"):
+        self.executor = executor
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.name = name
+
+        self.pending = 0
+
+        # Metrics
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.max_pending_seen = 0
+        self._latencies = collections.deque(maxlen=1000)
+
+    @classmethod
+    def threads(cls, workers, **kwargs):
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=kwargs.get("name", "inference"))
+        return cls(executor, workers, **kwargs)
+
+    @classmethod
+    def processes(cls, workers, initializer=None, initargs=(), **kwargs):
+        # Spawned workers do not inherit the parent's threads or loaded models
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                       initializer=initializer, initargs=initargs)
+        return cls(executor, workers, **kwargs)
+
+    def retry_after(self):
+        # Seconds until roughly one pool's worth of queued work has drained
+        avg = sum(self._latencies) / len(self._latencies) if self._latencies else 1.0
+        return max(1, math.ceil(avg * self.pending / max(self.workers, 1)))
+
+    def admit(self):
+        # Takes a slot now (so callers that await before using it still
+        # count against max_pending); the returned admission releases it
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise Overloaded(self.retry_after())
+        self.pending += 1
+        self.max_pending_seen = max(self.max_pending_seen, self.pending)
+        return _Admission(self)
+
+    async def wait(self, awaitable):
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(awaitable, self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        except Exception:
+            self.errors += 1
+            raise
+        self.completed += 1
+        self._latencies.append(time.perf_counter() - start)
+        return result
+
+    async def run(self, fn, *args):
+        # Admission, executor and timeout in one call
+        with self.admit():
+            return await self.wait(asyncio.get_running_loop().run_in_executor(self.executor, fn, *args))
+
+    def stats(self):
+        latencies = list(self._latencies)
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "timeout_s": self.timeout,
+            "pending": self.pending,
+            "max_pending_seen": self.max_pending_seen,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "p50_ms": 1000.0 * _percentile(latencies, 0.50),
+            "p99_ms": 1000.0 * _percentile(latencies, 0.99),
+        }
+
+
+class _Admission:
+    # One slot taken by InferencePool.admit(); released once, on leaving the
+    # with block or by release()
+    def __init__(self, pool):
+        self.pool = pool
+        self.released = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.pool.pending -= 1
+
+
+class LoopLagMonitor:
+    """Measures event-loop lag: how late a periodic sleep wakes up.
+
+    Lag means callbacks (every request, static files included) are waiting
+    behind blocking work on the loop thread.
+    """
+
+    def __init__(self, interval_ms=100.0, window=600):
+        self.interval = interval_ms / 1000.0
+        self._lags = collections.deque(maxlen=window)
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self._lags.append(max(0.0, time.perf_counter() - start - self.interval))
+
+    def stats(self):
+        lags = list(self._lags)
+        return {
+            "interval_ms": self.interval * 1000.0,
+            "samples": len(lags),
+            "last_ms": 1000.0 * lags[-1] if lags else 0.0,
+            "p50_ms": 1000.0 * _percentile(lags, 0.50),
+            "p99_ms": 1000.0 * _percentile(lags, 0.99),
+            "max_ms": 1000.0 * max(lags) if lags else 0.0,
+        }
+
+
+# Process-pool workers: each loads its own copy of a model once. Model
+# artifacts are memory-mapped, so the forest arrays are still shared between
+# processes through the page cache. Other versions (picked by the parent's
+# model registry) are loaded on first use; PROCESS_MODEL_VERSIONS of them
+# are kept besides the startup one.
+PROCESS_MODEL_VERSIONS = 2
+
+_process_model = None
+_process_factory = None
+_process_versions = collections.OrderedDict()
+
+
+def load_process_model(model_cls, kwargs):
+    global _process_model, _process_factory
+    _process_factory = (model_cls, kwargs)
+    _process_model = model_cls(**kwargs)
+    _process_model.load_models()
+
+
+def _versioned_model(version):
+    if version is None or version == _process_model.version:
+        return _process_model
+    model = _process_versions.get(version)
+    if model is None:
+        model_cls, kwargs = _process_factory
+        model = model_cls(**kwargs)
+        if not model.load_models(version):
+            raise RuntimeError(f"Cannot load model version {version}")
+        _process_versions[version] = model
+        while len(_process_versions) > PROCESS_MODEL_VERSIONS:
+            _process_versions.popitem(last=False)
+    _process_versions.move_to_end(version)
+    return model
+
+
+def call_process_model(version, method, *args):
+    return getattr(_versioned_model(version), method)(*args)
+
+
+def call_process_model_timed(version, method, *args):
+    # (result, stage timings); metrics recorded in the worker stay there
+    return call_timed(getattr(_versioned_model(version), method), *args)
@@ -1,78 +1,155 @@
-import pandas as pd
-import random
-import numpy as np
-
-TOPICS = [
-    "Optimization", "Neural Networks", "NLP", "Computer Vision", "RL", 
-    "Backpropagation", "Gradient Descent", "Transformers", "CNN", "RNN"
-]
-
-DIFFICULTY_LEVELS = ["Beginner", "Intermediate", "Advanced"]
-
-def simulate_student_history(student_id, steps=20):
-    history = []
-    current_topic_idx = 0
-    current_difficulty_idx = 0
-    
-    for _ in range(steps):
-        topic = TOPICS[current_topic_idx]
-        difficulty = DIFFICULTY_LEVELS[current_difficulty_idx]
-        
-        # Simulate Score based on noise and some underlying proficiency
-        # Assume proficiency increases over time
-        proficiency = min(0.9, 0.3 + 0.05 * _) 
-        
-        # Score is lower for higher difficulties
-        difficulty_penalty = current_difficulty_idx * 0.2
-        
-        score = min(100, max(0, int(np.random.normal(loc=(proficiency - difficulty_penalty) * 100, scale=15))))
-        
-        time_spent = random.randint(5, 60) # minutes
-        attempts = random.randint(1, 4)
-        
-        # Determine Next Action (Rule based ground truth for training/imitation)
-        next_topic = topic
-        next_action = "Continue" 
-        difficulty_adj = "Same"
-        
-        if score > 80:
-            if current_difficulty_idx < 2:
-                difficulty_adj = "Increase"
-                current_difficulty_idx += 1
-            else:
-                next_action = "Next Topic"
-                current_topic_idx = (current_topic_idx + 1) % len(TOPICS) # Move to next topic
-                current_difficulty_idx = 0 # Reset difficulty for new topic
-        elif score < 50:
-             next_action = "Revision"
-             if current_difficulty_idx > 0:
-                 difficulty_adj = "Decrease"
-                 current_difficulty_idx -= 1
-        
-        history.append({
-            "student_id": student_id,
-            "topic": topic,
-            "difficulty": difficulty,
-            "score": score,
-            "attempts": attempts,
-            "time_spent": time_spent,
-            "next_topic": TOPICS[current_topic_idx], # Potentially changed
-            "next_action": next_action,
-            "next_difficulty_adj": difficulty_adj
-        })
-        
-    return history
-
-def generate_interaction_dataset(num_students=50):
-    all_data = []
-    for i in range(num_students):
-        student_history = simulate_student_history(student_id=f"S{i:03d}")
-        all_data.extend(student_history)
-        
-    return pd.DataFrame(all_data)
-
-if __name__ == "__main__":
-    df = generate_interaction_dataset(100)
-    output_path = "data/synthetic_interactions.csv"
-    df.to_csv(output_path, index=False)
-    print(f"Generated {len(df)} interactions and saved to {output_path}")
+import argparse
+import os
+import pandas as pd
+import random
+import numpy as np
+
+from data_writer import chunk_seeds, generate_chunks, write_chunks
+
+TOPICS = [
+    "Optimization", "Neural Networks", "NLP", "Computer Vision", "RL", 
+    "Backpropagation", "Gradient Descent", "Transformers", "CNN", "RNN"
+]
+
+DIFFICULTY_LEVELS = ["Beginner", "Intermediate", "Advanced"]
+
+def simulate_student_history(student_id, steps=20):
+    history = []
+    current_topic_idx = 0
+    current_difficulty_idx = 0
+    
+    for _ in range(steps):
+        topic = TOPICS[current_topic_idx]
+        difficulty = DIFFICULTY_LEVELS[current_difficulty_idx]
+        
+        # Simulate Score based on noise and some underlying proficiency
+        # Assume proficiency increases over time
+        proficiency = min(0.9, 0.3 + 0.05 * _) 
+        
+        # Score is lower for higher difficulties
+        difficulty_penalty = current_difficulty_idx * 0.2
+        
+        score = min(100, max(0, int(np.random.normal(loc=(proficiency - difficulty_penalty) * 100, scale=15))))
+        
+        time_spent = random.randint(5, 60) # minutes
+        attempts = random.randint(1, 4)
+        
+        # Determine Next Action (Rule based ground truth for training/imitation)
+        next_topic = topic
+        next_action = "Continue" 
+        difficulty_adj = "Same"
+        
+        if score > 80:
+            if current_difficulty_idx < 2:
+                difficulty_adj = "Increase"
+                current_difficulty_idx += 1
+            else:
+                next_action = "Next Topic"
+                current_topic_idx = (current_topic_idx + 1) % len(TOPICS) # Move to next topic
+                current_difficulty_idx = 0 # Reset difficulty for new topic
+        elif score < 50:
+             next_action = "Revision"
+             if current_difficulty_idx > 0:
+                 difficulty_adj = "Decrease"
+                 current_difficulty_idx -= 1
+        
+        history.append({
+            "student_id": student_id,
+            "topic": topic,
+            "difficulty": difficulty,
+            "score": score,
+            "attempts": attempts,
+            "time_spent": time_spent,
+            "next_topic": TOPICS[current_topic_idx], # Potentially changed
+            "next_action": next_action,
+            "next_difficulty_adj": difficulty_adj
+        })
+        
+    return history
+
+ACTIONS = ["Continue", "Next Topic", "Revision"]
+ADJUSTMENTS = ["Same", "Increase", "Decrease"]
+
+def simulate_students(num_students, steps=20, rng=None, first_student=0):
+    # simulate_student_history() for num_students students at once: the
+    # state machine advances all students one step per iteration. Rows are
+    # grouped by student, in step order, like the per-student version.
+    rng = np.random.default_rng(rng)
+    topic_idx = np.zeros(num_students, dtype=np.int64)
+    difficulty_idx = np.zeros(num_students, dtype=np.int64)
+    shape = (num_students, steps)
+    topics = np.empty(shape, dtype=np.int8)
+    difficulties = np.empty(shape, dtype=np.int8)
+    scores = np.empty(shape, dtype=np.int16)
+    next_topics = np.empty(shape, dtype=np.int8)
+    actions = np.empty(shape, dtype=np.int8)
+    adjustments = np.empty(shape, dtype=np.int8)
+    times = rng.integers(5, 61, size=shape, dtype=np.int16)
+    attempts = rng.integers(1, 5, size=shape, dtype=np.int8)
+
+    for step in range(steps):
+        topics[:, step] = topic_idx
+        difficulties[:, step] = difficulty_idx
+        proficiency = min(0.9, 0.3 + 0.05 * step)
+        loc = (proficiency - difficulty_idx * 0.2) * 100
+        score = np.clip(np.trunc(rng.normal(loc=loc, scale=15)), 0, 100)
+        scores[:, step] = score
+
+        high, low = score > 80, score < 50
+        increase = high & (difficulty_idx < 2)
+        next_topic = high & (difficulty_idx == 2)
+        decrease = low & (difficulty_idx > 0)
+
+        action = np.zeros(num_students, dtype=np.int8)
+        action[next_topic] = 1
+        action[low] = 2
+        adjustment = np.zeros(num_students, dtype=np.int8)
+        adjustment[increase] = 1
+        adjustment[decrease] = 2
+        actions[:, step] = action
+        adjustments[:, step] = adjustment
+
+        difficulty_idx = difficulty_idx + increase - decrease
+        topic_idx = np.where(next_topic, (topic_idx + 1) % len(TOPICS), topic_idx)
+        difficulty_idx[next_topic] = 0
+        next_topics[:, step] = topic_idx
+
+    student_ids = [f"S{i:03d}" for i in range(first_student, first_student + num_students)]
+    return pd.DataFrame({
+        "student_id": pd.Categorical.from_codes(np.repeat(np.arange(num_students), steps), categories=student_ids),
+        "topic": pd.Categorical.from_codes(topics.ravel(), categories=TOPICS),
+        "difficulty": pd.Categorical.from_codes(difficulties.ravel(), categories=DIFFICULTY_LEVELS),
+        "score": scores.ravel(),
+        "attempts": attempts.ravel(),
+        "time_spent": times.ravel(),
+        "next_topic": pd.Categorical.from_codes(next_topics.ravel(), categories=TOPICS),
+        "next_action": pd.Categorical.from_codes(actions.ravel(), categories=ACTIONS),
+        "next_difficulty_adj": pd.Categorical.from_codes(adjustments.ravel(), categories=ADJUSTMENTS),
+    })
+
+def generate_interaction_dataset(num_students=50, steps=20, seed=None):
+    return simulate_students(num_students, steps, seed)
+
+def generate_to_file(output_path, num_students, steps=20, seed=None, students_per_chunk=50000, workers=1):
+    # Streams the histories of num_students students to CSV/Parquet; each
+    # shard of students_per_chunk students is simulated independently
+    n_chunks = max(1, -(-num_students // students_per_chunk))
+    tasks = [
+        (min(students_per_chunk, num_students - i * students_per_chunk), steps, chunk_seed, i * students_per_chunk)
+        for i, chunk_seed in enumerate(chunk_seeds(seed, n_chunks))
+    ]
+    return write_chunks(generate_chunks(simulate_students, tasks, workers), output_path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate student interaction histories")
+    parser.add_argument("--students", type=int, default=100)
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", default="data/synthetic_interactions.csv", help=".csv or .parquet")
+    parser.add_argument("--students-per-chunk", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=1, help="processes simulating shards (0: all cores)")
+    args = parser.parse_args()
+
+    rows = generate_to_file(args.output, args.students, args.steps, args.seed, args.students_per_chunk,
+                            args.workers or os.cpu_count())
+    print(f"Generated {rows} interactions and saved to {args.output}")
@@ -0,0 +1,99 @@
+import math
+import re
+from collections import Counter
+
+import numpy as np
+
+# Lowercase word tokens: letters first, then letters, digits or hyphens
+# ("cnn", "word2vec", "t-sne")
+TOKEN_PATTERN = re.compile(r"[a-z][a-z0-9\-]*[a-z0-9]")
+
+STOPWORDS = frozenset([
+    'a', 'about', 'all', 'also', 'am', 'an', 'and', 'any', 'are', 'as', 'at', 'be', 'been', 'between', 'but', 'by',
+    'can', 'could', 'did', 'do', 'does', 'doing', 'for', 'from', 'give', 'had', 'has', 'have', 'help',
+    'how', 'i', 'if', 'in', 'into', 'is', 'it', 'its', 'just', 'me', 'more', 'my', 'not', 'of', 'on',
+    'or', 'other', 'our', 'please', 'should', 'show', 'so', 'some', 'tell', 'than', 'that', 'the',
+    'their', 'them', 'then', 'there', 'these', 'this', 'those', 'to', 'too', 'very', 'was', 'we',
+    'were', 'what', 'when', 'where', 'which', 'who', 'why', 'will', 'with', 'would', 'you', 'your',
+    'explain', 'example',
+])
+
+MIN_LENGTH = 3
+
+
+def tokenize(text):
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if len(t) >= MIN_LENGTH and t not in STOPWORDS]
+
+
+class KeywordExtractor:
+    """Ranks the tokens of a query by TF-IDF against the training corpus.
+
+    fit() counts document frequencies over the training queries, so words
+    common to many queries (like "simple" or "detail") rank below rarer
+    ones. Words never seen in training get the highest IDF. Ties keep the
+    order the words appear in, so the result is deterministic. An unfitted
+    extractor ranks by term frequency alone.
+    """
+
+    ARTIFACT_TYPE = 'keyword_idf'
+    FIELDS = ['idf']
+
+    def __init__(self, vocab=None, idf=None, n_docs=0, top_k=5):
+        self.vocab = list(vocab or [])
+        self.idf = np.asarray(idf if idf is not None else [], dtype=np.float32)
+        self.n_docs = n_docs
+        self.top_k = top_k
+        self._weights = dict(zip(self.vocab, self.idf.tolist()))
+        self._unseen = self._idf(0)
+
+    def _idf(self, df):
+        # Smoothed like sklearn's TfidfVectorizer
+        return math.log((1 + self.n_docs) / (1 + df)) + 1
+
+    def fit(self, texts):
+        # texts: any iterable of strings, e.g. a generator over CSV chunks
+        df = Counter()
+        n_docs = 0
+        for text in texts:
+            df.update(set(tokenize(str(text))))
+            n_docs += 1
+        self.n_docs = n_docs
+        self.vocab = sorted(df)
+        self.idf = np.array([self._idf(df[t]) for t in self.vocab], dtype=np.float32)
+        self._weights = dict(zip(self.vocab, self.idf.tolist()))
+        self._unseen = self._idf(0)
+        return self
+
+    def extract(self, text):
+        counts = Counter(tokenize(text))
+        if not counts:
+            return []
+        weights = self._weights
+        unseen = self._unseen
+        # Counter keeps first-occurrence order and sorted() is stable
+        ranked = sorted(counts, key=lambda t: -counts[t] * weights.get(t, unseen))
+        return ranked[:self.top_k]
+
+    def extract_batch(self, texts):
+        # Repeated queries in a batch are ranked once
+        seen = {}
+        extract = self.extract
+        results = []
+        for text in texts:
+            keywords = seen.get(text)
+            if keywords is None:
+                keywords = seen[text] = extract(text)
+            results.append(list(keywords))
+        return results
+
+    def arrays(self):
+        return {'idf': self.idf}
+
+    def artifact_spec(self):
+        return {"vocab": self.vocab, "n_docs": self.n_docs, "top_k": self.top_k}
+
+    @classmethod
+    def from_artifact(cls, arrays, spec):
+        if len(spec["vocab"]) != len(arrays["idf"]):
+            raise ValueError(f"{len(spec['vocab'])} keywords but {len(arrays['idf'])} IDF weights")
+        return cls(spec["vocab"], np.asarray(arrays["idf"]), spec["n_docs"], spec.get("top_k", 5))
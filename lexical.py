@@ -0,0 +1,66 @@
+import itertools
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+
+from models.multihead import LinearMultiHead
+
+
+class LexicalClassifier:
+    """Logistic heads over hashed word n-grams of the raw query text.
+
+    The cheap first stage of the cascade in QueryUnderstandingModel. The
+    query templates make intent and difficulty, and usually the topic,
+    readable from surface tokens ("Recap", "keep it simple."), so most
+    queries can be answered without the encoder. Tokens are hashed into
+    n_features buckets, so there is no vocabulary to store, and the targets
+    share one LinearMultiHead: a batch costs one sparse matrix product.
+    """
+
+    ARTIFACT_TYPE = 'lexical_head'
+    FIELDS = LinearMultiHead.FIELDS
+
+    def __init__(self, n_features=2 ** 15, ngram_max=2, C=10.0, head=None):
+        self.n_features = n_features
+        self.ngram_max = ngram_max
+        self.C = C
+        self.head = head
+        # Stateless: hashing needs no fit, only the same parameters
+        self.vectorizer = HashingVectorizer(n_features=n_features, ngram_range=(1, ngram_max),
+                                            alternate_sign=False, dtype=np.float32)
+
+    def transform(self, texts):
+        return self.vectorizer.transform([str(t) for t in texts])
+
+    def fit(self, texts, Y, batch_size=10000):
+        # texts: any iterable of strings (e.g. a generator over CSV chunks),
+        # in the order of the rows of Y
+        texts = iter(texts)
+        blocks = []
+        while True:
+            batch = list(itertools.islice(texts, batch_size))
+            if not batch:
+                break
+            blocks.append(self.transform(batch))
+        self.head = LinearMultiHead(C=self.C).fit(sparse.vstack(blocks).tocsr(), Y)
+        return self
+
+    def predict_all(self, texts):
+        # One (labels, confidences) pair per target, as the multi-head models
+        return self.head.predict_all(self.transform(texts))
+
+    def arrays(self):
+        return self.head.arrays()
+
+    def artifact_spec(self):
+        return {**self.head.artifact_spec(), "n_features": self.n_features, "ngram_max": self.ngram_max, "C": self.C}
+
+    @classmethod
+    def from_artifact(cls, arrays, spec):
+        if spec["n_features"] != len(arrays["weights"]):
+            raise ValueError(f"{spec['n_features']} hashed features but {len(arrays['weights'])} weight rows")
+        return cls(spec["n_features"], spec["ngram_max"], spec["C"], LinearMultiHead.from_artifact(arrays, spec))
+
+    def nbytes(self):
+        return self.head.nbytes()
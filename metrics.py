@@ -0,0 +1,209 @@
+import threading
+import time
+
+# Minimal Prometheus-style metrics: counters, gauges and histograms with
+# labels, rendered in the text exposition format by render(). Metrics live in
+# module-level REGISTRY and are shared by the models and the app; values
+# recorded in other processes (RECOMMEND_EXECUTOR=process) are not included.
+
+# Seconds; inference stages range from microseconds (keywords) to tens of
+# milliseconds (encoding a batch)
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    TYPE = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.TYPE}"]
+
+
+class Counter(_Metric):
+    TYPE = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_label_text(self.labelnames, k)} {v}" for k, v in items]
+
+
+class Gauge(Counter):
+    TYPE = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def remove(self, **labels):
+        # Drops every series whose labels include the given ones
+        positions = [(self.labelnames.index(name), str(value)) for name, value in labels.items()]
+        with self._lock:
+            for key in [k for k in self._values if all(k[i] == v for i, v in positions)]:
+                del self._values[key]
+
+
+class Histogram(_Metric):
+    TYPE = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            # [cumulative bucket counts..., count, sum]
+            series = self._values.setdefault(key, [0] * len(self.buckets) + [0, 0.0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self):
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        lines = self.header()
+        for key, series in items:
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, [('le', bound)])} {count}")
+            lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, [('le', '+Inf')])} {series[-2]}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, key)} {series[-2]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.metrics.get(name) or self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.metrics.get(name) or self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.metrics.get(name) or self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "inference_stage_seconds", "Time spent in each inference stage, per batch", ["model", "stage"])
+PREDICTIONS = REGISTRY.counter(
+    "predictions_total", "Predicted rows by label", ["model", "label", "value"])
+PREDICTION_ERRORS = REGISTRY.counter(
+    "prediction_errors_total", "Rows or batches that failed to predict", ["model", "reason"])
+MODEL_LOAD_SECONDS = REGISTRY.gauge(
+    "model_load_seconds", "Duration of the last model load", ["model"])
+MODEL_LOADED = REGISTRY.gauge(
+    "model_loaded", "1 when the model loaded successfully, else 0", ["model"])
+MODEL_INFO = REGISTRY.gauge(
+    "model_info", "Version of the loaded model", ["model", "version"])
+
+
+class StageTimer:
+    """Times named stages of one predict call.
+
+    Each stage is observed in inference_stage_seconds (unless model is None)
+    and its seconds are added to `timings`, a caller-supplied dict, e.g. for
+    a Server-Timing header.
+    """
+
+    def __init__(self, model, timings=None):
+        self.model = model
+        self.timings = timings if timings is not None else {}
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def record(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+        if self.model is not None:
+            STAGE_SECONDS.observe(seconds, model=self.model, stage=name)
+
+
+class _Stage:
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def count_labels(model, label, values):
+    counts = {}
+    for value in values:
+        counts[value] = counts.get(value, 0) + 1
+    for value, n in counts.items():
+        PREDICTIONS.inc(n, model=model, label=label, value=value)
+
+
+def record_model_load(model, seconds, version, loaded):
+    MODEL_LOAD_SECONDS.set(round(seconds, 6), model=model)
+    MODEL_LOADED.set(1 if loaded else 0, model=model)
+    if loaded:
+        record_model_version(model, version)
+
+
+def record_model_version(model, version):
+    # model_info carries the version currently serving traffic
+    MODEL_INFO.remove(model=model)
+    MODEL_INFO.set(1, model=model, version=version)
+
+
+def call_timed(fn, *args):
+    # (fn(*args, timings=...), timings) for predict_batch-style functions
+    timings = {}
+    return fn(*args, timings=timings), timings
+
+
+def server_timing(timings):
+    # Server-Timing header value, durations in milliseconds
+    return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items())
@@ -0,0 +1,165 @@
+import datetime
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+from models.forest_engine import FlatForest
+from models.keywords import KeywordExtractor
+from models.lexical import LexicalClassifier
+from models.multihead import HistGradientBoostingHead, LinearMultiHead
+
+# Versioned on-disk model format.
+#
+# {model_dir}/{kind}/{version}/
+#     manifest.json              schema version, training data hash, classes, array index
+#     {model}.{field}.npy        flat tree arrays, loaded with mmap_mode='r'
+#
+# Memory-mapped arrays are backed by the OS page cache, so every worker on a
+# host that loads the same version shares one physical copy of the forests.
+
+SCHEMA_VERSION = 1
+MANIFEST = "manifest.json"
+
+# Model classes that can be stored in an artifact, by manifest "type". Each
+# provides FIELDS, arrays(), artifact_spec() and from_artifact(arrays, spec).
+MODEL_TYPES = {cls.ARTIFACT_TYPE: cls for cls in (FlatForest, LinearMultiHead, HistGradientBoostingHead,
+                                                      LexicalClassifier, KeywordExtractor)}
+
+
+class ArtifactError(Exception):
+    pass
+
+
+def file_sha256(path, chunk_size=1 << 20, limit=None):
+    # Hash of the whole file, or of its first `limit` bytes
+    digest = hashlib.sha256()
+    remaining = limit
+    with open(path, "rb") as f:
+        while remaining is None or remaining > 0:
+            block = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not block:
+                break
+            digest.update(block)
+            if remaining is not None:
+                remaining -= len(block)
+    return digest.hexdigest()
+
+
+def new_version(data_hash=None):
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    return f"{stamp}-{data_hash[:8]}" if data_hash else stamp
+
+
+def _storable(model):
+    # sklearn forests are compiled to flat arrays; multi-output forest heads
+    # are stored as their forest
+    if hasattr(model, "forest"):
+        model = model.forest
+    if type(model) in MODEL_TYPES.values():
+        return model
+    return FlatForest.from_sklearn(model)
+
+
+def save_artifact(model_dir, kind, models, encoders=None, metadata=None, data_hash=None):
+    # Writes a new version directory atomically (temp dir + rename) and
+    # returns its path. models: name -> sklearn forest, FlatForest or
+    # multi-head (or any MODEL_TYPES instance); encoders: name -> list of
+    # classes.
+    version = new_version(data_hash)
+    kind_dir = os.path.join(model_dir, kind)
+    final_dir = os.path.join(kind_dir, version)
+    tmp_dir = os.path.join(kind_dir, f".tmp-{version}")
+    os.makedirs(tmp_dir)
+
+    try:
+        specs = {}
+        for name, model in models.items():
+            model = _storable(model)
+            files = {}
+            for field, array in model.arrays().items():
+                file_name = f"{name}.{field}.npy"
+                np.save(os.path.join(tmp_dir, file_name), np.ascontiguousarray(array))
+                files[field] = {"file": file_name, "dtype": str(array.dtype), "shape": list(array.shape)}
+            specs[name] = {"type": model.ARTIFACT_TYPE, **model.artifact_spec(), "arrays": files}
+
+        manifest = {
+            "schema_version": SCHEMA_VERSION,
+            "kind": kind,
+            "version": version,
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "training_data_hash": data_hash,
+            "models": specs,
+            "encoders": {name: list(classes) for name, classes in (encoders or {}).items()},
+            "metadata": metadata or {},
+        }
+        with open(os.path.join(tmp_dir, MANIFEST), "w") as f:
+            json.dump(manifest, f, indent=2, default=lambda o: o.item() if hasattr(o, "item") else str(o))
+        os.rename(tmp_dir, final_dir)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return final_dir
+
+
+def list_versions(model_dir, kind):
+    # Complete versions (with a manifest), oldest first; names sort by time
+    kind_dir = os.path.join(model_dir, kind)
+    if not os.path.isdir(kind_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(kind_dir)
+        if not name.startswith(".") and os.path.isfile(os.path.join(kind_dir, name, MANIFEST))
+    )
+
+
+def latest_version_dir(model_dir, kind):
+    versions = list_versions(model_dir, kind)
+    return os.path.join(model_dir, kind, versions[-1]) if versions else None
+
+
+def load_artifact(version_dir, kind, expected_metadata=None, mmap=True):
+    # Returns (manifest, {name: model}). Raises ArtifactError when the
+    # artifact does not match this code or the expected metadata.
+    manifest_path = os.path.join(version_dir, MANIFEST)
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ArtifactError(f"Cannot read manifest {manifest_path}: {e}")
+
+    if manifest.get("schema_version") != SCHEMA_VERSION:
+        raise ArtifactError(
+            f"{version_dir} has schema version {manifest.get('schema_version')}, expected {SCHEMA_VERSION}"
+        )
+    if manifest.get("kind") != kind:
+        raise ArtifactError(f"{version_dir} holds '{manifest.get('kind')}' models, expected '{kind}'")
+    for key, value in (expected_metadata or {}).items():
+        if manifest["metadata"].get(key) != value:
+            raise ArtifactError(
+                f"{version_dir} was built with {key}={manifest['metadata'].get(key)!r}, expected {value!r}"
+            )
+
+    models = {}
+    for name, spec in manifest["models"].items():
+        model_cls = MODEL_TYPES.get(spec.get("type"))
+        if model_cls is None:
+            raise ArtifactError(f"Unsupported model type '{spec.get('type')}' for {name}")
+        arrays = {}
+        for field in model_cls.FIELDS:
+            info = spec["arrays"].get(field)
+            if info is None:
+                raise ArtifactError(f"{name} is missing array '{field}'")
+            array = np.load(os.path.join(version_dir, info["file"]), mmap_mode="r" if mmap else None)
+            if str(array.dtype) != info["dtype"] or list(array.shape) != info["shape"]:
+                raise ArtifactError(
+                    f"{info['file']} is {array.dtype}{list(array.shape)}, manifest says {info['dtype']}{info['shape']}"
+                )
+            arrays[field] = array
+        try:
+            models[name] = model_cls.from_artifact(arrays, spec)
+        except (KeyError, ValueError) as e:
+            raise ArtifactError(f"Invalid {name} in {version_dir}: {e}")
+    return manifest, models
@@ -0,0 +1,246 @@
+import collections
+import random
+import threading
+
+from models.metrics import REGISTRY, record_model_version
+from models.model_artifacts import list_versions
+
+VERSION_SECONDS = REGISTRY.histogram(
+    "model_version_predict_seconds", "predict_batch latency per model version", ["model", "version"])
+VERSION_CONFIDENCE = REGISTRY.histogram(
+    "model_version_confidence", "Prediction confidence (percent) per model version", ["model", "version"],
+    buckets=(10, 20, 30, 40, 50, 60, 70, 80, 90, 95, 99, 100))
+VERSION_TRAFFIC = REGISTRY.gauge(
+    "model_version_traffic_percent", "Share of traffic routed to each model version", ["model", "version"])
+
+
+class NotResident(Exception):
+    pass
+
+
+class ModelRegistry:
+    """Resident versions of one model kind, with hot swaps and a canary.
+
+    load() builds a new model instance for an artifact version, runs
+    warmup(model) on it and keeps it resident (at most keep versions; the
+    oldest unused ones are dropped). Traffic goes to the active version,
+    except canary_percent of it, which goes to the canary. activate() and
+    rollback() swap one reference, so a request in flight finishes on the
+    version it started with and the next one sees the new version.
+
+    poll() (or the watcher thread started by watch()) loads versions that
+    appear in model_dir after startup: they become the canary when
+    canary_percent is set, else they are activated once warm-up passes.
+    """
+
+    def __init__(self, kind, factory, model_dir, warmup=None, confidence_key=None, keep=3, canary_percent=0.0):
+        self.kind = kind
+        self.factory = factory
+        self.model_dir = model_dir
+        self.warmup = warmup
+        self.confidence_key = confidence_key
+        self.keep = max(keep, 2)
+        self.canary_percent = canary_percent
+
+        self._models = collections.OrderedDict()
+        self._lock = threading.Lock()
+        # (active version, active model, canary version, canary model, canary percent)
+        self._routing = (None, None, None, None, 0.0)
+        self.previous = None
+        # Versions saved before startup are only loaded on request
+        self._known = set(list_versions(model_dir, kind))
+        self._watcher = None
+        self._stop = threading.Event()
+
+        # Metrics
+        self.swaps = 0
+        self.load_errors = 0
+        self.last_error = None
+        self._stats = {}
+
+    @property
+    def active(self):
+        return self._routing[0]
+
+    @property
+    def canary(self):
+        return self._routing[2]
+
+    def model(self, version=None):
+        # The active model, or a resident version
+        if version is None:
+            return self._routing[1]
+        try:
+            return self._models[version]
+        except KeyError:
+            raise NotResident(f"{self.kind} version {version} is not loaded")
+
+    def add(self, model, activate=True):
+        # Registers an already loaded model (e.g. the one loaded at startup)
+        with self._lock:
+            self._models[model.version] = model
+            self._known.add(model.version)
+            if activate:
+                self._set_routing(model.version, self.canary, self._routing[4])
+            self._evict(model.version)
+        return model
+
+    def load(self, version):
+        # Loads and warms up a version without routing traffic to it
+        if version in self._models:
+            return self._models[version]
+        if version not in list_versions(self.model_dir, self.kind):
+            raise NotResident(f"No saved {self.kind} version {version!r}")
+        self._known.add(version)
+        model = self.factory()
+        try:
+            if not model.load_models(version):
+                raise RuntimeError(f"could not load {self.kind} version {version}")
+            if self.warmup is not None:
+                self.warmup(model)
+        except Exception as e:
+            self.load_errors += 1
+            self.last_error = f"{version}: {e}"
+            raise
+        finally:
+            # load_models() reports the version it loaded; report the one serving
+            if self.active is not None:
+                record_model_version(self.kind, self.active)
+        with self._lock:
+            self._models[version] = model
+            self._evict(version)
+        print(f"Loaded {self.kind} model version {version}.")
+        return model
+
+    def activate(self, version):
+        with self._lock:
+            if version not in self._models:
+                raise NotResident(f"{self.kind} version {version} is not loaded")
+            canary = None if self.canary == version else self.canary
+            self._set_routing(version, canary, self._routing[4] if canary else 0.0)
+        print(f"Activated {self.kind} model version {version}.")
+
+    def set_canary(self, version, percent):
+        # version None (or percent 0) stops the canary
+        with self._lock:
+            if version is not None and version not in self._models:
+                raise NotResident(f"{self.kind} version {version} is not loaded")
+            if version is None or percent <= 0:
+                version, percent = None, 0.0
+            self._set_routing(self.active, version, min(float(percent), 100.0))
+
+    def rollback(self):
+        # Back to the version that was active before the last swap; the
+        # canary is stopped
+        with self._lock:
+            if self.previous is None or self.previous not in self._models:
+                raise NotResident(f"No previous {self.kind} version to roll back to")
+            self._set_routing(self.previous, None, 0.0)
+        print(f"Rolled back {self.kind} model to version {self.active}.")
+
+    def _set_routing(self, active, canary, percent):
+        # Called with the lock held
+        if active != self.active:
+            self.previous = self.active
+            self.swaps += 1
+        self._routing = (active, self._models[active], canary, self._models[canary] if canary else None,
+                         percent if canary else 0.0)
+        VERSION_TRAFFIC.remove(model=self.kind)
+        VERSION_TRAFFIC.set(100.0 - self._routing[4], model=self.kind, version=active)
+        if canary:
+            VERSION_TRAFFIC.set(self._routing[4], model=self.kind, version=canary)
+        record_model_version(self.kind, active)
+        self._evict()
+
+    def _evict(self, added=None):
+        # Called with the lock held. The version just added is never dropped,
+        # so when active, canary and previous already fill keep, it stays
+        # resident (one over keep) until it is routed or replaced.
+        pinned = {self.active, self.canary, self.previous, added}
+        for version in list(self._models):
+            if len(self._models) <= self.keep:
+                break
+            if version not in pinned:
+                del self._models[version]
+
+    def pick(self):
+        # (version, model) for one request or micro-batch
+        active, active_model, canary, canary_model, percent = self._routing
+        if canary is not None and random.random() * 100.0 < percent:
+            return canary, canary_model
+        return active, active_model
+
+    def observe(self, version, seconds, results):
+        VERSION_SECONDS.observe(seconds, model=self.kind, version=version)
+        # Semantic index hits carry the labels stored in the (shared) index,
+        # not this version's predictions, so they are counted apart and kept
+        # out of its confidence
+        own = [r for r in results if r.get("source") != "index"]
+        confidences = [r[self.confidence_key] for r in own if self.confidence_key in r]
+        for confidence in confidences:
+            VERSION_CONFIDENCE.observe(confidence, model=self.kind, version=version)
+        with self._lock:
+            stats = self._stats.setdefault(version, [0, 0, 0.0, 0.0, 0])
+            stats[0] += 1
+            stats[1] += len(confidences)
+            stats[2] += seconds
+            stats[3] += sum(confidences)
+            stats[4] += len(results) - len(own)
+
+    def poll(self):
+        # Loads versions saved since the last poll; returns the ones loaded
+        loaded = []
+        for version in list_versions(self.model_dir, self.kind):
+            if version in self._known:
+                continue
+            try:
+                self.load(version)
+                if self.canary_percent > 0 and self.active is not None:
+                    self.set_canary(version, self.canary_percent)
+                else:
+                    self.activate(version)
+            except Exception as e:
+                self.last_error = f"{version}: {e}"
+                print(f"Skipping {self.kind} model version {version}: {e}")
+                continue
+            loaded.append(version)
+        return loaded
+
+    def watch(self, interval):
+        if self._watcher is None and interval > 0:
+            self._watcher = threading.Thread(target=self._watch, args=(interval,), daemon=True,
+                                             name=f"{self.kind}-registry")
+            self._watcher.start()
+
+    def _watch(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.poll()
+            except Exception as e:
+                self.last_error = str(e)
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        with self._lock:
+            versions = {}
+            for version in self._models:
+                calls, n, seconds, confidence, index_hits = self._stats.get(version, [0, 0, 0.0, 0.0, 0])
+                versions[version] = {
+                    "calls": calls,
+                    "avg_ms": 1000.0 * seconds / calls if calls else 0.0,
+                    "avg_confidence": confidence / n if n else None,
+                    "index_hits": index_hits,
+                }
+            return {
+                "active": self.active,
+                "canary": self.canary,
+                "canary_percent": self._routing[4],
+                "previous": self.previous,
+                "resident": versions,
+                "keep": self.keep,
+                "swaps": self.swaps,
+                "load_errors": self.load_errors,
+                "last_error": self.last_error,
+            }
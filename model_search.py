@@ -0,0 +1,281 @@
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from threadpoolctl import threadpool_limits
+
+from models.adaptive_module import AdaptiveLearningModel
+from models.embedding_cache import DEFAULT_CACHE_PATH
+from models.evaluation import ADAPTIVE_LABEL_COLUMNS, median_ms, model_nbytes
+from models.nlp_module import QueryUnderstandingModel
+
+# Hyperparameter search over model families, scored on held-out accuracy,
+# inference latency and model size.
+#
+# 1. search    successive halving: every candidate is fitted on a quarter of
+#              the training split, the better half goes on to twice the
+#              data, and so on until the survivors see all of it. Fits run
+#              in parallel, one single-threaded process per candidate;
+#              gradient boosting also stops adding trees once its own
+#              validation loss stops improving.
+# 2. measure   the survivors' latency (batch 1 and the whole validation set)
+#              and size are measured one at a time in this process
+# 3. select    among the Pareto-optimal candidates (no other one is at least
+#              as accurate, as fast and as small), the fastest one within
+#              --accuracy-tolerance of the best accuracy
+# 4. save      the winner is retrained on all the data and saved as a new
+#              artifact version, with the evaluation report in its metadata
+#
+#     python model_search.py --module adaptive --report search_adaptive.json
+
+MP_CONTEXT = multiprocessing.get_context("spawn")
+
+ADAPTIVE_CANDIDATES = (
+    [('separate', {}), ('multi_forest', {})] +
+    [('hist_gbdt', {'learning_rate': lr, 'max_leaf_nodes': leaves})
+     for lr in (0.05, 0.1, 0.3) for leaves in (7, 15, 31)]
+)
+
+NLP_CANDIDATES = (
+    [('separate', {}), ('multi_forest', {})] +
+    [('linear', {'C': c}) for c in (0.1, 0.3, 1.0, 3.0, 10.0)]
+)
+
+# Set in each worker by _init_worker
+_data = {}
+
+
+def candidate_name(mode, params):
+    if not params:
+        return mode
+    return mode + "(" + ", ".join(f"{k}={v}" for k, v in sorted(params.items())) + ")"
+
+
+def _init_worker(module, train, validation):
+    _data.update(module=module, train=train, validation=validation)
+
+
+def _new_model(module, mode, params):
+    if module == 'nlp':
+        return QueryUnderstandingModel(head_mode=mode, head_params=params, compiled_forests=True)
+    return AdaptiveLearningModel(head_mode=mode, head_params=params, compiled_forests=True)
+
+
+def _accuracy(module, model, validation):
+    # {target: accuracy} on the validation split
+    if module == 'nlp':
+        X, labels = validation
+        predictions = model.predict_labels(X)
+        return {name: round(float(np.mean(predicted == labels[name].values)), 4)
+                for (name, _), (predicted, _) in zip(model.CLASSIFIERS, predictions)}
+    results = model.predict_batch(validation)
+    accuracy = {}
+    for name, column in ADAPTIVE_LABEL_COLUMNS.items():
+        predicted = np.array([r.get(name) for r in results], dtype=object)
+        accuracy[name] = round(float(np.mean(predicted == validation[column].values)), 4)
+    return accuracy
+
+
+def _fit_candidate(mode, params, n_rows, keep_model):
+    # Runs in a worker: fit on the first n_rows of the (shuffled) training
+    # split and score on the validation split. keep_model returns the fitted
+    # classifiers so the parent can time them.
+    module, train, validation = _data["module"], _data["train"], _data["validation"]
+    model = _new_model(module, mode, params)
+    with threadpool_limits(1):
+        start = time.perf_counter()
+        if module == 'nlp':
+            X, labels = train
+            model.fit(X[:n_rows], labels.iloc[:n_rows])
+        else:
+            model.fit(train.iloc[:n_rows])
+        train_seconds = time.perf_counter() - start
+        model.compile_forests()
+        accuracy = _accuracy(module, model, validation)
+    fitted = None
+    if keep_model:
+        fitted = (model.head, {attr: getattr(model, attr) for attr in _classifier_attrs(model)},
+                  {attr: getattr(model, attr) for _, attr in getattr(model, 'ENCODERS', [])})
+    return {"train_seconds": round(train_seconds, 3), "accuracy": accuracy}, fitted
+
+
+def _classifier_attrs(model):
+    if isinstance(model, QueryUnderstandingModel):
+        return [attr for _, attr in model.CLASSIFIERS]
+    return [attr for _, attr, _ in model.TARGETS]
+
+
+def _restore(module, mode, params, fitted):
+    model = _new_model(module, mode, params)
+    head, classifiers, encoders = fitted
+    model.head = head
+    for attr, value in {**classifiers, **encoders}.items():
+        setattr(model, attr, value)
+    model.compile_forests()
+    return model
+
+
+def successive_halving(module, candidates, train, validation, n_train, workers, min_fraction):
+    # Returns {candidate name: result} for every candidate, with the fitted
+    # classifiers of the ones that reached the full training split
+    rounds = max(1, int(math.ceil(math.log2(1 / min_fraction))) + 1)
+    results = {}
+    fitted = {}
+    survivors = list(candidates)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=MP_CONTEXT, initializer=_init_worker,
+                             initargs=(module, train, validation)) as pool:
+        for r in range(rounds):
+            last = r == rounds - 1
+            n_rows = n_train if last else max(1, int(n_train * min_fraction * 2 ** r))
+            print(f"Round {r + 1}/{rounds}: {len(survivors)} candidates on {n_rows} rows")
+            futures = [(mode, params, pool.submit(_fit_candidate, mode, params, n_rows, last))
+                       for mode, params in survivors]
+            scored = []
+            for mode, params, future in futures:
+                name = candidate_name(mode, params)
+                result, model = future.result()
+                result["mean_accuracy"] = round(float(np.mean(list(result["accuracy"].values()))), 4)
+                results[name] = {"mode": mode, "params": params, "rows": n_rows, "round": r + 1, **result}
+                if model is not None:
+                    fitted[name] = model
+                scored.append((result["mean_accuracy"], mode, params))
+                print(f"  {name}: accuracy {result['mean_accuracy']:.4f} ({result['train_seconds']:.1f}s)")
+            if not last:
+                # Early stopping for the search: only the better half sees more data
+                scored.sort(key=lambda s: -s[0])
+                survivors = [(mode, params) for _, mode, params in scored[:max(1, (len(scored) + 1) // 2)]]
+    return results, fitted
+
+
+def pareto_front(entries):
+    # Entries no other entry beats on accuracy, latency and size at once
+    front = []
+    for e in entries:
+        dominated = any(
+            o["mean_accuracy"] >= e["mean_accuracy"] and o["latency_ms_batch1"] <= e["latency_ms_batch1"]
+            and o["size_bytes"] <= e["size_bytes"]
+            and (o["mean_accuracy"] > e["mean_accuracy"] or o["latency_ms_batch1"] < e["latency_ms_batch1"]
+                 or o["size_bytes"] < e["size_bytes"])
+            for o in entries
+        )
+        if not dominated:
+            front.append(e)
+    return front
+
+
+def select(front, accuracy_tolerance):
+    best = max(e["mean_accuracy"] for e in front)
+    eligible = [e for e in front if e["mean_accuracy"] >= best - accuracy_tolerance]
+    return min(eligible, key=lambda e: (e["latency_ms_batch1"], e["size_bytes"], -e["mean_accuracy"]))
+
+
+def search(module, data_path, model_dir, workers, min_fraction, accuracy_tolerance, repeats,
+           test_size=0.2, cache_path=DEFAULT_CACHE_PATH):
+    df = pd.read_csv(data_path)
+    train_df, validation_df = train_test_split(df, test_size=test_size, random_state=42)
+    encoder_model = None
+    if module == 'nlp':
+        encoder_model = QueryUnderstandingModel(model_dir=model_dir, cache_path=cache_path)
+        print("Encoding queries...")
+        label_names = [name for name, _ in QueryUnderstandingModel.CLASSIFIERS]
+        train = (encoder_model.encode(train_df['query'].tolist()), train_df[label_names].reset_index(drop=True))
+        validation = (encoder_model.encode(validation_df['query'].tolist()),
+                      validation_df[label_names].reset_index(drop=True))
+        candidates = NLP_CANDIDATES
+    else:
+        train, validation = train_df.reset_index(drop=True), validation_df.reset_index(drop=True)
+        candidates = ADAPTIVE_CANDIDATES
+
+    start = time.perf_counter()
+    results, fitted = successive_halving(module, candidates, train, validation, len(train_df),
+                                         workers, min_fraction)
+    search_seconds = time.perf_counter() - start
+
+    # Latency and size of the finalists, measured serially so they do not
+    # compete for cores
+    finalists = []
+    for name, model_parts in fitted.items():
+        entry = results[name]
+        model = _restore(module, entry["mode"], entry["params"], model_parts)
+        if module == 'nlp':
+            X = validation[0]
+            entry["latency_ms_batch1"] = median_ms(lambda: model.predict_labels(X[:1]), repeats)
+            entry[f"latency_ms_batch{len(X)}"] = median_ms(lambda: model.predict_labels(X), max(3, repeats // 10))
+        else:
+            entry["latency_ms_batch1"] = median_ms(lambda: model.predict_batch(validation.head(1)), repeats)
+            entry[f"latency_ms_batch{len(validation)}"] = median_ms(lambda: model.predict_batch(validation),
+                                                                    max(3, repeats // 10))
+        entry["size_bytes"] = model_nbytes(model, _classifier_attrs(model))
+        entry["name"] = name
+        finalists.append(entry)
+
+    front = pareto_front(finalists)
+    for entry in finalists:
+        entry["pareto"] = entry in front
+    winner = select(front, accuracy_tolerance)
+    print(f"Selected {winner['name']}: accuracy {winner['mean_accuracy']:.4f}, "
+          f"{winner['latency_ms_batch1']} ms per query, {winner['size_bytes'] / 1e6:.2f} MB")
+
+    report = {
+        "module": module,
+        "data": data_path,
+        "train_rows": len(train_df),
+        "validation_rows": len(validation_df),
+        "min_fraction": min_fraction,
+        "accuracy_tolerance": accuracy_tolerance,
+        "search_seconds": round(search_seconds, 1),
+        "selected": winner["name"],
+        "candidates": sorted(results.values(), key=lambda e: (-e["round"], -e["mean_accuracy"])),
+    }
+    for entry in report["candidates"]:
+        entry.setdefault("name", candidate_name(entry["mode"], entry["params"]))
+
+    # Retrain the winner on all the data (the validation rows included)
+    print(f"Retraining {winner['name']} on {len(df)} rows...")
+    model = _new_model(module, winner["mode"], winner["params"])
+    model.model_dir = model_dir
+    model.evaluation = {key: winner[key] for key in winner if key not in ("round", "rows", "pareto")}
+    if encoder_model is not None:
+        # Embeddings come from the cache filled during the search
+        model.share_resources(encoder_model)
+    model.train(data_path)
+    report["version"] = model.version
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search model families for the Pareto-best accuracy/latency/size")
+    parser.add_argument("--module", choices=["adaptive", "nlp"], default="adaptive")
+    parser.add_argument("--data", default=None,
+                        help="training CSV (default: data/synthetic_interactions.csv or data/synthetic_queries.csv)")
+    parser.add_argument("--model-dir", default="models/saved_models")
+    parser.add_argument("--cache-path", default=DEFAULT_CACHE_PATH, help="embedding cache for --module nlp")
+    parser.add_argument("--workers", type=int, default=None, help="parallel fits (default: all cores)")
+    parser.add_argument("--min-fraction", type=float, default=0.25,
+                        help="share of the training split every candidate starts with")
+    parser.add_argument("--accuracy-tolerance", type=float, default=0.005,
+                        help="accuracy the selected model may give up for speed")
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--report", default=None, help="also write the report to this JSON file")
+    args = parser.parse_args()
+
+    data_path = args.data or ("data/synthetic_queries.csv" if args.module == "nlp"
+                              else "data/synthetic_interactions.csv")
+    report = search(args.module, data_path, args.model_dir, args.workers or os.cpu_count() or 1,
+                    args.min_fraction, args.accuracy_tolerance, args.repeats, cache_path=args.cache_path)
+    text = json.dumps(report, indent=2)
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+import numpy as np
+from scipy import sparse
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+from models.forest_engine import FlatForest, classes_array, compile_forest
+
+try:
+    # sklearn's compiled per-tree predictor (private API), used for large
+    # batches by HistGradientBoostingHead
+    from sklearn.ensemble._hist_gradient_boosting.common import PREDICTOR_RECORD_DTYPE, X_BITSET_INNER_DTYPE
+    from sklearn.ensemble._hist_gradient_boosting.predictor import TreePredictor
+except ImportError:
+    TreePredictor = None
+
+# Multi-head classifiers: one model predicts every target from one pass over
+# shared features, instead of one independent forest per target.
+#
+# Every head implements fit(X, Y) with Y shaped (n_samples, n_targets) and
+# predict_all(X) returning one (labels, confidences) pair per target.
+
+HEAD_MODES = ['separate', 'multi_forest', 'linear', 'hist_gbdt']
+
+
+def _softmax_segments(logits, offsets):
+    out = []
+    for k in range(len(offsets) - 1):
+        z = logits[:, offsets[k]:offsets[k + 1]]
+        z = np.exp(z - z.max(axis=1, keepdims=True))
+        out.append(z / z.sum(axis=1, keepdims=True))
+    return out
+
+
+class MultiOutputForestHead:
+    """A single multi-output random forest over all targets.
+
+    The trees split on all targets jointly, so there is one forest to train,
+    store and traverse instead of one per target.
+    """
+
+    ARTIFACT_TYPE = 'flat_forest'
+
+    def __init__(self, forest=None, n_estimators=100, random_state=42, n_jobs=None):
+        self.forest = forest or RandomForestClassifier(
+            n_estimators=n_estimators, random_state=random_state, n_jobs=n_jobs
+        )
+
+    def fit(self, X, Y):
+        self.forest.fit(X, np.asarray(Y))
+        return self
+
+    def compile(self, n_threads=1):
+        self.forest = compile_forest(self.forest, n_threads=n_threads)
+        return self
+
+    def predict_all(self, X):
+        if not isinstance(self.forest, FlatForest):
+            self.compile()
+        return self.forest.predict_with_confidence(X)
+
+    def nbytes(self):
+        return self.compile().forest.nbytes()
+
+
+class LinearMultiHead:
+    """Multinomial logistic heads over shared features, fused into one matmul.
+
+    Each target gets its own LogisticRegression at fit time; the coefficient
+    matrices are then stacked column-wise so inference is a single
+    X @ weights + bias followed by a softmax per target segment. Binary
+    targets are stored as [0, z] logits, which softmax turns into the same
+    sigmoid probabilities sklearn reports.
+    """
+
+    ARTIFACT_TYPE = 'linear_head'
+    FIELDS = ['weights', 'bias', 'offsets']
+
+    def __init__(self, weights=None, bias=None, offsets=None, classes=None, C=1.0, max_iter=1000):
+        self.weights = weights
+        self.bias = bias
+        self.offsets = offsets
+        self.classes = [classes_array(list(c)) for c in classes] if classes is not None else None
+        self.C = C
+        self.max_iter = max_iter
+
+    def fit(self, X, Y):
+        # X may be a scipy sparse matrix (see lexical.py)
+        X = X if sparse.issparse(X) else np.asarray(X, dtype=np.float32)
+        Y = np.asarray(Y)
+        weights, biases, offsets, classes = [], [], [0], []
+        for k in range(Y.shape[1]):
+            clf = LogisticRegression(C=self.C, max_iter=self.max_iter)
+            clf.fit(X, Y[:, k])
+            coef, intercept = clf.coef_, clf.intercept_
+            if len(clf.classes_) == 2:
+                coef = np.vstack([np.zeros_like(coef), coef])
+                intercept = np.concatenate([[0.0], intercept])
+            weights.append(coef.T)
+            biases.append(intercept)
+            offsets.append(offsets[-1] + len(clf.classes_))
+            classes.append(clf.classes_)
+        self.weights = np.hstack(weights).astype(np.float32)
+        self.bias = np.concatenate(biases).astype(np.float32)
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.classes = [classes_array(list(c)) for c in classes]
+        return self
+
+    def predict_proba_all(self, X):
+        X = X if sparse.issparse(X) else np.asarray(X, dtype=np.float32)
+        logits = X @ self.weights + self.bias
+        return _softmax_segments(logits, self.offsets)
+
+    def predict_all(self, X):
+        pairs = []
+        for c, p in zip(self.classes, self.predict_proba_all(X)):
+            best = np.argmax(p, axis=1)
+            pairs.append((c.take(best), p[np.arange(len(best)), best].astype(np.float64)))
+        return pairs
+
+    def compile(self, n_threads=1):
+        return self
+
+    def arrays(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def artifact_spec(self):
+        return {
+            "n_features": int(self.weights.shape[0]),
+            "classes": [c.tolist() for c in self.classes],
+        }
+
+    @classmethod
+    def from_artifact(cls, arrays, spec):
+        return cls(arrays["weights"], arrays["bias"], arrays["offsets"], spec["classes"])
+
+    def nbytes(self):
+        return sum(a.nbytes for a in self.arrays().values())
+
+
+class HistGradientBoostingHead:
+    """One HistGradientBoostingClassifier per target, flattened for inference.
+
+    After fit the boosted trees of every target are concatenated into flat
+    node arrays (like FlatForest) and the sklearn estimators are dropped.
+    Each tree adds its leaf value to one logit column; a softmax per target
+    segment gives the probabilities. Binary targets get a fixed 0 logit next
+    to the boosted one, as in LinearMultiHead. Small batches walk the arrays
+    in numpy; large ones run sklearn's compiled tree predictor, rebuilt from
+    the same arrays.
+    """
+
+    ARTIFACT_TYPE = 'hist_gbdt'
+    FIELDS = ['feature', 'threshold', 'missing_left', 'left', 'right', 'value', 'roots', 'columns',
+              'baseline', 'offsets']
+
+    def __init__(self, arrays=None, classes=None, learning_rate=0.1, max_iter=200, max_leaf_nodes=31,
+                 max_depth=None, l2_regularization=0.0, early_stopping=True, random_state=42):
+        for name in self.FIELDS:
+            setattr(self, name, (arrays or {}).get(name))
+        self.classes = [classes_array(list(c)) for c in classes] if classes is not None else None
+        self.params = dict(learning_rate=learning_rate, max_iter=max_iter, max_leaf_nodes=max_leaf_nodes,
+                           max_depth=max_depth, l2_regularization=l2_regularization,
+                           early_stopping=early_stopping, random_state=random_state)
+        self.n_iter = None
+        self.depth = 0
+        self.n_threads = 1
+        # sklearn tree predictors rebuilt from the flat arrays on first use;
+        # False when that API is not available
+        self._predictors = None
+
+    def fit(self, X, Y):
+        X = np.asarray(X, dtype=np.float64)
+        Y = np.asarray(Y)
+        nodes, roots, columns, baseline, offsets, classes, n_iter = [], [], [], [], [0], [], []
+        n_nodes = 0
+        for k in range(Y.shape[1]):
+            params = dict(self.params)
+            if np.unique(Y[:, k], return_counts=True)[1].min() < 2:
+                # The stratified validation split needs two rows per class
+                params['early_stopping'] = False
+            clf = HistGradientBoostingClassifier(**params).fit(X, Y[:, k])
+            binary = len(clf.classes_) == 2
+            base = clf._baseline_prediction.ravel()
+            baseline.extend([0.0, base[0]] if binary else base)
+            for iteration in clf._predictors:
+                for j, predictor in enumerate(iteration):
+                    tree = predictor.nodes
+                    if tree['is_categorical'].any():
+                        raise ValueError("Categorical splits are not supported")
+                    nodes.append(tree)
+                    roots.append(n_nodes)
+                    columns.append(offsets[-1] + (1 if binary else j))
+                    n_nodes += len(tree)
+            offsets.append(offsets[-1] + len(clf.classes_))
+            classes.append(clf.classes_)
+            n_iter.append(int(clf.n_iter_))
+
+        # Child indices become absolute; leaves point at themselves so a
+        # fixed-depth walk can keep stepping
+        tree_starts = np.repeat(roots, [len(t) for t in nodes])
+        all_nodes = np.concatenate(nodes)
+        is_leaf = all_nodes['is_leaf'].astype(bool)
+        own = np.arange(len(all_nodes))
+        self.feature = np.where(is_leaf, 0, all_nodes['feature_idx']).astype(np.int32)
+        self.threshold = np.where(is_leaf, np.inf, all_nodes['num_threshold']).astype(np.float64)
+        self.missing_left = all_nodes['missing_go_to_left'].astype(np.uint8)
+        self.left = np.where(is_leaf, own, all_nodes['left'] + tree_starts).astype(np.int32)
+        self.right = np.where(is_leaf, own, all_nodes['right'] + tree_starts).astype(np.int32)
+        self.value = all_nodes['value'].astype(np.float64)
+        self.roots = np.array(roots, dtype=np.int32)
+        self.columns = np.array(columns, dtype=np.int32)
+        self.baseline = np.array(baseline, dtype=np.float64)
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.classes = [classes_array(list(c)) for c in classes]
+        self.n_iter = n_iter
+        self.depth = int(all_nodes['depth'].max())
+        self._predictors = None
+        return self
+
+    # Batches of at least this many rows run on sklearn's compiled tree
+    # predictor; smaller ones are walked in numpy, which has less overhead
+    # per call but is several times slower per row
+    COMPILED_MIN_ROWS = 64
+    # (sample, tree) pairs walked at once by the numpy path
+    BLOCK_PAIRS = 1 << 20
+
+    def predict_proba_all(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        n = len(X)
+        predictors = self._tree_predictors() if n >= self.COMPILED_MIN_ROWS else None
+        if predictors:
+            # Trees added in order, as HistGradientBoostingClassifier does
+            logits = np.tile(self.baseline, (n, 1))
+            f_idx_map = np.zeros(X.shape[1], dtype=np.uint32)
+            no_categories = np.zeros((0, 8), dtype=X_BITSET_INNER_DTYPE)
+            for predictor, column in zip(predictors, self.columns):
+                logits[:, column] += predictor.predict(X, no_categories, f_idx_map, self.n_threads)
+        else:
+            logits = np.empty((n, len(self.baseline)))
+            block = max(1, self.BLOCK_PAIRS // len(self.roots))
+            for start in range(0, n, block):
+                logits[start:start + block] = self._logits(X[start:start + block])
+        return _softmax_segments(logits, self.offsets)
+
+    def _tree_predictors(self):
+        if self._predictors is None:
+            self._predictors = False
+            if TreePredictor is not None:
+                try:
+                    self._predictors = self._build_tree_predictors()
+                except (TypeError, ValueError) as e:
+                    print(f"Compiled tree predictor unavailable ({e}); using the numpy walk.")
+        return self._predictors
+
+    def _build_tree_predictors(self):
+        # One TreePredictor per tree, with tree-relative child indices
+        predictors = []
+        no_categories = np.zeros((0, 8), dtype=X_BITSET_INNER_DTYPE)
+        ends = np.append(self.roots[1:], len(self.value))
+        for start, end in zip(self.roots, ends):
+            own = np.arange(start, end)
+            leaf = self.left[start:end] == own
+            nodes = np.zeros(end - start, dtype=PREDICTOR_RECORD_DTYPE)
+            nodes['value'] = self.value[start:end]
+            nodes['is_leaf'] = leaf
+            nodes['feature_idx'] = self.feature[start:end]
+            nodes['num_threshold'] = np.where(leaf, 0.0, self.threshold[start:end])
+            nodes['missing_go_to_left'] = self.missing_left[start:end]
+            nodes['left'] = np.where(leaf, 0, self.left[start:end] - start)
+            nodes['right'] = np.where(leaf, 0, self.right[start:end] - start)
+            predictors.append(TreePredictor(nodes, no_categories, no_categories))
+        # One row through every tree, so an incompatible sklearn fails here
+        # rather than on a request
+        probe = np.zeros((1, int(self.feature.max()) + 1))
+        for predictor in predictors:
+            predictor.predict(probe, no_categories, np.zeros(probe.shape[1], dtype=np.uint32), 1)
+        return predictors
+
+    def _logits(self, X):
+        n, n_cols = len(X), len(self.baseline)
+        # Walk all trees at once, one entry per (sample, tree) pair; pairs
+        # drop out as they reach a leaf, so the walk ends at the deepest leaf
+        # actually reached rather than the deepest one in the model
+        idx = np.tile(self.roots, n)
+        sample = np.repeat(np.arange(n, dtype=np.int32), len(self.roots))
+        active = np.flatnonzero(self.left[idx] != idx)
+        while len(active):
+            node = idx[active]
+            x = X[sample[active], self.feature[node]]
+            go_left = (x <= self.threshold[node]) | (np.isnan(x) & (self.missing_left[node] == 1))
+            node = np.where(go_left, self.left[node], self.right[node])
+            idx[active] = node
+            active = active[self.left[node] != node]
+        # Leaf values summed per (sample, logit column) in tree order
+        cells = sample.astype(np.int64) * n_cols + np.tile(self.columns, n)
+        sums = np.bincount(cells, weights=self.value[idx], minlength=n * n_cols)
+        return self.baseline + sums.reshape(n, n_cols)
+
+    def predict_all(self, X):
+        pairs = []
+        for c, p in zip(self.classes, self.predict_proba_all(X)):
+            best = np.argmax(p, axis=1)
+            pairs.append((c.take(best), p[np.arange(len(best)), best].astype(np.float64)))
+        return pairs
+
+    def compile(self, n_threads=1):
+        # Threads of the compiled predictor for large batches
+        self.n_threads = n_threads
+        return self
+
+    def arrays(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def artifact_spec(self):
+        return {"classes": [c.tolist() for c in self.classes], "depth": self.depth, "n_iter": self.n_iter}
+
+    @classmethod
+    def from_artifact(cls, arrays, spec):
+        head = cls(arrays, spec["classes"])
+        head.depth = spec["depth"]
+        head.n_iter = spec.get("n_iter")
+        return head
+
+    def nbytes(self):
+        return sum(a.nbytes for a in self.arrays().values())
+
+
+def create_head(mode, n_jobs=None, **params):
+    # params: hyperparameters of the head (e.g. C for 'linear')
+    if mode == 'multi_forest':
+        return MultiOutputForestHead(n_jobs=n_jobs, **params)
+    if mode == 'linear':
+        return LinearMultiHead(**params)
+    if mode == 'hist_gbdt':
+        return HistGradientBoostingHead(**params)
+    raise ValueError(f"Unknown head mode '{mode}'. Choose from {HEAD_MODES}")
+
+
+def head_from_artifact(model):
+    # model: the object load_artifact returned for the 'head' entry
+    if isinstance(model, FlatForest):
+        return MultiOutputForestHead(forest=model)
+    return model
@@ -1,116 +1,486 @@
-import pandas as pd
-import numpy as np
-import pickle
-import os
-from sentence_transformers import SentenceTransformer
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report
-
-class QueryUnderstandingModel:
-    def __init__(self, model_name='all-MiniLM-L6-v2', model_dir='models/saved_models'):
-        self.model_name = model_name
-        self.encoder = SentenceTransformer(model_name)
-        self.model_dir = model_dir
-        
-        self.intent_classifier = RandomForestClassifier(n_estimators=100, random_state=42)
-        self.topic_classifier = RandomForestClassifier(n_estimators=100, random_state=42)
-        self.difficulty_classifier = RandomForestClassifier(n_estimators=100, random_state=42)
-        
-        if not os.path.exists(model_dir):
-            os.makedirs(model_dir)
-
-    def train(self, data_path):
-        print("Loading data...")
-        df = pd.read_csv(data_path)
-        
-        print("Encoding queries...")
-        embeddings = self.encoder.encode(df['query'].tolist(), show_progress_bar=True)
-        
-        X = embeddings
-        y_intent = df['intent']
-        y_topic = df['topic']
-        y_difficulty = df['difficulty']
-        
-        print("Training Intent Classifier...")
-        self.intent_classifier.fit(X, y_intent)
-        
-        print("Training Topic Classifier...")
-        self.topic_classifier.fit(X, y_topic)
-        
-        print("Training Difficulty Classifier...")
-        self.difficulty_classifier.fit(X, y_difficulty)
-        
-        print("Saving models...")
-        self.save_models()
-        print("Training complete.")
-
-    def extract_keywords(self, text):
-        # Simple keyword extraction (placeholder for more complex logic)
-        # Remove common stopwords and return unique words > 3 chars
-        stopwords = set(['what', 'is', 'the', 'how', 'to', 'in', 'of', 'and', 'a', 'an', 'for', 'explain', 'show', 'me', 'example', 'help', 'can'])
-        words = text.lower().replace('?', '').replace('.', '').split()
-        keywords = [w for w in words if w not in stopwords and len(w) > 2]
-        return list(set(keywords))[:5] # Return top 5 unique
-
-    def predict(self, query):
-        embedding = self.encoder.encode([query])
-        
-        intent = self.intent_classifier.predict(embedding)[0]
-        intent_prob = np.max(self.intent_classifier.predict_proba(embedding)[0])
-        
-        topic = self.topic_classifier.predict(embedding)[0]
-        topic_prob = np.max(self.topic_classifier.predict_proba(embedding)[0])
-        
-        difficulty = self.difficulty_classifier.predict(embedding)[0]
-        difficulty_prob = np.max(self.difficulty_classifier.predict_proba(embedding)[0])
-        
-        keywords = self.extract_keywords(query)
-        
-        # Simple rule-based suggestion
-        suggestions = {
-            "Explanation": "Define the concept clearly and provide a high-level overview.",
-            "Example": "Provide a code snippet or a real-world analogy.",
-            "Doubt clarification": "Address the specific confusion and contrast with related concepts.",
-            "Revision": "Summarize key points and formulas."
-        }
-        suggestion = suggestions.get(intent, "Answer the query directly.")
-
-        return {
-            "intent": intent,
-            "intent_conf": round(intent_prob * 100),
-            "topic": topic,
-            "topic_conf": round(topic_prob * 100),
-            "difficulty": difficulty,
-            "difficulty_conf": round(difficulty_prob * 100),
-            "keywords": keywords,
-            "suggestion": suggestion
-        }
-
-    def save_models(self):
-        with open(f"{self.model_dir}/intent_clf.pkl", "wb") as f:
-            pickle.dump(self.intent_classifier, f)
-        with open(f"{self.model_dir}/topic_clf.pkl", "wb") as f:
-            pickle.dump(self.topic_classifier, f)
-        with open(f"{self.model_dir}/difficulty_clf.pkl", "wb") as f:
-            pickle.dump(self.difficulty_classifier, f)
-
-    def load_models(self):
-        try:
-            with open(f"{self.model_dir}/intent_clf.pkl", "rb") as f:
-                self.intent_classifier = pickle.load(f)
-            with open(f"{self.model_dir}/topic_clf.pkl", "rb") as f:
-                self.topic_classifier = pickle.load(f)
-            with open(f"{self.model_dir}/difficulty_clf.pkl", "rb") as f:
-                self.difficulty_classifier = pickle.load(f)
-            print("Models loaded successfully.")
-            return True
-        except FileNotFoundError:
-            print("Saved models not found. Please train first.")
-            return False
-
-if __name__ == "__main__":
-    # Example usage for training
-    model = QueryUnderstandingModel()
-    # data_path = "../data/synthetic_queries.csv"
-    # model.train(data_path)
+import pandas as pd
+import numpy as np
+import pickle
+import os
+import threading
+import time
+from sklearn.ensemble import RandomForestClassifier
+from models.embedding_cache import EmbeddingCache
+from models.encoder_backends import create_encoder
+from models.feature_store import DEFAULT_CHUNK_SIZE, ingest, is_parquet, read_chunks
+from models.forest_engine import classes_array, compile_forest
+from models.keywords import KeywordExtractor
+from models.lexical import LexicalClassifier
+from models.metrics import REGISTRY, StageTimer, count_labels, record_model_load
+from models.multihead import MultiOutputForestHead, create_head, head_from_artifact
+from models.responses import percent, suggestions_for
+from models.model_artifacts import (ArtifactError, file_sha256, latest_version_dir, list_versions, load_artifact,
+                                    save_artifact)
+from models.semantic_index import SemanticIndex
+
+ARTIFACT_KIND = 'nlp'
+
+CASCADE_ROWS = REGISTRY.counter(
+    "cascade_rows_total", "Queries answered by the lexical model or escalated to the encoder", ["model", "path"])
+
+def _code_labels(vocab, codes):
+    # The labels that a feature store's category codes stand for
+    return classes_array(vocab)[np.asarray(codes, dtype=np.int64)]
+
+class QueryUnderstandingModel:
+    # (artifact name, classifier attribute)
+    CLASSIFIERS = [
+        ('intent', 'intent_classifier'),
+        ('topic', 'topic_classifier'),
+        ('difficulty', 'difficulty_classifier')
+    ]
+
+    def __init__(self, model_name='all-MiniLM-L6-v2', model_dir='models/saved_models',
+                 cache_size=10000, cache_ttl=None, cache_path=None,
+                 encoder_backend='sentence-transformers', onnx_dir=None, encoder_threads=None,
+                 compiled_forests=False, forest_threads=1, head_mode='separate', head_params=None, n_jobs=None,
+                 semantic_index=False, similarity_threshold=0.95, similar_k=3, index_min_conf=None,
+                 cascade_threshold=None):
+        self.model_name = model_name
+        self.model_dir = model_dir
+        # Passed to the random forests for parallel tree building
+        self.n_jobs = n_jobs
+
+        # 'separate' trains one forest per target; the other modes predict all
+        # three targets with one model (see multihead.py). head_params are
+        # passed to that model, e.g. the hyperparameters model_search.py picked.
+        self.head_mode = head_mode
+        self.head_params = head_params or {}
+        self.head = None
+        # Held-out evaluation saved with the artifact (see model_search.py)
+        self.evaluation = None
+
+        # Artifact-loaded classifiers always run on the flat-array forest
+        # engine; compiled_forests also converts freshly trained ones
+        self.compiled_forests = compiled_forests
+        self.forest_threads = forest_threads
+
+        # The encoder (and torch / onnxruntime with it) is only loaded on first
+        # use, see the encoder property
+        self.encoder_backend = encoder_backend
+        self.onnx_dir = onnx_dir
+        # Intra-op threads for the encoder (None: the library default)
+        self.encoder_threads = encoder_threads
+        self._encoder = None
+        self._encoder_lock = threading.Lock()
+
+        # Repeated queries (and overlapping training CSVs) reuse embeddings.
+        # Backends other than sentence-transformers produce slightly different
+        # vectors, so they get their own namespace.
+        namespace = model_name if encoder_backend == 'sentence-transformers' else f"{model_name}@{encoder_backend}"
+        self.embedding_cache = EmbeddingCache(namespace, max_entries=cache_size,
+                                              ttl_seconds=cache_ttl, disk_path=cache_path)
+
+        # Optional nearest-neighbour fast path over labelled queries: a match
+        # at or above similarity_threshold answers with its stored labels and
+        # skips the classifiers, and similar_k past questions are returned.
+        # With index_min_conf (percent), queries the classifiers answered with
+        # at least that confidence on every label are added to the index.
+        self.use_semantic_index = semantic_index
+        self.similarity_threshold = similarity_threshold
+        self.similar_k = similar_k
+        self.index_min_conf = index_min_conf
+        self.semantic_index = None
+        self.semantic_index_path = os.path.join(model_dir, 'semantic_index', namespace.replace('/', '_'))
+        
+        self.intent_classifier = self._new_forest()
+        self.topic_classifier = self._new_forest()
+        self.difficulty_classifier = self._new_forest()
+
+        # IDF weights come from the training queries and are saved with the
+        # classifiers
+        self.keyword_extractor = KeywordExtractor()
+
+        # Cascade: a hashed n-gram model over the raw text, trained with the
+        # classifiers, answers queries when its confidence on every label is
+        # at least cascade_threshold (0-1); the others take the encoder path.
+        # None disables the cascade.
+        self.lexical_model = None
+        self.cascade_threshold = cascade_threshold
+        self.cascade_counts = {"lexical": 0, "escalated": 0}
+        
+        # Set by train() / load_models()
+        self.version = None
+        self.data_hash = None
+
+        if not os.path.exists(model_dir):
+            os.makedirs(model_dir)
+
+    def train(self, data_path, encode_fn=None, chunk_size=None):
+        # chunk_size (or a Parquet file) encodes the queries chunk by chunk
+        # into a memory-mapped feature store and trains from there
+        print("Loading data...")
+        self.data_hash = file_sha256(data_path)
+        if chunk_size or is_parquet(data_path):
+            print("Encoding queries into the feature store...")
+            store = ingest(data_path, os.path.join(self.model_dir, 'feature_store', ARTIFACT_KIND),
+                           categorical=[name for name, _ in self.CLASSIFIERS],
+                           embeddings={'embedding': ('query', lambda texts: self.encode(texts, encode_fn=encode_fn))},
+                           chunk_size=chunk_size or DEFAULT_CHUNK_SIZE)
+            codes = self.fit_store(store)
+            self.keyword_extractor.fit(
+                query for chunk in read_chunks(data_path, chunk_size or DEFAULT_CHUNK_SIZE, columns=['query'])
+                for query in chunk['query']
+            )
+            self.lexical_model = LexicalClassifier().fit(
+                (query for chunk in read_chunks(data_path, chunk_size or DEFAULT_CHUNK_SIZE, columns=['query'])
+                 for query in chunk['query']),
+                codes,
+            )
+            self.lexical_model.head.classes = [_code_labels(store.vocab[name], c) for (name, _), c
+                                               in zip(self.CLASSIFIERS, self.lexical_model.head.classes)]
+        else:
+            df = pd.read_csv(data_path)
+
+            print("Encoding queries...")
+            embeddings = self.encode(df['query'].tolist(), show_progress_bar=True, encode_fn=encode_fn)
+
+            self.fit(embeddings, df)
+            self.keyword_extractor.fit(df['query'])
+            self.lexical_model = LexicalClassifier().fit(df['query'], df[[name for name, _ in self.CLASSIFIERS]].values)
+        
+        print("Saving models...")
+        self.save_models()
+        print("Training complete.")
+
+        if self.compiled_forests:
+            self.compile_forests()
+        if self.use_semantic_index:
+            self.build_semantic_index(data_path, chunk_size, encode_fn)
+
+    def build_semantic_index(self, data_path, chunk_size=None, encode_fn=None):
+        # Index every labelled query in data_path (embeddings come from the
+        # cache when the classifiers were just trained on the same file)
+        print("Building semantic index...")
+        index = None
+        label_names = [name for name, _ in self.CLASSIFIERS]
+        for chunk in read_chunks(data_path, chunk_size or DEFAULT_CHUNK_SIZE, columns=['query'] + label_names):
+            texts = chunk['query'].astype(str).tolist()
+            vectors = self.encode(texts, encode_fn=encode_fn)
+            if index is None:
+                index = SemanticIndex(vectors.shape[1], label_names)
+            index.add(texts, vectors, {name: chunk[name].tolist() for name in label_names})
+        if index is not None:
+            index.save(self.semantic_index_path)
+            print(f"Semantic index saved to {self.semantic_index_path} ({len(index)} queries).")
+        self.semantic_index = index
+
+    def load_semantic_index(self):
+        if not os.path.exists(self.semantic_index_path):
+            print("Warning: semantic index not found; train with semantic_index=True to build it.")
+            self.semantic_index = None
+            return False
+        self.semantic_index = SemanticIndex.load(self.semantic_index_path)
+        return True
+
+    def save_semantic_index(self):
+        # Persists queries added since the index was loaded, next to the ones
+        # other worker processes saved
+        if self.semantic_index is not None and self.semantic_index.stats()["unsaved_rows"]:
+            self.semantic_index.save_added(self.semantic_index_path)
+
+    def fit(self, X, df):
+        # X: query embeddings; df: the matching rows with the target columns
+        self._fit_targets(X, df[[name for name, _ in self.CLASSIFIERS]].values)
+
+    def fit_store(self, store):
+        # Same as fit(), from a FeatureStore built by ingest(). The store
+        # numbers labels in sorted order, as the classifiers do, so they are
+        # trained on its compact codes and their classes are then mapped back
+        # to the labels. Returns the (n_rows, n_targets) codes.
+        names = [name for name, _ in self.CLASSIFIERS]
+        codes = np.column_stack([store.column(name) for name in names])
+        self._fit_targets(store.column('embedding'), codes)
+        if self.head is None:
+            for name, attr in self.CLASSIFIERS:
+                classifier = getattr(self, attr)
+                classifier.classes_ = _code_labels(store.vocab[name], classifier.classes_)
+        elif isinstance(self.head, MultiOutputForestHead):
+            self.head.forest.classes_ = [_code_labels(store.vocab[name], c)
+                                         for name, c in zip(names, self.head.forest.classes_)]
+        else:
+            self.head.classes = [_code_labels(store.vocab[name], c) for name, c in zip(names, self.head.classes)]
+        return codes
+
+    def _fit_targets(self, X, Y):
+        if self.head_mode != 'separate':
+            print(f"Training multi-head classifier ({self.head_mode})...")
+            self.head = create_head(self.head_mode, n_jobs=self.n_jobs, **self.head_params)
+            self.head.fit(X, Y)
+            return
+
+        self.head = None
+        for k, (name, attr) in enumerate(self.CLASSIFIERS):
+            setattr(self, attr, self._new_forest())
+            print(f"Training {name.capitalize()} Classifier...")
+            getattr(self, attr).fit(X, Y[:, k])
+
+    def _new_forest(self):
+        return RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=self.n_jobs)
+
+    def compile_forests(self):
+        if self.head is not None:
+            self.head.compile(n_threads=self.forest_threads)
+            return
+        for _, attr in self.CLASSIFIERS:
+            setattr(self, attr, compile_forest(getattr(self, attr), n_threads=self.forest_threads))
+
+    @property
+    def encoder(self):
+        if self._encoder is None:
+            self.load_encoder()
+        return self._encoder
+
+    def load_encoder(self):
+        with self._encoder_lock:
+            if self._encoder is None:
+                self._encoder = create_encoder(self.encoder_backend, self.model_name, onnx_dir=self.onnx_dir,
+                                               threads=self.encoder_threads)
+        return self._encoder
+
+    def encode(self, texts, show_progress_bar=False, encode_fn=None):
+        # encode_fn overrides how cache misses are encoded (e.g. sharded
+        # across processes by the training pipeline)
+        if encode_fn is None:
+            encode_fn = lambda missing: self.encoder.encode(missing, show_progress_bar=show_progress_bar)
+        return self.embedding_cache.encode(texts, encode_fn)
+
+    def share_resources(self, other):
+        # Reuse another instance's encoder, embedding cache and semantic index
+        # (none of them depend on the classifier version), e.g. when a second
+        # model version is loaded next to this one. Index hits answer with the
+        # index's stored labels whichever version serves them, so they are
+        # marked source "index" and ModelRegistry.observe() keeps them out of
+        # the version's own stats.
+        self._encoder = other._encoder
+        self._encoder_lock = other._encoder_lock
+        self.embedding_cache = other.embedding_cache
+        self.semantic_index = other.semantic_index
+        return self
+
+    def extract_keywords(self, text):
+        # Up to 5 keywords, most relevant first
+        return self.keyword_extractor.extract(text)
+
+    def predict(self, query):
+        return self.predict_batch([query])[0]
+
+    def predict_batch(self, queries, timings=None):
+        # queries: a list of strings or a DataFrame with a 'query' column.
+        # Every query the cascade escalates is encoded in one pass and each
+        # classifier runs once over the whole embedding matrix. Per-stage seconds are recorded as
+        # metrics and, when given, added to the timings dict.
+        if isinstance(queries, pd.DataFrame):
+            queries = queries['query']
+        queries = [str(q) for q in queries]
+        if not queries:
+            return []
+        timer = StageTimer(ARTIFACT_KIND, timings)
+        n = len(queries)
+        predictions = [(np.empty(n, dtype=object), np.zeros(n)) for _ in self.CLASSIFIERS]
+
+        # Cascade: the lexical model answers the queries it is confident
+        # about on every label; only the rest are encoded
+        lexical = np.zeros(n, dtype=bool)
+        cascade = self.cascade_threshold is not None and self.lexical_model is not None
+        if cascade:
+            with timer.stage("lexical"):
+                pairs = self.lexical_model.predict_all(queries)
+            lexical = np.minimum.reduce([conf for _, conf in pairs]) >= self.cascade_threshold
+            for (labels, probs), (predicted, conf) in zip(predictions, pairs):
+                labels[lexical], probs[lexical] = predicted[lexical], conf[lexical]
+            answered = int(lexical.sum())
+            self.cascade_counts["lexical"] += answered
+            self.cascade_counts["escalated"] += n - answered
+            CASCADE_ROWS.inc(answered, model=ARTIFACT_KIND, path="lexical")
+            CASCADE_ROWS.inc(n - answered, model=ARTIFACT_KIND, path="escalated")
+        deep = np.flatnonzero(~lexical)
+
+        # Escalated queries: embeddings, then the semantic index, then the
+        # classifiers for queries without a close enough match. Arrays in
+        # this block are indexed by position in deep.
+        index = self.semantic_index
+        use_index = index is not None and len(index)
+        fast = np.zeros(n, dtype=bool)
+        if len(deep):
+            with timer.stage("encode"):
+                embeddings = self.encode([queries[i] for i in deep])
+            if use_index:
+                with timer.stage("index"):
+                    neighbours, similarities = index.search(embeddings, max(self.similar_k, 1))
+                fast[deep] = similarities[:, 0] >= self.similarity_threshold
+            live = ~fast[deep]
+            if live.any():
+                for (labels, probs), (predicted, conf) in zip(predictions, self.predict_labels(embeddings[live], timer)):
+                    labels[deep[live]], probs[deep[live]] = predicted, conf
+            for j in np.flatnonzero(~live):
+                stored = index.labels(neighbours[j, 0])
+                for (labels, probs), (name, _) in zip(predictions, self.CLASSIFIERS):
+                    labels[deep[j]], probs[deep[j]] = stored[name], similarities[j, 0]
+
+            if index is not None and self.index_min_conf is not None and live.any():
+                min_conf = np.minimum.reduce([probs[deep] for _, probs in predictions])
+                rows = np.flatnonzero(live & (min_conf * 100 >= self.index_min_conf))
+                if len(rows):
+                    index.add([queries[i] for i in deep[rows]], embeddings[rows],
+                              {name: labels[deep[rows]].tolist()
+                               for (name, _), (labels, _) in zip(self.CLASSIFIERS, predictions)})
+        (intents, intent_probs), (topics, topic_probs), (difficulties, difficulty_probs) = predictions
+        count_labels(ARTIFACT_KIND, "intent", intents)
+        count_labels(ARTIFACT_KIND, "topic", topics)
+
+        with timer.stage("keywords"):
+            keywords = self.keyword_extractor.extract_batch(queries)
+
+        # numpy values become Python ones once per column; the rule-based
+        # suggestion is one of the interned texts in responses.py
+        intents, topics, difficulties = intents.tolist(), topics.tolist(), difficulties.tolist()
+        intent_confs, topic_confs, difficulty_confs = percent(intent_probs), percent(topic_probs), percent(difficulty_probs)
+        suggestions = suggestions_for(intents)
+
+        position = np.full(n, -1)
+        position[deep] = np.arange(len(deep))
+        results = []
+        for i in range(n):
+            results.append({
+                "intent": intents[i],
+                "intent_conf": intent_confs[i],
+                "topic": topics[i],
+                "topic_conf": topic_confs[i],
+                "difficulty": difficulties[i],
+                "difficulty_conf": difficulty_confs[i],
+                "keywords": keywords[i],
+                "suggestion": suggestions[i]
+            })
+            if use_index or cascade:
+                results[-1]["source"] = "lexical" if lexical[i] else "index" if fast[i] else "model"
+            if use_index:
+                # Queries the lexical model answered were never embedded
+                j = position[i]
+                results[-1]["similar_questions"] = [] if j < 0 else [
+                    {"query": index.text(k), "similarity": round(float(sim), 3)}
+                    for k, sim in zip(neighbours[j][:self.similar_k], similarities[j][:self.similar_k])
+                ]
+        return results
+
+    def predict_labels(self, X, timer=None):
+        # (labels, confidences) for intent, topic and difficulty; timer (a
+        # StageTimer) times each classifier
+        timer = timer or StageTimer(None)
+        if self.head is not None:
+            with timer.stage("head"):
+                return self.head.predict_all(X)
+        labels = []
+        for name, attr in self.CLASSIFIERS:
+            with timer.stage(name):
+                labels.append(self._classify(getattr(self, attr), X))
+        return labels
+
+    def _classify(self, classifier, X):
+        if hasattr(classifier, 'predict_with_confidence'):
+            return classifier.predict_with_confidence(X)
+        # One predict_proba call gives both the label (the same argmax that
+        # predict() uses) and its confidence
+        proba = classifier.predict_proba(X)
+        labels = classifier.classes_.take(np.argmax(proba, axis=1))
+        return labels, np.max(proba, axis=1)
+
+    def save_models(self):
+        # Versioned artifact: manifest + memory-mappable flat tree arrays
+        path = save_artifact(
+            self.model_dir, ARTIFACT_KIND,
+            models=self._artifact_models(),
+            metadata={"model_name": self.model_name, "head_mode": self.head_mode,
+                      "head_params": self.head_params, "evaluation": self.evaluation},
+            data_hash=self.data_hash,
+        )
+        self.version = os.path.basename(path)
+        print(f"Models saved to {path}")
+
+    def _artifact_models(self):
+        if self.head is not None:
+            models = {"head": self.head}
+        else:
+            models = {name: getattr(self, attr) for name, attr in self.CLASSIFIERS}
+        models["keywords"] = self.keyword_extractor
+        if self.lexical_model is not None:
+            models["lexical"] = self.lexical_model
+        return models
+
+    def load_models(self, version=None):
+        # The newest artifact version unless a version is given
+        start = time.perf_counter()
+        loaded = False
+        try:
+            loaded = self._load_version(version)
+            if loaded and self.use_semantic_index and self.semantic_index is None:
+                self.load_semantic_index()
+        finally:
+            record_model_load(ARTIFACT_KIND, time.perf_counter() - start, self.version, loaded)
+        return loaded
+
+    def _load_version(self, version=None):
+        if version is not None:
+            # Only names of saved versions, so a requested version cannot
+            # point outside model_dir
+            if version not in list_versions(self.model_dir, ARTIFACT_KIND):
+                print(f"No saved {ARTIFACT_KIND} model version {version!r}.")
+                return False
+            version_dir = os.path.join(self.model_dir, ARTIFACT_KIND, version)
+        else:
+            version_dir = latest_version_dir(self.model_dir, ARTIFACT_KIND)
+        if version_dir is None:
+            return self._load_legacy_pickles()
+        try:
+            manifest, models = load_artifact(version_dir, ARTIFACT_KIND,
+                                             expected_metadata={"model_name": self.model_name})
+        except ArtifactError as e:
+            print(f"Incompatible NLP model artifact: {e}")
+            return False
+        # The artifact decides the head mode it was trained with
+        self.head_mode = manifest["metadata"].get("head_mode", "separate")
+        self.head_params = manifest["metadata"].get("head_params") or {}
+        self.evaluation = manifest["metadata"].get("evaluation")
+        if "head" in models:
+            self.head = head_from_artifact(models["head"]).compile(n_threads=self.forest_threads)
+        else:
+            self.head = None
+            for name, attr in self.CLASSIFIERS:
+                setattr(self, attr, compile_forest(models[name], n_threads=self.forest_threads))
+        # Artifacts from before keyword IDF was saved rank by term frequency
+        self.keyword_extractor = models.get("keywords") or KeywordExtractor()
+        # Artifacts saved before the cascade existed have no lexical model
+        self.lexical_model = models.get("lexical")
+        self.version = manifest["version"]
+        self.data_hash = manifest["training_data_hash"]
+        print(f"Models loaded successfully (version {self.version}).")
+        return True
+
+    def _load_legacy_pickles(self):
+        # Models saved before the artifact format existed
+        try:
+            with open(f"{self.model_dir}/intent_clf.pkl", "rb") as f:
+                self.intent_classifier = pickle.load(f)
+            with open(f"{self.model_dir}/topic_clf.pkl", "rb") as f:
+                self.topic_classifier = pickle.load(f)
+            with open(f"{self.model_dir}/difficulty_clf.pkl", "rb") as f:
+                self.difficulty_classifier = pickle.load(f)
+            self.version = "legacy-pickle"
+            print("Models loaded successfully.")
+            if self.compiled_forests:
+                self.compile_forests()
+            return True
+        except FileNotFoundError:
+            print("Saved models not found. Please train first.")
+            return False
+
+if __name__ == "__main__":
+    # Example usage for training
+    model = QueryUnderstandingModel()
+    # data_path = "../data/synthetic_queries.csv"
+    # model.train(data_path)
@@ -1,93 +1,128 @@
-import pandas as pd
-import random
-
-# Define Topics, Intents, and Difficulties
-TOPICS = [
-    "Optimization", "Neural Networks", "Natural Language Processing", 
-    "Computer Vision", "Reinforcement Learning", "Backpropagation", 
-    "Gradient Descent", "Transformers", "CNN", "RNN"
-]
-
-INTENTS = [
-    "Explanation", "Example", "Doubt clarification", "Revision"
-]
-
-DIFFICULTIES = [
-    "Beginner", "Intermediate", "Advanced"
-]
-
-# Templates for synthetic generation
-TEMPLATES = {
-    "Explanation": [
-        "What is {topic}?",
-        "Explain different types of {topic}.",
-        "I don't understand {topic}.",
-        "Can you describe {topic}?",
-        "Tell me about {topic}.",
-        "Define {topic}.",
-        "How does {topic} work?",
-        "Meaning of {topic}?",
-    ],
-    "Example": [
-        "Give me an example of {topic}.",
-        "Show me a use case for {topic}.",
-        "Practical application of {topic}?",
-        "Demonstrate {topic} with an example.",
-        "Code example for {topic}.",
-        "Real world example of {topic}.",
-    ],
-    "Doubt clarification": [
-        "Why do we use {topic}?",
-        "What is the difference between {topic} and other method?",
-        "Is {topic} better than others?",
-        "I am stuck on {topic}.",
-        "Why does {topic} fail?",
-        "Confusion about {topic}.",
-        "Clarify {topic} for me.",
-    ],
-    "Revision": [
-        "Revise {topic} quickly.",
-        "Summary of {topic}.",
-        "Key points of {topic}.",
-        "Recap {topic}.",
-        "Review {topic}.",
-        "Important concepts in {topic}.",
-    ]
-}
-
-def generate_query(topic, intent, difficulty):
-    template = random.choice(TEMPLATES[intent])
-    query = template.format(topic=topic)
-    
-    # Add some noise or variation based on difficulty (simple heuristic)
-    if difficulty == "Beginner":
-        query = query + " keep it simple."
-    elif difficulty == "Advanced":
-        query = query + " in depth detail."
-        
-    return query
-
-def generate_dataset(num_samples=1000):
-    data = []
-    
-    for _ in range(num_samples):
-        topic = random.choice(TOPICS)
-        intent = random.choice(INTENTS)
-        difficulty = random.choice(DIFFICULTIES)
-        
-        query = generate_query(topic, intent, difficulty)
-        
-        data.append({
-            "query": query,
-            "intent": intent,
-            "topic": topic,
-            "difficulty": difficulty
-        })
-        
-    return pd.DataFrame(data)
-
-if __name__ == "__main__":
-    df = generate_dataset(2000)
-    output_path = "data/synthetic_queries.csv"
-    df.to_csv(output_path, index=False)
-    print(f"Generated {len(df)} queries and saved to {output_path}")
+import argparse
+import os
+import random
+
+import numpy as np
+import pandas as pd
+
+from data_writer import chunk_seeds, generate_chunks, write_chunks
+
+# Define Topics, Intents, and Difficulties
+TOPICS = [
+    "Optimization", "Neural Networks", "Natural Language Processing", 
+    "Computer Vision", "Reinforcement Learning", "Backpropagation", 
+    "Gradient Descent", "Transformers", "CNN", "RNN"
+]
+
+INTENTS = [
+    "Explanation", "Example", "Doubt clarification", "Revision"
+]
+
+DIFFICULTIES = [
+    "Beginner", "Intermediate", "Advanced"
+]
+
+# Templates for synthetic generation
+TEMPLATES = {
+    "Explanation": [
+        "What is {topic}?",
+        "Explain different types of {topic}.",
+        "I don't understand {topic}.",
+        "Can you describe {topic}?",
+        "Tell me about {topic}.",
+        "Define {topic}.",
+        "How does {topic} work?",
+        "Meaning of {topic}?",
+    ],
+    "Example": [
+        "Give me an example of {topic}.",
+        "Show me a use case for {topic}.",
+        "Practical application of {topic}?",
+        "Demonstrate {topic} with an example.",
+        "Code example for {topic}.",
+        "Real world example of {topic}.",
+    ],
+    "Doubt clarification": [
+        "Why do we use {topic}?",
+        "What is the difference between {topic} and other method?",
+        "Is {topic} better than others?",
+        "I am stuck on {topic}.",
+        "Why does {topic} fail?",
+        "Confusion about {topic}.",
+        "Clarify {topic} for me.",
+    ],
+    "Revision": [
+        "Revise {topic} quickly.",
+        "Summary of {topic}.",
+        "Key points of {topic}.",
+        "Recap {topic}.",
+        "Review {topic}.",
+        "Important concepts in {topic}.",
+    ]
+}
+
+def generate_query(topic, intent, difficulty):
+    template = random.choice(TEMPLATES[intent])
+    query = template.format(topic=topic)
+    
+    # Add some noise or variation based on difficulty (simple heuristic)
+    if difficulty == "Beginner":
+        query = query + " keep it simple."
+    elif difficulty == "Advanced":
+        query = query + " in depth detail."
+        
+    return query
+
+def _query_table():
+    # Every possible query, indexed by (template, topic, difficulty), plus the
+    # intent of each template
+    template_intents, queries = [], []
+    for intent_idx, intent in enumerate(INTENTS):
+        for template in TEMPLATES[intent]:
+            template_intents.append(intent_idx)
+            for topic in TOPICS:
+                base = template.format(topic=topic)
+                queries.extend([base + " keep it simple.", base, base + " in depth detail."])
+    return np.array(template_intents), queries
+
+TEMPLATE_INTENTS, QUERY_TABLE = _query_table()
+TEMPLATE_OFFSETS = np.searchsorted(TEMPLATE_INTENTS, np.arange(len(INTENTS)))
+TEMPLATE_COUNTS = np.bincount(TEMPLATE_INTENTS, minlength=len(INTENTS))
+
+def generate_queries(num_samples, rng):
+    # Columnar equivalent of generate_query() for num_samples rows; string
+    # columns are Categoricals over the fixed vocabularies
+    rng = np.random.default_rng(rng)
+    topics = rng.integers(len(TOPICS), size=num_samples)
+    intents = rng.integers(len(INTENTS), size=num_samples)
+    difficulties = rng.integers(len(DIFFICULTIES), size=num_samples)
+    templates = TEMPLATE_OFFSETS[intents] + (rng.random(num_samples) * TEMPLATE_COUNTS[intents]).astype(np.int64)
+    queries = (templates * len(TOPICS) + topics) * len(DIFFICULTIES) + difficulties
+    return pd.DataFrame({
+        "query": pd.Categorical.from_codes(queries, categories=QUERY_TABLE),
+        "intent": pd.Categorical.from_codes(intents, categories=INTENTS),
+        "topic": pd.Categorical.from_codes(topics, categories=TOPICS),
+        "difficulty": pd.Categorical.from_codes(difficulties, categories=DIFFICULTIES),
+    })
+
+def generate_dataset(num_samples=1000, seed=None):
+    return generate_queries(num_samples, seed)
+
+def generate_to_file(output_path, num_samples, seed=None, chunk_size=1000000, workers=1):
+    # Streams num_samples rows to CSV/Parquet, chunk_size rows at a time
+    n_chunks = max(1, -(-num_samples // chunk_size))
+    sizes = [min(chunk_size, num_samples - i * chunk_size) for i in range(n_chunks)]
+    tasks = zip(sizes, chunk_seeds(seed, n_chunks))
+    return write_chunks(generate_chunks(generate_queries, tasks, workers), output_path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic student queries")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", default="data/synthetic_queries.csv", help=".csv or .parquet")
+    parser.add_argument("--chunk-size", type=int, default=1000000)
+    parser.add_argument("--workers", type=int, default=1, help="processes generating chunks (0: all cores)")
+    args = parser.parse_args()
+
+    rows = generate_to_file(args.output, args.rows, args.seed, args.chunk_size, args.workers or os.cpu_count())
+    print(f"Generated {rows} queries and saved to {args.output}")
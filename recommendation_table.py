@@ -0,0 +1,94 @@
+import time
+
+import numpy as np
+
+
+class RecommendationTable:
+    """Dense table of AdaptiveLearningModel outputs over the quantized input grid.
+
+    Axes are (topic code, difficulty code, score, attempts, time_spent) with
+    integer steps over the configured ranges. Each cell holds, per target, the
+    decoded label index and the rounded confidence, so an on-grid request is
+    a single array lookup instead of three forest traversals. Rows that fall
+    off the grid return -1 from cells() and must use the live models.
+    """
+
+    def __init__(self, targets, shape, ranges, labels, confs, build_seconds):
+        self.targets = targets
+        self.shape = shape
+        self.ranges = ranges
+        self.labels = labels
+        self.confs = confs
+        self.build_seconds = build_seconds
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def build(cls, model, score_range=(0, 100), attempts_range=(1, 5), time_range=(5, 60), chunk_size=65536):
+        start = time.perf_counter()
+        ranges = {"score": score_range, "attempts": attempts_range, "time_spent": time_range}
+        shape = (
+            len(model.topic_encoder.classes_),
+            len(model.difficulty_encoder.classes_),
+            score_range[1] - score_range[0] + 1,
+            attempts_range[1] - attempts_range[0] + 1,
+            time_range[1] - time_range[0] + 1,
+        )
+        n_cells = int(np.prod(shape))
+        offsets = np.array([0, 0, score_range[0], attempts_range[0], time_range[0]], dtype=float)
+
+        targets = [name for name, _, _ in model.TARGETS]
+        labels = {}
+        confs = {}
+        for name, _, encoder_attr in model.TARGETS:
+            n_labels = len(getattr(model, encoder_attr).classes_)
+            labels[name] = np.empty(n_cells, dtype=np.uint8 if n_labels <= 256 else np.uint16)
+            confs[name] = np.empty(n_cells, dtype=np.uint8)
+
+        for lo in range(0, n_cells, chunk_size):
+            hi = min(lo + chunk_size, n_cells)
+            coords = np.unravel_index(np.arange(lo, hi), shape)
+            features = np.column_stack(coords).astype(float) + offsets
+            for name, (encoded, conf) in model.predict_codes(features).items():
+                labels[name][lo:hi] = encoded
+                confs[name][lo:hi] = conf
+
+        return cls(targets, shape, ranges, labels, confs, time.perf_counter() - start)
+
+    def cells(self, topic_codes, difficulty_codes, scores, attempts, times):
+        # Flat cell index per row, or -1 where the inputs are not on the grid
+        index = np.zeros(len(topic_codes), dtype=np.int64)
+        on_grid = np.ones(len(topic_codes), dtype=bool)
+        axes = [
+            (np.asarray(topic_codes, dtype=float), 0),
+            (np.asarray(difficulty_codes, dtype=float), 0),
+            (np.asarray(scores, dtype=float), self.ranges["score"][0]),
+            (np.asarray(attempts, dtype=float), self.ranges["attempts"][0]),
+            (np.asarray(times, dtype=float), self.ranges["time_spent"][0]),
+        ]
+        for (values, offset), size in zip(axes, self.shape):
+            steps = values - offset
+            on_grid &= (steps == np.floor(steps)) & (steps >= 0) & (steps < size)
+            index = index * size + np.where(on_grid, steps, 0).astype(np.int64)
+
+        hits = int(on_grid.sum())
+        self.hits += hits
+        self.misses += len(on_grid) - hits
+        return np.where(on_grid, index, -1)
+
+    def lookup(self, name, cells):
+        return self.labels[name][cells], self.confs[name][cells]
+
+    def nbytes(self):
+        return sum(a.nbytes for a in self.labels.values()) + sum(a.nbytes for a in self.confs.values())
+
+    def stats(self):
+        return {
+            "shape": list(self.shape),
+            "cells": int(np.prod(self.shape)),
+            "ranges": {k: list(v) for k, v in self.ranges.items()},
+            "memory_bytes": self.nbytes(),
+            "build_seconds": self.build_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
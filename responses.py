@@ -0,0 +1,151 @@
+import json
+import sys
+from typing import List, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the json module is the fallback
+    orjson = None
+
+# Response building shared by the models and the API: the fixed texts are
+# interned once at import, per-row text is rendered from precomputed
+# templates, and results hold plain Python values so they serialize without
+# FastAPI's generic jsonable_encoder pass.
+
+SUGGESTIONS = {intent: sys.intern(text) for intent, text in {
+    "Explanation": "Define the concept clearly and provide a high-level overview.",
+    "Example": "Provide a code snippet or a real-world analogy.",
+    "Doubt clarification": "Address the specific confusion and contrast with related concepts.",
+    "Revision": "Summarize key points and formulas.",
+}.items()}
+DEFAULT_SUGGESTION = sys.intern("Answer the query directly.")
+
+LOW_SCORE = "Score ({score}%) suggests need for reinforcement."
+HIGH_SCORE = "High score ({score}%) indicates mastery."
+MULTIPLE_ATTEMPTS = "Multiple attempts ({attempts}) with low score."
+STANDARD_PROGRESSION = sys.intern("Standard progression based on curriculum.")
+
+# Indexed by score band (0: below 50, 1: 50 to 80, 2: above 80) * 2 + 1 when
+# more than two attempts still scored below 60
+REASONING_TEMPLATES = (
+    LOW_SCORE,
+    LOW_SCORE + " " + MULTIPLE_ATTEMPTS,
+    STANDARD_PROGRESSION,
+    MULTIPLE_ATTEMPTS,
+    HIGH_SCORE,
+    HIGH_SCORE + " " + MULTIPLE_ATTEMPTS,
+)
+_STATIC_TEMPLATES = frozenset(i for i, t in enumerate(REASONING_TEMPLATES) if "{" not in t)
+
+
+def suggestions_for(intents):
+    get = SUGGESTIONS.get
+    return [get(intent, DEFAULT_SUGGESTION) for intent in intents]
+
+
+def reasoning_codes(scores, attempts):
+    scores = np.asarray(scores, dtype=float)
+    attempts = np.asarray(attempts, dtype=float)
+    band = (scores >= 50).astype(np.int64) + (scores > 80)
+    return (band * 2 + ((attempts > 2) & (scores < 60))).tolist()
+
+
+def render_reasoning(scores, attempts):
+    # scores/attempts: the values as the caller sent them, so "40" and
+    # "40.0" read back the way they came in
+    texts = []
+    for code, score, n in zip(reasoning_codes(scores, attempts), scores, attempts):
+        template = REASONING_TEMPLATES[code]
+        texts.append(template if code in _STATIC_TEMPLATES else template.format(score=score, attempts=n))
+    return texts
+
+
+def percent(probs):
+    # Confidences in [0, 1] as whole percentages (Python ints)
+    return np.rint(np.asarray(probs, dtype=float) * 100).astype(np.int64).tolist()
+
+
+# Response schemas, as served by /api/analyze and /api/recommend. The models
+# build these shapes directly, so they only document the API (OpenAPI) and
+# are not validated again per request.
+
+class SimilarQuestion(BaseModel):
+    query: str
+    similarity: float
+
+
+class AnalyzeResponse(BaseModel):
+    intent: str
+    intent_conf: int
+    topic: str
+    topic_conf: int
+    difficulty: str
+    difficulty_conf: int
+    keywords: List[str]
+    suggestion: str
+    source: Optional[str] = None
+    similar_questions: Optional[List[SimilarQuestion]] = None
+
+
+class RecommendResponse(BaseModel):
+    next_topic: str
+    next_topic_conf: int
+    action: str
+    action_conf: int
+    difficulty_adjustment: str
+    difficulty_adjustment_conf: int
+    reasoning: str
+
+
+# Compact mode (?compact=1): short keys and no prose, for high-volume
+# integrations that only consume the labels
+
+class CompactAnalyzeResponse(BaseModel):
+    i: str
+    ic: int
+    t: str
+    tc: int
+    d: str
+    dc: int
+    k: List[str]
+
+
+class CompactRecommendResponse(BaseModel):
+    n: str
+    nc: int
+    a: str
+    ac: int
+    da: str
+    dac: int
+
+
+COMPACT_FIELDS = {
+    "nlp": (("intent", "i"), ("intent_conf", "ic"), ("topic", "t"), ("topic_conf", "tc"),
+            ("difficulty", "d"), ("difficulty_conf", "dc"), ("keywords", "k")),
+    "adaptive": (("next_topic", "n"), ("next_topic_conf", "nc"), ("action", "a"), ("action_conf", "ac"),
+                 ("difficulty_adjustment", "da"), ("difficulty_adjustment_conf", "dac")),
+}
+
+
+def compact_result(kind, result):
+    if "error" in result:
+        return result
+    return {short: result[name] for name, short in COMPACT_FIELDS[kind]}
+
+
+def _default(obj):
+    # Anything the models did not convert already (numpy scalars, arrays)
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    return str(obj)
+
+
+if orjson is not None:
+    def dumps(obj):
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+else:
+    def dumps(obj):
+        return json.dumps(obj, default=_default, separators=(",", ":")).encode()
@@ -0,0 +1,229 @@
+import contextlib
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock (serve.py needs fork anyway)
+    fcntl = None
+
+from models.embedding_cache import normalize_query
+
+# Nearest-neighbour index over embeddings of labelled queries.
+#
+# {index_dir}/
+#     manifest.json     dimension, label names and vocabularies, row count
+#     vectors.npy       (n, dim) float32 unit vectors, loaded with mmap_mode='r'
+#     labels.npy        (n, n_labels) int16 label codes
+#     texts.json        the query text of every row
+#
+# Search is exact (brute force): cosine similarity as blocked matrix products,
+# keeping a running top-k per query, which is fast enough well past a million
+# rows. Rows added after loading live in an in-memory tail until save(): its
+# vectors and labels are preallocated buffers that double when full, so an
+# insert costs the rows it adds, not a copy of the whole tail.
+
+MANIFEST = "manifest.json"
+
+
+@contextlib.contextmanager
+def _exclusive(lock_path):
+    # Held by one process at a time, e.g. by each forked worker saving the
+    # rows it learned on shutdown
+    with open(lock_path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _unit(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class SemanticIndex:
+    """Labelled query embeddings with top-k cosine similarity search.
+
+    search() can run while add() inserts from another thread: add() writes
+    past the rows in use and then swaps in views that include them, so a
+    search sees either the old or the new rows, never a half-written block.
+    """
+
+    MIN_CAPACITY = 256
+
+    def __init__(self, dim, label_names, vocab=None, block_size=65536):
+        self.dim = dim
+        self.label_names = list(label_names)
+        self.vocab = {name: list((vocab or {}).get(name, [])) for name in self.label_names}
+        self.block_size = block_size
+
+        # Saved rows (memory-mapped after load) and rows added since
+        self._base = (np.zeros((0, dim), dtype=np.float32), np.zeros((0, len(self.label_names)), dtype=np.int16), [])
+        # _tail holds views of the first rows of the buffers; texts only grows
+        self._vector_buffer = np.zeros((0, dim), dtype=np.float32)
+        self._label_buffer = np.zeros((0, len(self.label_names)), dtype=np.int16)
+        self._tail = (self._vector_buffer, self._label_buffer, [])
+        self._keys = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._base[0]) + len(self._tail[0])
+
+    def _codes(self, name, values):
+        vocab = self.vocab[name]
+        positions = {v: i for i, v in enumerate(vocab)}
+        codes = []
+        for value in values:
+            if value not in positions:
+                positions[value] = len(vocab)
+                vocab.append(value)
+            codes.append(positions[value])
+        return codes
+
+    def add(self, texts, vectors, labels):
+        # labels: {label name: list of values}. Queries already in the index
+        # (after normalization) are skipped; returns the number added.
+        with self._lock:
+            keep = []
+            for i, text in enumerate(texts):
+                key = normalize_query(text)
+                if key not in self._keys:
+                    self._keys.add(key)
+                    keep.append(i)
+            if not keep:
+                return 0
+            vectors = _unit(np.asarray(vectors)[keep])
+            codes = np.column_stack([
+                self._codes(name, [labels[name][i] for i in keep]) for name in self.label_names
+            ]).astype(np.int16)
+            tail_texts = self._tail[2]
+            n = len(self._tail[0])
+            end = n + len(keep)
+            if end > len(self._vector_buffer):
+                # Searches in flight keep the views of the old buffers
+                capacity = max(end, 2 * len(self._vector_buffer), self.MIN_CAPACITY)
+                vector_buffer = np.zeros((capacity, self.dim), dtype=np.float32)
+                label_buffer = np.zeros((capacity, len(self.label_names)), dtype=np.int16)
+                vector_buffer[:n] = self._vector_buffer[:n]
+                label_buffer[:n] = self._label_buffer[:n]
+                self._vector_buffer, self._label_buffer = vector_buffer, label_buffer
+            self._vector_buffer[n:end] = vectors
+            self._label_buffer[n:end] = codes
+            tail_texts.extend(str(texts[i]) for i in keep)
+            self._tail = (self._vector_buffer[:end], self._label_buffer[:end], tail_texts)
+            return len(keep)
+
+    def search(self, queries, k=3):
+        # (indices, similarities), both (n_queries, min(k, len(self))),
+        # best match first
+        queries = _unit(queries)
+        base, tail = self._base, self._tail
+        k = min(k, len(self))
+        best_idx = np.zeros((len(queries), 0), dtype=np.int64)
+        best_sim = np.zeros((len(queries), 0), dtype=np.float32)
+        if k == 0:
+            return best_idx, best_sim
+
+        offset = 0
+        for vectors in (base[0], tail[0]):
+            for start in range(0, len(vectors), self.block_size):
+                block = vectors[start:start + self.block_size]
+                sims = queries @ block.T
+                kk = min(k, sims.shape[1])
+                top = np.argpartition(-sims, kk - 1, axis=1)[:, :kk]
+                best_idx = np.hstack([best_idx, top + offset + start])
+                best_sim = np.hstack([best_sim, np.take_along_axis(sims, top, axis=1)])
+                if best_sim.shape[1] > k:
+                    keep = np.argpartition(-best_sim, k - 1, axis=1)[:, :k]
+                    best_idx = np.take_along_axis(best_idx, keep, axis=1)
+                    best_sim = np.take_along_axis(best_sim, keep, axis=1)
+            offset += len(vectors)
+
+        order = np.argsort(-best_sim, axis=1, kind="stable")
+        return np.take_along_axis(best_idx, order, axis=1), np.take_along_axis(best_sim, order, axis=1)
+
+    def text(self, i):
+        base_texts, tail_texts = self._base[2], self._tail[2]
+        return base_texts[i] if i < len(base_texts) else tail_texts[i - len(base_texts)]
+
+    def labels(self, i):
+        base_labels, tail_labels = self._base[1], self._tail[1]
+        row = base_labels[i] if i < len(base_labels) else tail_labels[i - len(base_labels)]
+        return {name: self.vocab[name][code] for name, code in zip(self.label_names, row)}
+
+    def save(self, path):
+        # Writes base + tail to path atomically (temp dir + rename)
+        with self._lock:
+            vectors = np.vstack([self._base[0], self._tail[0]])
+            labels = np.vstack([self._base[1], self._tail[1]])
+            texts = self._base[2] + self._tail[2][:len(self._tail[0])]
+            manifest = {"dim": self.dim, "n": len(texts), "label_names": self.label_names, "vocab": self.vocab}
+
+        # Per-process temp dir: concurrent writers never share one
+        tmp_path = path.rstrip("/\\") + f".tmp-{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        np.save(os.path.join(tmp_path, "vectors.npy"), vectors)
+        np.save(os.path.join(tmp_path, "labels.npy"), labels)
+        with open(os.path.join(tmp_path, "texts.json"), "w") as f:
+            json.dump(texts, f)
+        with open(os.path.join(tmp_path, MANIFEST), "w") as f:
+            json.dump(manifest, f, indent=2)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+
+    def save_added(self, path):
+        # Adds the rows added since loading to the index saved at path, which
+        # other processes may have extended meanwhile: under an exclusive
+        # lock, the saved index is reloaded, extended with the rows it does
+        # not have yet and written back. Returns the number of rows added.
+        with self._lock:
+            vectors, codes, texts = self._tail
+            texts = texts[:len(vectors)]
+            labels = {name: [self.vocab[name][c] for c in codes[:, j]] for j, name in enumerate(self.label_names)}
+        if not texts:
+            return 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with _exclusive(path.rstrip("/\\") + ".lock"):
+            if os.path.exists(os.path.join(path, MANIFEST)):
+                saved = SemanticIndex.load(path, mmap=False)
+            else:
+                saved = SemanticIndex(self.dim, self.label_names)
+            added = saved.add(texts, vectors, labels)
+            if added:
+                saved.save(path)
+        return added
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        with open(os.path.join(path, MANIFEST)) as f:
+            manifest = json.load(f)
+        index = cls(manifest["dim"], manifest["label_names"], manifest["vocab"])
+        vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r" if mmap else None)
+        labels = np.load(os.path.join(path, "labels.npy"), mmap_mode="r" if mmap else None)
+        with open(os.path.join(path, "texts.json")) as f:
+            texts = json.load(f)
+        if len(vectors) != manifest["n"] or len(texts) != manifest["n"]:
+            raise ValueError(f"Semantic index at {path} is incomplete")
+        index._base = (vectors, labels, texts)
+        index._keys = {normalize_query(t) for t in texts}
+        return index
+
+    def stats(self):
+        return {
+            "rows": len(self),
+            "saved_rows": len(self._base[0]),
+            "unsaved_rows": len(self._tail[0]),
+            "dim": self.dim,
+            "nbytes": int(self._base[0].nbytes + self._tail[0].nbytes + self._base[1].nbytes + self._tail[1].nbytes),
+        }
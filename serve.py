@@ -0,0 +1,184 @@
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+# Production entry point: loads the models once in this process, then forks
+# worker processes that serve app:app on a shared listening socket.
+#
+# Workers inherit the loaded models copy-on-write. The forest arrays and the
+# semantic index are memory-mapped files, shared through the page cache;
+# the encoder weights (sentence-transformers) are shared as long as nobody
+# writes to them, and gc.freeze() keeps the garbage collector from touching
+# the pages of objects created before the fork. Proportional set size (PSS)
+# from /proc/<pid>/smaps_rollup charges each shared page to the processes
+# sharing it, so the PSS total is the real footprint.
+#
+# Only what is loaded before the fork is shared this way. Each worker runs
+# its own model registry watcher, so a version saved later is loaded (and
+# warmed up) once per worker: its forest arrays are memory-mapped and still
+# share the page cache, but its Python objects exist N times until the next
+# restart, and canary routing is decided per worker. On shutdown every
+# worker adds the queries its semantic index learned to the saved index,
+# one at a time under a file lock.
+#
+#     python serve.py --workers 4 --port 8000
+
+# Student sessions must be visible to every worker: with more than one,
+# they are kept in this sqlite file unless SESSION_STORE_PATH names another
+SESSION_STORE_PATH = "models/saved_models/sessions.sqlite"
+
+MEMORY_FIELDS = {"Rss": "rss_mb", "Pss": "pss_mb", "Shared_Clean": "shared_mb", "Shared_Dirty": "shared_mb",
+                 "Private_Clean": "private_mb", "Private_Dirty": "private_mb"}
+
+
+def process_memory(pid):
+    # {rss_mb, pss_mb, shared_mb, private_mb} of a process, or None where
+    # /proc/<pid>/smaps_rollup is unavailable (non-Linux, kernel < 4.14)
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+    memory = {name: 0.0 for name in MEMORY_FIELDS.values()}
+    for line in lines:
+        parts = line.split()
+        field = MEMORY_FIELDS.get(parts[0].rstrip(":"))
+        if field is not None:
+            memory[field] += int(parts[1]) / 1024
+    return {name: round(value, 1) for name, value in memory.items()}
+
+
+def memory_report(parent_pid, workers):
+    processes = {"parent": parent_pid, **{f"worker-{i}": pid for i, pid in workers.items()}}
+    rows = {name: process_memory(pid) for name, pid in processes.items()}
+    if any(row is None for row in rows.values()):
+        return None
+    total = {name: round(sum(row[name] for row in rows.values()), 1) for name in rows["parent"]}
+    lines = [f"{'process':<10} {'pid':>7} {'rss_mb':>9} {'pss_mb':>9} {'shared_mb':>10} {'private_mb':>11}"]
+    for name, row in rows.items():
+        lines.append(f"{name:<10} {processes[name]:>7} {row['rss_mb']:>9} {row['pss_mb']:>9} "
+                     f"{row['shared_mb']:>10} {row['private_mb']:>11}")
+    lines.append(f"{'total':<10} {'':>7} {total['rss_mb']:>9} {total['pss_mb']:>9} "
+                 f"{total['shared_mb']:>10} {total['private_mb']:>11}")
+    return "\n".join(lines)
+
+
+def preload(threads, workers):
+    # Imports app (which loads every model) with settings that are safe to
+    # fork: no background threads, and the encoder loaded up front
+    os.environ["ENCODER_PRELOAD"] = "0"
+    if workers > 1:
+        os.environ["SESSION_STORE_PATH"] = os.environ.get("SESSION_STORE_PATH") or SESSION_STORE_PATH
+        os.environ["SESSION_STORE_SHARED"] = "1"
+        print(f"Student sessions are shared through {os.environ['SESSION_STORE_PATH']}")
+    if threads:
+        os.environ["ENCODER_THREADS"] = str(threads)
+        for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+            os.environ.setdefault(name, str(threads))
+    import app
+    if app.ENCODER_BACKEND == "sentence-transformers":
+        # onnxruntime sessions own threads that do not survive a fork, so
+        # ONNX encoders are loaded by each worker instead
+        app.nlp_model.load_encoder()
+    return app
+
+
+def run_worker(app_module, sock, host, port, threads):
+    import uvicorn
+    # sqlite connections must not be shared across the fork
+    app_module.nlp_model.embedding_cache.reopen()
+    app_module.session_store.reopen()
+    if threads and "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads)
+    config = uvicorn.Config(app_module.app, host=host, port=port, workers=1, log_level="info")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve app:app from N forked workers sharing preloaded models")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--threads", type=int, default=None,
+                        help="encoder intra-op threads per worker (default: cores / workers)")
+    parser.add_argument("--memory-interval", type=float, default=60.0,
+                        help="seconds between memory reports (0: only once at startup)")
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        sys.exit("serve.py needs os.fork(); use `uvicorn app:app` on this platform")
+    threads = args.threads or max(1, (os.cpu_count() or 1) // args.workers)
+
+    print(f"Preloading models ({args.workers} workers, {threads} encoder threads each)...")
+    app_module = preload(threads, args.workers)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    # Objects created so far are never collected; the collector then leaves
+    # their pages alone and they stay shared with the workers
+    gc.collect()
+    gc.freeze()
+
+    workers = {}
+
+    def spawn(i):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                run_worker(app_module, sock, args.host, args.port, threads)
+            finally:
+                os._exit(0)
+        workers[i] = pid
+
+    for i in range(args.workers):
+        spawn(i)
+    print(f"Serving on http://{args.host}:{args.port} with workers {sorted(workers.values())}")
+
+    stopping = []
+
+    def stop(signum, frame):
+        stopping.append(signum)
+        for pid in workers.values():
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # Supervise: restart workers that die, report memory periodically
+    next_report = time.monotonic() + 10.0
+    while workers:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid:
+            i = next((i for i, p in workers.items() if p == pid), None)
+            if i is not None:
+                del workers[i]
+                if not stopping:
+                    print(f"Worker {i} (pid {pid}) exited with status {status}; restarting")
+                    spawn(i)
+            continue
+        if next_report is not None and time.monotonic() >= next_report and not stopping:
+            report = memory_report(os.getpid(), workers)
+            print(report if report else "Memory report unavailable (needs /proc/<pid>/smaps_rollup)")
+            next_report = time.monotonic() + args.memory_interval if args.memory_interval > 0 else None
+        time.sleep(0.5)
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
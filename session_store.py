@@ -0,0 +1,227 @@
+import collections
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Same progression as the simulated students the adaptive model is trained on
+DIFFICULTY_LEVELS = ["Beginner", "Intermediate", "Advanced"]
+
+Event = collections.namedtuple("Event", "ts topic difficulty score attempts time_spent action")
+
+
+class TopicStats:
+    __slots__ = ("events", "avg_score", "avg_attempts", "avg_time", "best_score", "last_seen")
+
+    def __init__(self, events=0, avg_score=0.0, avg_attempts=0.0, avg_time=0.0, best_score=0.0, last_seen=0.0):
+        self.events = events
+        self.avg_score = avg_score
+        self.avg_attempts = avg_attempts
+        self.avg_time = avg_time
+        self.best_score = best_score
+        self.last_seen = last_seen
+
+    def update(self, score, attempts, time_spent, ts, alpha):
+        # Exponential moving average for the score (recent attempts matter
+        # more), plain running means for effort
+        self.events += 1
+        self.avg_score = score if self.events == 1 else self.avg_score + alpha * (score - self.avg_score)
+        self.avg_attempts += (attempts - self.avg_attempts) / self.events
+        self.avg_time += (time_spent - self.avg_time) / self.events
+        self.best_score = max(self.best_score, score)
+        self.last_seen = ts
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class StudentState:
+    """Rolling history and per-topic aggregates of one student.
+
+    The history keeps the last history_size events; the aggregates cover
+    every event ever recorded. current_topic/current_difficulty are where the
+    last recommendation sent the student.
+    """
+
+    def __init__(self, history_size):
+        self.history = collections.deque(maxlen=history_size)
+        self.topics = {}
+        self.events = 0
+        self.current_topic = None
+        self.current_difficulty = None
+
+    def record(self, event, next_topic, difficulty_adjustment, alpha):
+        self.history.append(event)
+        self.events += 1
+        stats = self.topics.get(event.topic)
+        if stats is None:
+            stats = self.topics[event.topic] = TopicStats()
+        stats.update(event.score, event.attempts, event.time_spent, event.ts, alpha)
+
+        level = DIFFICULTY_LEVELS.index(event.difficulty) if event.difficulty in DIFFICULTY_LEVELS else 0
+        if next_topic != event.topic:
+            level = 0
+        elif difficulty_adjustment == "Increase":
+            level = min(level + 1, len(DIFFICULTY_LEVELS) - 1)
+        elif difficulty_adjustment == "Decrease":
+            level = max(level - 1, 0)
+        self.current_topic = next_topic
+        self.current_difficulty = DIFFICULTY_LEVELS[level]
+
+    def summary(self):
+        return {
+            "events": self.events,
+            "current_topic": self.current_topic,
+            "current_difficulty": self.current_difficulty,
+            "topics": {topic: stats.to_dict() for topic, stats in self.topics.items()},
+            "history": [event._asdict() for event in self.history],
+        }
+
+    def dumps(self):
+        return json.dumps({
+            "history": [list(event) for event in self.history],
+            "topics": {topic: list(stats.to_dict().values()) for topic, stats in self.topics.items()},
+            "events": self.events,
+            "current": [self.current_topic, self.current_difficulty],
+        })
+
+    @classmethod
+    def loads(cls, text, history_size):
+        data = json.loads(text)
+        state = cls(history_size)
+        state.history.extend(Event(*event) for event in data["history"])
+        state.topics = {topic: TopicStats(*values) for topic, values in data["topics"].items()}
+        state.events = data["events"]
+        state.current_topic, state.current_difficulty = data["current"]
+        return state
+
+
+class SessionStore:
+    """Per-student state keyed by student_id.
+
+    States live in an in-memory LRU of max_students entries. With disk_path,
+    every update is also written through to a sqlite file (one row per
+    student), so evicted or restarted students are reloaded from there.
+    Recording an event is O(1): one deque append, one aggregate update and,
+    with sqlite, one upsert.
+
+    shared is for several worker processes on one disk_path: the sqlite row
+    is the only copy, so the LRU is bypassed and record() reads, updates and
+    writes the row in one write transaction.
+    """
+
+    def __init__(self, history_size=20, max_students=100000, score_alpha=0.3, disk_path=None, shared=False):
+        if shared and not disk_path:
+            raise ValueError("A shared session store needs a disk_path")
+        self.history_size = history_size
+        self.max_students = max_students
+        self.score_alpha = score_alpha
+        self.disk_path = disk_path
+        self.shared = shared
+
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if disk_path:
+            self._open_disk(disk_path)
+
+        # Metrics
+        self.events = 0
+        self.disk_loads = 0
+        self.evictions = 0
+
+    def _open_disk(self, path):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS students (student_id TEXT PRIMARY KEY, state TEXT, updated REAL)")
+        self._db.commit()
+
+    def reopen(self):
+        # New sqlite connection, e.g. in a forked worker (see EmbeddingCache)
+        if self.disk_path:
+            self._open_disk(self.disk_path)
+
+    def _get(self, student_id, create=False):
+        state = None if self.shared else self._states.get(student_id)
+        if state is not None:
+            self._states.move_to_end(student_id)
+            return state
+        if self._db is not None:
+            row = self._db.execute("SELECT state FROM students WHERE student_id = ?", (student_id,)).fetchone()
+            if row is not None:
+                state = StudentState.loads(row[0], self.history_size)
+                self.disk_loads += 1
+        if state is None and create:
+            state = StudentState(self.history_size)
+        if state is not None and not self.shared:
+            self._states[student_id] = state
+            while len(self._states) > self.max_students:
+                self._states.popitem(last=False)
+                self.evictions += 1
+        return state
+
+    def resolve(self, student_id, topic=None, difficulty=None):
+        # Fills a missing topic/difficulty from the student's last
+        # recommendation; raises KeyError when there is none
+        if topic is not None and difficulty is not None:
+            return topic, difficulty
+        with self._lock:
+            state = self._get(student_id)
+            if state is None or state.current_topic is None:
+                raise KeyError(f"No session for student '{student_id}'; send topic and difficulty")
+            return topic or state.current_topic, difficulty or state.current_difficulty
+
+    def record(self, student_id, interaction, recommendation):
+        # interaction: the model input row; recommendation: its prediction.
+        # Returns the student's updated summary.
+        event = Event(time.time(), interaction["topic"], interaction["difficulty"], float(interaction["score"]),
+                      int(interaction["attempts"]), float(interaction["time_spent"]), recommendation["action"])
+        with self._lock:
+            if self.shared:
+                # Takes the write lock before reading, so events other workers
+                # record in between are not overwritten
+                self._db.execute("BEGIN IMMEDIATE")
+            try:
+                state = self._get(student_id, create=True)
+                state.record(event, recommendation["next_topic"], recommendation["difficulty_adjustment"],
+                             self.score_alpha)
+                if self._db is not None:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO students (student_id, state, updated) VALUES (?, ?, ?)",
+                        (student_id, state.dumps(), event.ts),
+                    )
+                    self._db.commit()
+            except BaseException:
+                if self.shared:
+                    self._db.rollback()
+                raise
+            self.events += 1
+            return state.summary()
+
+    def get(self, student_id):
+        with self._lock:
+            state = self._get(student_id)
+            return state.summary() if state is not None else None
+
+    def stats(self):
+        with self._lock:
+            disk_students = None
+            if self._db is not None:
+                disk_students = self._db.execute("SELECT COUNT(*) FROM students").fetchone()[0]
+            return {
+                "memory_students": len(self._states),
+                "max_students": self.max_students,
+                "history_size": self.history_size,
+                "disk_path": self.disk_path,
+                "shared": self.shared,
+                "disk_students": disk_students,
+                "events": self.events,
+                "disk_loads": self.disk_loads,
+                "evictions": self.evictions,
+            }
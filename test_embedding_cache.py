@@ -0,0 +1,91 @@
+import multiprocessing
+import time
+
+import numpy as np
+import pytest
+
+from models.embedding_cache import EmbeddingCache
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return np.array([[len(t), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_duplicates_and_spacing_are_encoded_once():
+    cache = EmbeddingCache("test")
+    encoder = CountingEncoder()
+    vectors = cache.encode(["What is a CNN?", "what  is a cnn?", "RNN"], encoder)
+    assert encoder.calls == [["What is a CNN?", "RNN"]]
+    assert np.array_equal(vectors[0], vectors[1])
+
+    cache.encode(["RNN"], encoder)
+    assert len(encoder.calls) == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 3
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = EmbeddingCache("test", max_entries=2)
+    encoder = CountingEncoder()
+    cache.encode(["a", "b"], encoder)
+    cache.encode(["a"], encoder)
+    cache.encode(["c"], encoder)
+    assert cache.stats()["evictions"] == 1
+
+    # "b" was the least recently used
+    cache.encode(["a", "b"], encoder)
+    assert encoder.calls[-1] == ["b"]
+
+
+def test_entries_expire_after_the_ttl():
+    cache = EmbeddingCache("test", ttl_seconds=0.05)
+    encoder = CountingEncoder()
+    cache.encode(["a"], encoder)
+    time.sleep(0.1)
+    cache.encode(["a"], encoder)
+    assert len(encoder.calls) == 2
+    assert cache.stats()["expirations"] == 1
+
+
+def test_sqlite_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    encoder = CountingEncoder()
+    EmbeddingCache("test", disk_path=path).encode(["a", "b"], encoder)
+
+    restarted = EmbeddingCache("test", disk_path=path)
+    assert np.array_equal(restarted.encode(["a"], encoder), [[1.0, 1.0]])
+    assert len(encoder.calls) == 1
+    assert restarted.stats()["disk_hits"] == 1
+
+    # Another encoder never sees these entries
+    other = EmbeddingCache("other", disk_path=path)
+    other.encode(["a"], encoder)
+    assert len(encoder.calls) == 2
+    assert other.stats()["disk_entries"] == 1
+
+
+def _encode_in_child(cache, text):
+    cache.reopen()
+    cache.encode([text], CountingEncoder())
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_reopen_after_fork(tmp_path):
+    cache = EmbeddingCache("test", disk_path=str(tmp_path / "cache.sqlite"))
+    encoder = CountingEncoder()
+    cache.encode(["a"], encoder)
+
+    child = multiprocessing.get_context("fork").Process(target=_encode_in_child, args=(cache, "from the child"))
+    child.start()
+    child.join()
+    assert child.exitcode == 0
+
+    # The parent's connection still works and sees the child's entry
+    cache.encode(["from the child"], encoder)
+    assert len(encoder.calls) == 1
+    assert cache.stats()["disk_entries"] == 2
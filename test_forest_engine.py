@@ -0,0 +1,59 @@
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from models.forest_engine import FlatForest, compile_forest
+
+
+def make_data(n_samples=600, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_samples, 6))
+    y_topic = np.array(["CNN", "RNN", "Optimization", "Transformers"])[
+        (X[:, 0] > 0).astype(int) + 2 * (X[:, 1] + rng.normal(scale=0.5, size=n_samples) > 0)]
+    y_action = np.where(X[:, 2] + rng.normal(size=n_samples) > 0, "Continue", "Review")
+    return X, np.column_stack([y_topic, y_action])
+
+
+def test_single_output_matches_sklearn_bit_for_bit():
+    X, Y = make_data()
+    forest = RandomForestClassifier(n_estimators=30, random_state=0).fit(X, Y[:, 0])
+    flat = compile_forest(forest)
+    X_test = make_data(400, seed=1)[0]
+
+    assert np.array_equal(flat.predict_proba(X_test), forest.predict_proba(X_test))
+    assert np.array_equal(flat.predict(X_test), forest.predict(X_test))
+    labels, confidences = flat.predict_with_confidence(X_test)
+    assert np.array_equal(labels, forest.predict(X_test))
+    assert np.array_equal(confidences, forest.predict_proba(X_test).max(axis=1))
+
+
+def test_multi_output_matches_sklearn_bit_for_bit():
+    X, Y = make_data()
+    forest = RandomForestClassifier(n_estimators=30, random_state=0).fit(X, Y)
+    flat = compile_forest(forest)
+    X_test = make_data(400, seed=1)[0]
+
+    for ours, theirs in zip(flat.predict_proba(X_test), forest.predict_proba(X_test)):
+        assert np.array_equal(ours, theirs)
+    assert np.array_equal(flat.predict(X_test), forest.predict(X_test))
+
+
+def test_threads_do_not_change_results():
+    X, Y = make_data()
+    forest = RandomForestClassifier(n_estimators=30, random_state=0).fit(X, Y[:, 0])
+    X_test = make_data(400, seed=1)[0]
+
+    serial = FlatForest.from_sklearn(forest).predict_proba(X_test)
+    threaded = FlatForest.from_sklearn(forest, n_threads=4).predict_proba(X_test)
+    assert np.array_equal(serial, threaded)
+
+
+def test_extend_averages_over_all_trees():
+    X, Y = make_data()
+    first = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, Y[:, 0])
+    second = RandomForestClassifier(n_estimators=5, random_state=1).fit(X, Y[:, 0])
+    X_test = make_data(100, seed=1)[0]
+
+    combined = compile_forest(first).extend(compile_forest(second))
+    expected = (first.predict_proba(X_test) * 10 + second.predict_proba(X_test) * 5) / 15
+    assert combined.n_estimators == 15
+    assert np.allclose(combined.predict_proba(X_test), expected)
@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+import pytest
+
+from models.inference_pool import InferencePool, Overloaded
+
+
+def test_admit_takes_a_slot_before_the_with_block():
+    pool = InferencePool.threads(1, max_pending=2)
+    first = pool.admit()
+    second = pool.admit()
+    # Neither admission has been entered yet; both still count
+    assert pool.pending == 2
+    with pytest.raises(Overloaded) as e:
+        pool.admit()
+    assert e.value.retry_after >= 1
+    assert pool.rejected == 1
+
+    with first:
+        pass
+    assert pool.pending == 1
+    second.release()
+    second.release()
+    assert pool.pending == 0
+    assert pool.max_pending_seen == 2
+
+
+def test_run_releases_its_slot():
+    pool = InferencePool.threads(2, max_pending=4)
+
+    async def main():
+        return await asyncio.gather(*[pool.run(lambda x: x * 2, i) for i in range(4)])
+
+    assert asyncio.run(main()) == [0, 2, 4, 6]
+    assert pool.pending == 0
+    assert pool.completed == 4
+
+
+def test_requests_beyond_max_pending_are_rejected():
+    pool = InferencePool.threads(1, max_pending=2)
+
+    async def main():
+        return await asyncio.gather(*[pool.run(time.sleep, 0.05) for _ in range(5)], return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert sum(isinstance(r, Overloaded) for r in results) == 3
+    assert pool.rejected == 3
+    assert pool.pending == 0
+
+
+def test_timeout_frees_the_slot():
+    pool = InferencePool.threads(1, max_pending=2, timeout=0.01)
+
+    async def main():
+        await pool.run(time.sleep, 0.2)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(main())
+    assert pool.timeouts == 1
+    assert pool.pending == 0
@@ -0,0 +1,105 @@
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from models.adaptive_module import AdaptiveLearningModel
+from models.forest_engine import FlatForest
+from models.model_artifacts import ArtifactError, MANIFEST, list_versions, load_artifact, save_artifact
+from models.multihead import HEAD_MODES
+
+
+def make_interactions(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    scores = rng.integers(0, 101, n)
+    topics = rng.choice(["CNN", "RNN", "Optimization"], n)
+    return pd.DataFrame({
+        "topic": topics,
+        "difficulty": rng.choice(["Beginner", "Intermediate", "Advanced"], n),
+        "score": scores,
+        "attempts": rng.integers(1, 6, n),
+        "time_spent": rng.integers(5, 61, n),
+        "next_topic": np.where(scores > 60, rng.choice(["CNN", "RNN", "Transformers"], n), topics),
+        "next_action": np.where(scores > 50, "Continue", "Revision"),
+        "next_difficulty_adj": np.where(scores > 80, "Increase", np.where(scores < 30, "Decrease", "Same")),
+    })
+
+
+def test_round_trip_keeps_predictions(tmp_path):
+    df = make_interactions()
+    rows = make_interactions(50, seed=1)
+    for mode in HEAD_MODES:
+        model_dir = str(tmp_path / mode)
+        model = AdaptiveLearningModel(model_dir=model_dir, head_mode=mode)
+        model.fit(df)
+        model.save_models()
+
+        loaded = AdaptiveLearningModel(model_dir=model_dir)
+        assert loaded.load_models(model.version)
+        assert loaded.head_mode == mode
+        assert loaded.predict_batch(rows) == model.predict_batch(rows), mode
+
+
+def test_arrays_are_memory_mapped(tmp_path):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200, 4))
+    forest = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, X[:, 0] > 0)
+    path = save_artifact(str(tmp_path), "adaptive", {"clf": forest}, encoders={"topic": ["CNN", "RNN"]},
+                         metadata={"feature_columns": ["a", "b", "c", "d"]}, data_hash="abcdef0123")
+
+    manifest, models = load_artifact(path, "adaptive")
+    assert manifest["version"].endswith("-abcdef01")
+    assert manifest["encoders"] == {"topic": ["CNN", "RNN"]}
+    assert isinstance(models["clf"], FlatForest)
+    assert any(isinstance(array, np.memmap) for array in models["clf"].arrays().values())
+    assert np.array_equal(models["clf"].predict_proba(X), forest.predict_proba(X))
+
+
+def test_mismatched_artifacts_are_rejected(tmp_path):
+    X = np.arange(20, dtype=float).reshape(10, 2)
+    forest = RandomForestClassifier(n_estimators=2, random_state=0).fit(X, X[:, 0] > 4)
+    path = save_artifact(str(tmp_path), "adaptive", {"clf": forest}, metadata={"feature_columns": ["a", "b"]})
+
+    with pytest.raises(ArtifactError):
+        load_artifact(path, "adaptive", expected_metadata={"feature_columns": ["a", "b", "c"]})
+    with pytest.raises(ArtifactError):
+        load_artifact(path, "nlp")
+    with pytest.raises(ArtifactError):
+        load_artifact(str(tmp_path / "adaptive" / "missing"), "adaptive")
+
+
+def test_list_versions_skips_incomplete_directories(tmp_path):
+    kind_dir = tmp_path / "adaptive"
+    for name in ("20240101T000000000000Z", "20240102T000000000000Z", ".tmp-20240103T000000000000Z"):
+        os.makedirs(kind_dir / name)
+        (kind_dir / name / MANIFEST).write_text("{}")
+    # Still being written: no manifest yet
+    os.makedirs(kind_dir / "20240104T000000000000Z")
+
+    assert list_versions(str(tmp_path), "adaptive") == ["20240101T000000000000Z", "20240102T000000000000Z"]
+    assert list_versions(str(tmp_path), "nlp") == []
+
+
+def test_legacy_pickle_is_loaded_without_an_artifact(tmp_path):
+    model = AdaptiveLearningModel(model_dir=str(tmp_path))
+    assert not model.load_models()
+
+    model.fit(make_interactions())
+    with open(tmp_path / "adaptive_models.pkl", "wb") as f:
+        pickle.dump({
+            "next_topic_clf": model.next_topic_clf,
+            "action_clf": model.action_clf,
+            "difficulty_adj_clf": model.difficulty_adj_clf,
+            "encoders": {"topic": model.topic_encoder, "difficulty": model.difficulty_encoder,
+                         "next_topic": model.next_topic_encoder, "action": model.action_encoder,
+                         "difficulty_adj": model.difficulty_adj_encoder},
+        }, f)
+
+    loaded = AdaptiveLearningModel(model_dir=str(tmp_path))
+    assert loaded.load_models()
+    assert loaded.version == "legacy-pickle"
+    rows = make_interactions(50, seed=1)
+    assert loaded.predict_batch(rows) == model.predict_batch(rows)
@@ -0,0 +1,96 @@
+import os
+
+import pytest
+
+from models.model_artifacts import MANIFEST
+from models.model_registry import ModelRegistry, NotResident
+
+KIND = "adaptive"
+
+
+class FakeModel:
+    def __init__(self):
+        self.version = None
+
+    def load_models(self, version):
+        self.version = version
+        return True
+
+
+def save_version(model_dir, version):
+    version_dir = os.path.join(model_dir, KIND, version)
+    os.makedirs(version_dir)
+    with open(os.path.join(version_dir, MANIFEST), "w") as f:
+        f.write("{}")
+
+
+def make_registry(model_dir, versions, **kwargs):
+    for version in versions:
+        save_version(model_dir, version)
+    return ModelRegistry(KIND, FakeModel, model_dir, confidence_key="next_topic_conf", **kwargs)
+
+
+def test_activate_and_rollback_swap_the_serving_model(tmp_path):
+    registry = make_registry(str(tmp_path), ["v1", "v2"])
+    registry.add(registry.load("v1"))
+    registry.load("v2")
+    assert registry.active == "v1"
+
+    registry.activate("v2")
+    assert registry.model().version == "v2"
+    assert registry.previous == "v1"
+
+    registry.rollback()
+    assert registry.model().version == "v1"
+    assert registry.canary is None
+    assert registry.swaps == 3
+
+
+def test_poll_keeps_the_new_canary_resident(tmp_path):
+    model_dir = str(tmp_path)
+    registry = make_registry(model_dir, ["v1", "v2", "v3"], keep=3, canary_percent=10.0)
+    registry.add(registry.load("v1"))
+    registry.load("v2")
+    registry.activate("v2")
+    registry.load("v3")
+    registry.set_canary("v3", 10.0)
+
+    save_version(model_dir, "v4")
+    assert registry.poll() == ["v4"]
+    assert registry.canary == "v4"
+    # v3 lost its canary slot, so it is the one dropped
+    assert sorted(registry.stats()["resident"]) == ["v1", "v2", "v4"]
+    assert registry.poll() == []
+
+
+def test_load_rejects_versions_that_are_not_saved(tmp_path):
+    registry = make_registry(str(tmp_path), ["v1"])
+    for version in ("../..", "v9"):
+        with pytest.raises(NotResident):
+            registry.load(version)
+    with pytest.raises(NotResident):
+        registry.activate("v9")
+
+
+def test_pick_routes_to_the_canary(tmp_path):
+    registry = make_registry(str(tmp_path), ["v1", "v2"])
+    registry.add(registry.load("v1"))
+    registry.load("v2")
+    registry.set_canary("v2", 100.0)
+    assert registry.pick()[0] == "v2"
+
+    registry.set_canary(None, 0)
+    assert registry.pick()[0] == "v1"
+
+
+def test_observe_keeps_index_hits_out_of_the_confidence(tmp_path):
+    registry = make_registry(str(tmp_path), ["v1"])
+    registry.add(registry.load("v1"))
+    registry.observe("v1", 0.02, [{"next_topic_conf": 60}, {"next_topic_conf": 80},
+                                  {"next_topic_conf": 100, "source": "index"}])
+
+    stats = registry.stats()["resident"]["v1"]
+    assert stats["calls"] == 1
+    assert stats["avg_confidence"] == 70.0
+    assert stats["index_hits"] == 1
+    assert stats["avg_ms"] == pytest.approx(20.0)
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.adaptive_module import AdaptiveLearningModel
+
+GRID = {"score_range": (0, 30), "attempts_range": (1, 3), "time_range": (5, 12)}
+
+
+@pytest.fixture(scope="module")
+def model(tmp_path_factory):
+    rng = np.random.default_rng(0)
+    n = 400
+    topics = rng.choice(["CNN", "RNN", "Optimization"], n)
+    scores = rng.integers(0, 101, n)
+    df = pd.DataFrame({
+        "topic": topics,
+        "difficulty": rng.choice(["Beginner", "Intermediate", "Advanced"], n),
+        "score": scores,
+        "attempts": rng.integers(1, 6, n),
+        "time_spent": rng.integers(5, 61, n),
+        "next_topic": np.where(scores > 60, rng.choice(["CNN", "RNN", "Transformers"], n), topics),
+        "next_action": np.where(scores > 50, "Continue", "Revision"),
+        "next_difficulty_adj": np.where(scores > 80, "Increase", np.where(scores < 30, "Decrease", "Same")),
+    })
+    model = AdaptiveLearningModel(model_dir=str(tmp_path_factory.mktemp("models")), compiled_forests=True)
+    model.fit(df)
+    model.compile_forests()
+    return model
+
+
+def grid_rows():
+    rng = np.random.default_rng(1)
+    return [{"topic": topic, "difficulty": difficulty, "score": int(rng.integers(0, 31)),
+             "attempts": int(rng.integers(1, 4)), "time_spent": int(rng.integers(5, 13))}
+            for topic in ("CNN", "RNN", "Optimization") for difficulty in ("Beginner", "Advanced")
+            for _ in range(20)]
+
+
+def test_on_grid_rows_match_the_live_models(model):
+    rows = grid_rows()
+    live = model.predict_batch(rows)
+    table = model.enable_lookup_table(**GRID)
+    try:
+        assert model.predict_batch(rows) == live
+        assert table.hits == len(rows)
+        assert table.misses == 0
+    finally:
+        model.lookup_table = None
+
+
+def test_off_grid_rows_use_the_live_models(model):
+    rows = [
+        {"topic": "CNN", "difficulty": "Beginner", "score": 20.5, "attempts": 2, "time_spent": 8},
+        {"topic": "RNN", "difficulty": "Advanced", "score": 50, "attempts": 2, "time_spent": 8},
+        {"topic": "RNN", "difficulty": "Advanced", "score": 10, "attempts": 4, "time_spent": 8},
+        {"topic": "Optimization", "difficulty": "Beginner", "score": 10, "attempts": 1, "time_spent": 3},
+        {"topic": "GANs", "difficulty": "Beginner", "score": 10, "attempts": 1, "time_spent": 8},
+    ]
+    live = model.predict_batch(rows)
+    table = model.enable_lookup_table(**GRID)
+    try:
+        assert model.predict_batch(rows) == live
+        assert table.hits == 0
+        # The unseen topic is rejected before the table is consulted
+        assert table.misses == 4
+        assert "error" in live[-1]
+    finally:
+        model.lookup_table = None
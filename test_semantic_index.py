@@ -0,0 +1,85 @@
+import multiprocessing
+
+import numpy as np
+
+from models.semantic_index import SemanticIndex
+
+DIM = 16
+
+
+def make_vectors(n, seed):
+    return np.random.default_rng(seed).normal(size=(n, DIM)).astype(np.float32)
+
+
+def test_search_returns_the_best_matches_first():
+    vectors = make_vectors(50, seed=0)
+    index = SemanticIndex(DIM, ["topic"], block_size=8)
+    index.add([f"q{i}" for i in range(50)], vectors, {"topic": ["CNN"] * 50})
+    queries = vectors[[3, 41]] + 0.05 * make_vectors(2, seed=1)
+
+    indices, similarities = index.search(queries, k=5)
+    assert indices.shape == (2, 5)
+    assert indices[:, 0].tolist() == [3, 41]
+    assert np.all(np.diff(similarities, axis=1) <= 0)
+
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ unit.T, axis=1)[:, :5]
+    assert np.array_equal(indices, expected)
+
+
+def test_added_rows_grow_past_the_buffer():
+    index = SemanticIndex(DIM, ["topic"])
+    vectors = make_vectors(index.MIN_CAPACITY + 10, seed=0)
+    for i, vector in enumerate(vectors):
+        index.add([f"q{i}"], vector[None], {"topic": ["CNN" if i % 2 else "RNN"]})
+    # Already indexed (after normalization)
+    assert index.add(["Q0 "], vectors[:1], {"topic": ["CNN"]}) == 0
+
+    assert len(index) == len(vectors)
+    assert index.text(len(vectors) - 1) == f"q{len(vectors) - 1}"
+    assert index.labels(1) == {"topic": "CNN"}
+    assert index.search(vectors[-1:], k=1)[0][0, 0] == len(vectors) - 1
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / "index")
+    index = SemanticIndex(DIM, ["topic", "intent"])
+    vectors = make_vectors(5, seed=0)
+    index.add([f"q{i}" for i in range(5)], vectors, {"topic": ["CNN", "RNN"] * 2 + ["CNN"],
+                                                    "intent": ["Example"] * 5})
+    index.save(path)
+
+    loaded = SemanticIndex.load(path)
+    assert len(loaded) == 5
+    assert loaded.stats()["unsaved_rows"] == 0
+    assert loaded.labels(1) == {"topic": "RNN", "intent": "Example"}
+    assert loaded.search(vectors[2:3], k=1)[0][0, 0] == 2
+
+
+def _save_rows(path, start, n):
+    index = SemanticIndex.load(path)
+    vectors = make_vectors(n, seed=start)
+    index.add([f"q{i}" for i in range(start, start + n)], vectors, {"topic": [f"t{start}"] * n})
+    index.save_added(path)
+
+
+def test_save_added_keeps_rows_from_every_process(tmp_path):
+    path = str(tmp_path / "index")
+    index = SemanticIndex(DIM, ["topic"])
+    index.add(["q-base"], make_vectors(1, seed=99), {"topic": ["base"]})
+    index.save(path)
+
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_save_rows, args=(path, start, 20)) for start in (100, 200)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert all(worker.exitcode == 0 for worker in workers)
+
+    saved = SemanticIndex.load(path)
+    assert len(saved) == 41
+    texts = {saved.text(i): saved.labels(i)["topic"] for i in range(len(saved))}
+    assert texts["q-base"] == "base"
+    assert texts["q105"] == "t100"
+    assert texts["q219"] == "t200"
@@ -0,0 +1,91 @@
+import multiprocessing
+
+import pytest
+
+from models.session_store import SessionStore
+
+
+def interaction(topic="CNN", difficulty="Beginner", score=70, attempts=1, time_spent=20):
+    return {"topic": topic, "difficulty": difficulty, "score": score, "attempts": attempts,
+            "time_spent": time_spent}
+
+
+def recommendation(next_topic="CNN", action="Continue", difficulty_adjustment="Same"):
+    return {"next_topic": next_topic, "action": action, "difficulty_adjustment": difficulty_adjustment}
+
+
+def test_record_updates_history_and_aggregates():
+    store = SessionStore(history_size=2, score_alpha=0.5)
+    store.record("s1", interaction(score=40), recommendation(difficulty_adjustment="Increase"))
+    store.record("s1", interaction(score=80, attempts=3), recommendation())
+    session = store.record("s1", interaction(topic="RNN", score=60), recommendation(next_topic="RNN"))
+
+    assert session["events"] == 3
+    assert [event["score"] for event in session["history"]] == [80.0, 60.0]
+    cnn = session["topics"]["CNN"]
+    assert cnn["events"] == 2
+    assert cnn["avg_score"] == 60.0
+    assert cnn["avg_attempts"] == 2.0
+    assert cnn["best_score"] == 80.0
+    assert session["current_topic"] == "RNN"
+
+
+def test_difficulty_follows_the_recommendation():
+    store = SessionStore()
+    session = store.record("s1", interaction(difficulty="Beginner"), recommendation(difficulty_adjustment="Increase"))
+    assert session["current_difficulty"] == "Intermediate"
+    session = store.record("s1", interaction(difficulty="Advanced"), recommendation(difficulty_adjustment="Increase"))
+    assert session["current_difficulty"] == "Advanced"
+    # A new topic starts over at the first level
+    session = store.record("s1", interaction(difficulty="Advanced"), recommendation(next_topic="RNN"))
+    assert session["current_difficulty"] == "Beginner"
+
+
+def test_resolve_fills_topic_and_difficulty_from_the_session():
+    store = SessionStore()
+    with pytest.raises(KeyError):
+        store.resolve("s1")
+    store.record("s1", interaction(), recommendation(difficulty_adjustment="Increase"))
+    assert store.resolve("s1") == ("CNN", "Intermediate")
+    assert store.resolve("s1", difficulty="Advanced") == ("CNN", "Advanced")
+
+
+def test_evicted_students_are_reloaded_from_disk(tmp_path):
+    store = SessionStore(max_students=1, disk_path=str(tmp_path / "sessions.sqlite"))
+    store.record("s1", interaction(score=90), recommendation())
+    store.record("s2", interaction(), recommendation())
+    assert store.stats()["evictions"] == 1
+
+    assert store.get("s1")["topics"]["CNN"]["best_score"] == 90.0
+    assert store.stats()["disk_loads"] == 1
+    restarted = SessionStore(disk_path=str(tmp_path / "sessions.sqlite"))
+    assert restarted.get("s2")["events"] == 1
+
+
+def test_shared_store_needs_a_disk_path():
+    with pytest.raises(ValueError):
+        SessionStore(shared=True)
+
+
+def _record_events(path, n):
+    store = SessionStore(disk_path=path, shared=True)
+    for _ in range(n):
+        store.record("s1", interaction(), recommendation())
+
+
+def test_shared_store_keeps_events_from_every_process(tmp_path):
+    path = str(tmp_path / "sessions.sqlite")
+    first = SessionStore(disk_path=path, shared=True)
+    first.record("s1", interaction(), recommendation())
+
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_record_events, args=(path, 25)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    # The first store has no stale copy to write back over the others
+    session = first.record("s1", interaction(), recommendation())
+    assert session["events"] == 77
+    assert first.stats()["memory_students"] == 0
@@ -1,16 +1,20 @@
-from models.nlp_module import QueryUnderstandingModel
-from models.adaptive_module import AdaptiveLearningModel
-
-def train_all():
-    print("=== Training NLP Model ===")
-    nlp_model = QueryUnderstandingModel()
-    nlp_model.train("data/synthetic_queries.csv")
-    
-    print("\n=== Training Adaptive Learning Model ===")
-    adaptive_model = AdaptiveLearningModel()
-    adaptive_model.train("data/synthetic_interactions.csv")
-    
-    print("\nAll models trained successfully!")
-
-if __name__ == "__main__":
-    train_all()
+from models.nlp_module import QueryUnderstandingModel
+from models.adaptive_module import AdaptiveLearningModel
+
+def train_all():
+    print("=== Training NLP Model ===")
+    # Embeddings persist across runs, so retraining on an overlapping CSV
+    # only encodes the new queries. The semantic index (SEMANTIC_INDEX=1 in
+    # the app) is built from the same embeddings.
+    nlp_model = QueryUnderstandingModel(cache_path="models/saved_models/embedding_cache.sqlite",
+                                        semantic_index=True)
+    nlp_model.train("data/synthetic_queries.csv")
+    
+    print("\n=== Training Adaptive Learning Model ===")
+    adaptive_model = AdaptiveLearningModel()
+    adaptive_model.train("data/synthetic_interactions.csv")
+    
+    print("\nAll models trained successfully!")
+
+if __name__ == "__main__":
+    train_all()
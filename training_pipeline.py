@@ -0,0 +1,209 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from models.adaptive_module import AdaptiveLearningModel
+from models.embedding_cache import DEFAULT_CACHE_PATH
+from models.encoder_backends import create_encoder
+from models.feature_store import DEFAULT_CHUNK_SIZE, read_chunks
+from models.nlp_module import QueryUnderstandingModel
+
+# Training pipeline: the parallel counterpart of train.py.
+#
+# 1. encode    queries missing from the persistent embedding cache are
+#              sharded across a process pool; cached rows are never re-encoded
+# 2. train     the NLP and adaptive models are fitted concurrently, one
+#              process each, with n_jobs forests inside each process
+# 3. report    wall time and peak memory per stage, as JSON
+#
+# With --incremental the adaptive model trains only on interactions appended
+# to the CSV since the last run (falling back to a full retrain when the
+# earlier rows changed or new labels appear).
+
+# Spawned workers start clean instead of inheriting the parent's encoder,
+# thread pools and sqlite handles
+MP_CONTEXT = multiprocessing.get_context("spawn")
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in KiB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+class StageProfiler:
+    """Records wall time and peak memory of named pipeline stages.
+
+    Peak Python/numpy allocations come from tracemalloc; peak_rss_mb is the
+    process high-water mark so far, which also covers native allocations.
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    def stage(self, name):
+        return _ProfiledStage(self, name)
+
+
+class _ProfiledStage:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.info = {}
+
+    def __enter__(self):
+        tracemalloc.start()
+        self.start = time.perf_counter()
+        return self.info
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.profiler.stages[self.name] = {
+            "seconds": round(seconds, 3),
+            "peak_traced_mb": round(peak / 2**20, 1),
+            "peak_rss_mb": peak_rss_mb(),
+            **self.info,
+        }
+        return False
+
+
+_worker_encoder = None
+
+
+def _init_encode_worker(backend, model_name, onnx_dir):
+    # Each encoding process loads the encoder once and keeps it
+    global _worker_encoder
+    _worker_encoder = create_encoder(backend, model_name, onnx_dir)
+
+
+def _encode_shard(texts):
+    return _worker_encoder.encode(texts)
+
+
+class ShardedEncoder:
+    # encode_fn for QueryUnderstandingModel.encode: splits cache misses into
+    # one shard per worker process. Small batches are encoded in-process.
+    def __init__(self, model, n_workers, min_shard_size=256):
+        self.model = model
+        self.n_workers = n_workers
+        self.min_shard_size = min_shard_size
+        self.encoded = 0
+        self._pool = None
+
+    def __call__(self, texts):
+        self.encoded += len(texts)
+        n_shards = min(self.n_workers, max(1, len(texts) // self.min_shard_size))
+        if n_shards <= 1:
+            return self.model.encoder.encode(texts)
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.n_workers, mp_context=MP_CONTEXT, initializer=_init_encode_worker,
+                initargs=(self.model.encoder_backend, self.model.model_name, self.model.onnx_dir),
+            )
+        shards = [list(s) for s in np.array_split(np.array(texts, dtype=object), n_shards)]
+        return np.vstack(list(self._pool.map(_encode_shard, shards)))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+def _train_nlp(config):
+    profiler = StageProfiler()
+    with profiler.stage("nlp_train") as info:
+        # Every embedding is in the shared cache by now
+        model = QueryUnderstandingModel(cache_path=config["cache_path"], n_jobs=config["n_jobs"],
+                                        semantic_index=True)
+        model.train(config["queries"], chunk_size=config["chunk_size"])
+        info["version"] = model.version
+    return profiler.stages
+
+
+def _train_adaptive(config):
+    profiler = StageProfiler()
+    with profiler.stage("adaptive_train") as info:
+        model = AdaptiveLearningModel(n_jobs=config["n_jobs"])
+        updated = False
+        if config["incremental"]:
+            model.load_models()
+            updated = model.update(config["interactions"], n_new_trees=config["n_new_trees"])
+        if not updated:
+            model.train(config["interactions"], chunk_size=config["chunk_size"])
+        info["incremental"] = updated
+        info["version"] = model.version
+        info["rows"] = model.training_state.get("rows")
+    return profiler.stages
+
+
+def run_pipeline(queries="data/synthetic_queries.csv", interactions="data/synthetic_interactions.csv",
+                 cache_path=DEFAULT_CACHE_PATH, workers=None, n_jobs=None, incremental=False, n_new_trees=20,
+                 chunk_size=None):
+    workers = workers or os.cpu_count() or 1
+    profiler = StageProfiler()
+    config = {
+        "queries": queries,
+        "interactions": interactions,
+        "cache_path": cache_path,
+        "n_jobs": n_jobs,
+        "incremental": incremental,
+        "n_new_trees": n_new_trees,
+        "chunk_size": chunk_size,
+    }
+
+    with profiler.stage("encode") as info:
+        model = QueryUnderstandingModel(cache_path=cache_path)
+        encoder = ShardedEncoder(model, workers)
+        rows = 0
+        for chunk in read_chunks(queries, chunk_size or DEFAULT_CHUNK_SIZE, columns=["query"]):
+            model.encode(chunk["query"].tolist(), encode_fn=encoder)
+            rows += len(chunk)
+        info["rows"] = rows
+        info["encoded"] = encoder.encoded
+        info["reused"] = rows - encoder.encoded
+        encoder.close()
+
+    with profiler.stage("train"):
+        with ProcessPoolExecutor(max_workers=min(2, workers), mp_context=MP_CONTEXT) as pool:
+            jobs = [pool.submit(_train_nlp, config), pool.submit(_train_adaptive, config)]
+            for job in jobs:
+                profiler.stages.update(job.result())
+
+    return {"workers": workers, "stages": profiler.stages}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train all models in parallel, reusing cached embeddings")
+    parser.add_argument("--queries", default="data/synthetic_queries.csv")
+    parser.add_argument("--interactions", default="data/synthetic_interactions.csv")
+    parser.add_argument("--cache-path", default=DEFAULT_CACHE_PATH)
+    parser.add_argument("--workers", type=int, default=None, help="processes for encoding (default: all cores)")
+    parser.add_argument("--n-jobs", type=int, default=None, help="threads per forest fit (sklearn n_jobs)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="train the adaptive model on appended interactions only")
+    parser.add_argument("--new-trees", type=int, default=20, help="most trees added per target by an incremental update")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="stream the data through the feature store in chunks of this many rows")
+    args = parser.parse_args()
+
+    report = run_pipeline(args.queries, args.interactions, args.cache_path, args.workers,
+                          args.n_jobs, args.incremental, args.new_trees, args.chunk_size)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()